@@ -1,2 +1,24 @@
-from .assistants import TeachingAgent
-from .utils import AssistantConfig, quick_delete
\ No newline at end of file
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .assistants import TeachingAgent
+    from .pool import ResourcePool
+    from .utils import AssistantConfig, quick_delete
+    from .worker import OverviewWorker
+
+_exports = {
+    "TeachingAgent": ".assistants",
+    "ResourcePool": ".pool",
+    "AssistantConfig": ".utils",
+    "quick_delete": ".utils",
+    "OverviewWorker": ".worker",
+}
+
+def __getattr__(name: str) -> object: # submodules are imported on first use, keeping `import TeachingAgent` cheap
+    if name not in _exports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    import importlib
+    return getattr(importlib.import_module(_exports[name], __name__), name)
+
+__all__ = list(_exports)
@@ -0,0 +1,289 @@
+from __future__ import annotations
+from collections import defaultdict
+from contextlib import closing
+from functools import cache
+from pathlib import Path
+from typing import Iterable, Optional
+import hashlib
+import json
+import random
+import re
+import sqlite3
+import threading
+import time
+from .utils import cfg, _parent
+from .metrics import metrics
+
+PERMUTATIONS = 64 # MinHash signature length
+BANDS = 16 # LSH bands of PERMUTATIONS // BANDS rows, near-duplicates share at least one band with high probability
+_PRIME = (1 << 61) - 1
+
+_STOPWORDS = frozenset("a an the is are was were be been being of to in on at for and or as by with within into from me my i you your please can could would will do does did tell give about".split())
+_FILLER = frozenset("what which explain describe main key important".split()) # rewordings that don't change the question
+_ANAPHORA = frozenset("it its this that these those they them their he she his her above previous earlier last again more else".split()) # only make sense mid-conversation
+_CONTRACTIONS = {"what's": "what is", "how's": "how is", "where's": "where is", "who's": "who is", "that's": "that is", "it's": "it is"}
+
+def normalise(question: str) -> str:
+    """
+    Canonical form of a question for exact matching: lower case, contractions expanded, punctuation, filler words and
+    plural s dropped, e.g. "What's an enzyme??" and "what is enzymes" both give "what enzyme".
+    """
+
+    text = question.lower().replace("’", "'")
+
+    for contraction, expanded in _CONTRACTIONS.items():
+        text = text.replace(contraction, expanded)
+
+    words = re.findall(r"[a-z0-9]+", text)
+    return " ".join(w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") else w for w in words if w not in _STOPWORDS)
+
+def content_words(normalised: str) -> frozenset[str]: # a near-duplicate must ask about exactly these
+    return frozenset(normalised.split()) - _FILLER
+
+def self_contained(question: str) -> bool: # follow-ups ("what about the second one?") depend on the thread, never cache them
+    words = re.findall(r"[a-z']+", question.lower())
+    return len(words) >= 3 and not _ANAPHORA.intersection(words)
+
+@cache
+def _coeffs() -> list[tuple[int, int]]: # built on first use, not at import
+    rng = random.Random(0) # fixed, signatures are persisted
+    return [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(PERMUTATIONS)]
+
+def signature(normalised: str) -> tuple[int, ...]:
+    words = [w for w in normalised.split() if w not in _FILLER]
+    shingles = set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])} # unigrams and bigrams
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big") for s in shingles] or [0]
+
+    return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in _coeffs())
+
+def similarity(a: tuple[int, ...], b: tuple[int, ...]) -> float: # estimated Jaccard similarity of the shingle sets
+    return sum(x == y for x, y in zip(a, b)) / PERMUTATIONS
+
+def _bands(sig: tuple[int, ...]) -> list[tuple[int, tuple[int, ...]]]:
+    rows = PERMUTATIONS // BANDS
+    return [(i, sig[i * rows:(i + 1) * rows]) for i in range(BANDS)]
+
+class AnswerCache:
+    """
+    Chat answers keyed by corpus (content hash of a vector store's files plus the assistant's prompt and model) and
+    normalised question. Near-duplicate questions are matched locally with MinHash signatures, bucketed by LSH bands so
+    a lookup only compares a handful of candidates, and must ask about the same content words (see content_words).
+    Entries expire after ttl_hours and the least recently used are evicted past max_entries. Settings default to the
+    [answers] config and the database to the [cache] file_index one, both read on first use - the module-level `answers`
+    is created at import, before any config is loaded.
+    """
+
+    def __init__(
+            self,
+            path: Optional[str | Path] = None,
+            threshold: Optional[float] = None,
+            ttl_hours: Optional[float] = None,
+            max_entries: Optional[int] = None,
+        ) -> None:
+        self.path = path # resolved on first use
+        self._threshold = threshold # None for [answers] threshold, min estimated Jaccard similarity of a near match
+        self._ttl_hours = ttl_hours
+        self._max_entries = max_entries
+        self._lock = threading.RLock()
+        self._ready = False
+        self._loaded = set() # corpora whose entries are in the in-memory index
+        self._index = defaultdict(dict) # corpus: {normalised question: signature}
+        self._buckets = defaultdict(set) # (corpus, band, rows): {normalised question, ...}
+        self._stats = {"lookups": 0, "hits": 0, "near_hits": 0, "misses": 0, "skipped": 0, "stores": 0, "evictions": 0, "lookup_seconds": 0.0}
+
+    @property
+    def threshold(self) -> float:
+        return cfg.get("answers", {}).get("threshold", 0.7) if self._threshold is None else self._threshold
+
+    @property
+    def ttl_hours(self) -> float:
+        return cfg.get("answers", {}).get("ttl_hours", 24 * 7) if self._ttl_hours is None else self._ttl_hours
+
+    @property
+    def max_entries(self) -> int:
+        return cfg.get("answers", {}).get("max_entries", 10_000) if self._max_entries is None else self._max_entries
+
+    def _connect(self) -> sqlite3.Connection:
+        with self._lock:
+            if self.path is None:
+                self.path = _parent / cfg.get("cache", {}).get("file_index", "cache.sqlite3")
+
+            db = sqlite3.connect(str(self.path), timeout=30)
+
+            if not self._ready:
+                with db:
+                    db.execute(
+                        "CREATE TABLE IF NOT EXISTS answers ("
+                        "corpus TEXT, question TEXT, answer TEXT NOT NULL, signature TEXT NOT NULL, created REAL, accessed REAL, hits INTEGER DEFAULT 0, "
+                        "PRIMARY KEY (corpus, question))"
+                    )
+                    db.execute("CREATE INDEX IF NOT EXISTS answers_by_access ON answers (accessed)")
+
+                self._ready = True
+
+        return db
+
+    @staticmethod
+    def corpus(file_hashes: Iterable[str], *params: object) -> str: # e.g. (agent.file_hashes, prompt, model)
+        h = hashlib.sha256()
+
+        for part in (*sorted(file_hashes), "\0", *map(repr, params)):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+
+        return h.hexdigest()
+
+    def _load(self, db: sqlite3.Connection, corpus: str) -> None: # caller holds self._lock
+        if corpus in self._loaded:
+            return
+
+        for question, sig in db.execute("SELECT question, signature FROM answers WHERE corpus = ? AND created > ?", (corpus, self._cutoff())):
+            self._add(corpus, question, tuple(json.loads(sig)))
+
+        self._loaded.add(corpus)
+
+    def _add(self, corpus: str, question: str, sig: tuple[int, ...]) -> None:
+        self._index[corpus][question] = sig
+
+        for band in _bands(sig):
+            self._buckets[(corpus, *band)].add(question)
+
+    def _remove(self, corpus: str, question: str) -> None:
+        if (sig := self._index[corpus].pop(question, None)) is None:
+            return
+
+        for band in _bands(sig):
+            self._buckets[(corpus, *band)].discard(question)
+
+    def _cutoff(self) -> float:
+        return time.time() - self.ttl_hours * 60 * 60 if self.ttl_hours else 0.0
+
+    def get(self, corpus: str, question: str) -> Optional[str]:
+        """
+        Cached answer to `question` or a near-duplicate of it for this corpus, None on a miss (or for follow-up
+        questions, which depend on the conversation).
+        """
+
+        start = time.perf_counter()
+
+        if not self_contained(question):
+            self._count("skipped", start)
+            return None
+
+        normalised = normalise(question)
+
+        with self._lock, closing(self._connect()) as db, db:
+            self._load(db, corpus)
+            match, kind = (normalised, "hits") if normalised in self._index[corpus] else (None, "near_hits")
+
+            if match is None: # near-duplicates: LSH candidates with the same content words, best estimated similarity over the threshold
+                sig, words = signature(normalised), content_words(normalised) # shingles alone score "advantages"/"disadvantages of X" as near-duplicates
+                candidates = {c for c in set().union(*(self._buckets.get((corpus, *band), ()) for band in _bands(sig))) if content_words(c) == words}
+                scored = max(((similarity(sig, self._index[corpus][c]), c) for c in candidates), default=(0.0, None))
+                match = scored[1] if scored[0] >= self.threshold else None
+
+            if match is None:
+                self._count("misses", start)
+                return None
+
+            row = db.execute("SELECT answer, created FROM answers WHERE corpus = ? AND question = ?", (corpus, match)).fetchone()
+
+            if row is None or row[1] <= self._cutoff(): # expired, or evicted by another process
+                db.execute("DELETE FROM answers WHERE corpus = ? AND question = ?", (corpus, match))
+                self._remove(corpus, match)
+                self._count("misses", start)
+                return None
+
+            db.execute("UPDATE answers SET accessed = ?, hits = hits + 1 WHERE corpus = ? AND question = ?", (time.time(), corpus, match))
+
+        self._count(kind, start)
+        return row[0]
+
+    def put(self, corpus: str, question: str, answer: str) -> bool: # False if the question isn't cacheable
+        if not answer or not self_contained(question) or not (normalised := normalise(question)):
+            return False
+
+        sig, now = signature(normalised), time.time()
+
+        with self._lock, closing(self._connect()) as db, db:
+            self._load(db, corpus)
+            db.execute("INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?, 0)", (corpus, normalised, answer, json.dumps(sig), now, now))
+            self._add(corpus, normalised, sig)
+            self._stats["stores"] += 1
+
+            expired = db.execute("SELECT corpus, question FROM answers WHERE created <= ?", (self._cutoff(), )).fetchall()
+            overflow = max(0, db.execute("SELECT COUNT(*) FROM answers").fetchone()[0] - len(expired) - self.max_entries)
+            evicted = expired + db.execute( # least recently used
+                "SELECT corpus, question FROM answers WHERE created > ? ORDER BY accessed LIMIT ?", (self._cutoff(), overflow)
+            ).fetchall()
+
+            db.executemany("DELETE FROM answers WHERE corpus = ? AND question = ?", evicted)
+
+            for old_corpus, old_question in evicted:
+                self._remove(old_corpus, old_question)
+
+            self._stats["evictions"] += len(evicted)
+
+        return True
+
+    def contains(self, corpus: str, question: str) -> bool: # without counting a lookup, e.g. to skip pre-warming
+        normalised = normalise(question)
+
+        with self._lock, closing(self._connect()) as db:
+            self._load(db, corpus)
+            return normalised in self._index[corpus]
+
+    def invalidate(self, corpus: Optional[str] = None) -> None: # one corpus, or everything
+        with self._lock, closing(self._connect()) as db, db:
+            if corpus is None:
+                db.execute("DELETE FROM answers")
+                self._index.clear()
+                self._buckets.clear()
+                self._loaded.clear()
+            else:
+                db.execute("DELETE FROM answers WHERE corpus = ?", (corpus, ))
+
+                for question in list(self._index[corpus]):
+                    self._remove(corpus, question)
+
+    def _count(self, kind: str, start: float) -> None:
+        with self._lock:
+            self._stats["lookups"] += 1
+            self._stats[kind] += 1
+            self._stats["lookup_seconds"] += time.perf_counter() - start
+
+    def stats(self) -> dict[str, float]: # counts plus hit_rate (exact and near hits over lookups) and mean lookup time
+        with self._lock:
+            stats = dict(self._stats)
+
+        lookups = max(stats["lookups"], 1)
+        stats["hit_rate"] = round((stats["hits"] + stats["near_hits"]) / lookups, 3)
+        stats["mean_lookup_ms"] = round(stats.pop("lookup_seconds") / lookups * 1000, 3)
+
+        return stats
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._stats = dict.fromkeys(self._stats, 0) | {"lookup_seconds": 0.0}
+
+    def prometheus(self) -> str:
+        stats = self.stats()
+        lines = []
+
+        for metric, kind, help in (
+            ("lookups", "counter", "Chat turns checked against the answer cache."),
+            ("hits", "counter", "Turns answered from the cache by an exact (normalised) question match."),
+            ("near_hits", "counter", "Turns answered from the cache by a near-duplicate question."),
+            ("misses", "counter", "Turns that went to a run."),
+            ("skipped", "counter", "Follow-up questions never looked up."),
+            ("evictions", "counter", "Entries dropped for age or space."),
+            ("hit_rate", "gauge", "Hits over lookups."),
+            ("mean_lookup_ms", "gauge", "Mean lookup time."),
+        ):
+            name = f"teachingagent_answer_cache_{metric}" + ("_total" if kind == "counter" else "")
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}", f"{name} {stats[metric]:g}"]
+
+        return "\n".join(lines) + "\n"
+
+answers = AnswerCache()
+metrics.register(answers.prometheus) # served at /metrics alongside the run metrics
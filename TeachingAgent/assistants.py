@@ -1,64 +1,253 @@
-from openai import OpenAI
+from __future__ import annotations
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, aclosing, contextmanager, nullcontext, suppress
 from functools import partial
+import io
 import os
 import json
-from typing import NewType, Callable, Optional
-from .utils import AssistantConfig, _validate, cfg, _parent
+import threading
+import time
+import weakref
+from typing import NewType, Callable, Optional, AsyncIterator, Awaitable, Iterator, IO, TypeVar, TYPE_CHECKING
+from .utils import AssistantConfig, _validate, cfg, prompts, route, _parent
 from .logger import Logger
+from .engine import CancelScope, run_blocking, submit_blocking
+from .cache import FileIndex, OverviewCache, digest, digest_file
+from .ingest import FileProgress, Ingestion
+from .preprocess import PreparedFile, extract_pages, prepare_pdf
+from .pool import CHUNKING_STRATEGY, Bundle, ResourcePool, provision
+from .metrics import RunRecord, metrics
+from .registry import helpers
+from .schema import revision_schema, validate_revision
+from .scheduler import Priority, STAGE_PRIORITY, scheduler
+from .ledger import delete_resources, ledger
+from .answers import answers, self_contained
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+    from .worker import OverviewJob, OverviewWorker
 
 Assistant = NewType("Assistant", object)
 Thread = NewType("Thread", object)
 VectorStore = NewType("Vector Store", object)
+T = TypeVar("T")
+SNAPSHOT_VERSION = 1 # bump when the snapshot() state changes shape, older snapshots then start fresh sessions
+_snapshots = ThreadPoolExecutor(max_workers=1, thread_name_prefix="Snapshot") # autosaves, off every caller's response path
+
+prompts.define("revision_topic", "summary_gen", "\n\nBelow are the topic and list of subtopics you are to create a revision sheet for:\nTopic: [TOPIC]\n\t[SUBTOPICS]")
+prompts.define("revision_batch", "summary_gen", "\n\nBelow are several topics, each with its list of subtopics, you are to create revision sheets for. Answer with a single JSON object with every topic below as a key, in the format above:\n\n[TOPICS]")
+prompts.define("topics_incremental", "topics", "\n\nThe material you can see was just added to a course whose existing topics are listed below. If the new material covers an existing topic, use its exact name and list the subtopics the new material covers. Only output topics found in the new material.\n\nExisting topics: [EXISTING]")
+prompts.define("faq_generate", None, "Generate [N] questions each for the following topics: [TOPICS].")
+prompts.define("chat_summary", None, "Summarise the conversation so far in a few concise paragraphs, keeping every fact, definition and open question a student would need to carry on revising. Answer with the summary only.")
+prompts.define("faq_evaluate", "eval_questions", ". The questions provided are [QUESTIONS]")
+prompts.define("faq_select", "pick_questions", "\n\nQuestions: [QUESTIONS]\n\nFeedback: [FEEDBACK]")
 
 class TeachingAgent:
-    def __init__(self, client: OpenAI, config: Optional[AssistantConfig] = None, verbosity: dict[str, bool | str] = {"verbose": True, "threshold": "debug"}) -> None:
+    _live = weakref.WeakValueDictionary() # session_id: agent, for every open agent in this process
+    _unsettled = set() # ids of threads whose cancelled run didn't stop in time, see _cancel_run/_settled
+    
+    def __init__(
+            self, 
+            client: OpenAI, 
+            config: Optional[AssistantConfig] = None, 
+            verbosity: dict[str, bool | str] = {"verbose": True, "threshold": "debug"}, 
+            pool: Optional[ResourcePool] = None, 
+            context: Optional[dict] = None, 
+            resume: Optional[str] = None,
+        ) -> None:
+        """
+        Pass resume (a session_id, see snapshot()) to reattach to that session's assistant, vector store, threads, files
+        and overview after a restart instead of creating them again. If it can't be resumed - no snapshot, a different
+        config or prompt, or its resources are gone - a fresh session is started under the same id. `resumed` says which.
+        A session still open elsewhere (in this process, or seen by another live one within [snapshot] live_minutes) is
+        never shared: a fresh session is started under a new id instead, so check session_id.
+        """
+        
         assert _validate(config), "Invalid Assistant config."
         assert isinstance(verbosity, dict), "Invalid verbosity set."
         
-        self.logger = Logger(_parent / "sessions.log", verbose=verbosity.get("verbose", True), threshold=verbosity.get("threshold", "debug"))
+        busy = resume is not None and (resume in TeachingAgent._live or ledger.live(resume))
+        resume = None if busy else resume
+        
+        self.logger = Logger(verbose=verbosity.get("verbose", True), threshold=verbosity.get("threshold", "debug"), session=resume or os.urandom(16).hex())
+        self.session_id = self.logger.session # tags every log line from this agent, and is all it takes to resume it
+        TeachingAgent._live[self.session_id] = self
+        
+        if busy:
+            self.logger.log("Session to resume is still open elsewhere, starting a new session.", "warning")
+        
         self.client = client
         self.in_session = False
-        self.thread = self.client.beta.threads.create()
-        self.vector_store = client.beta.vector_stores.create(
-            chunking_strategy={
-                "type": "static",
-                "static": {
-                    "max_chunk_size_tokens": 2048,
-                    "chunk_overlap_tokens": 512,
-                }
-            },
-            name="textbook",
+        self.file_index = FileIndex(_parent / cfg.get("cache", {}).get("file_index", "cache.sqlite3"))
+        self.page_cache = OverviewCache( # extracted PDF text by file sha256, see _prepare
+            _parent / cfg.get("cache", {}).get("file_index", "cache.sqlite3"),
+            max_bytes=int(cfg.get("preprocess", {}).get("cache_max_mb", 256) * 2 ** 20),
+            table="pdf_pages",
         )
+        self.file_hashes = {} # sha256: file id, for files in this agent's vector store
+        self._pages = set() # hashes of every PDF page uploaded to this vector store, for de-duplication
+        self._ingesting = set() # sha256 of files being uploaded/indexed right now
+        self._ingest_lock = threading.Lock()
+        self.context = dict(cfg.get("chat", {})) if context is None else context # {"mode": "truncate" | "summarise" | None, ...}, see _truncation/_bound_context
+        self._turns = {} # thread id: chat turns since the thread was last summarised
+        self._pending_reply = None # cached answer still being copied into st_thread, see _cached_answer
+        self.transcript = [] # recent chat turns as {"role", "content"}, oldest first, e.g. to redraw a resumed page
+        self._save_lock = threading.Lock()
+        self._save = None # latest autosave, queued, running or done
+        self._autosaving = True # cleared by close()
         
         if config is not None: # setup config/prompt for assistant
             assert type(config) is AssistantConfig, "Invalid config."
             
-            with open(cfg["prompts"]["main"], "r") as f:
-                self.prompt = f.read()
-                
+            self.prompt = prompts["main"].text
             self.config = config
         else:
             self.config = AssistantConfig()
             self.prompt = self.config.prompt
         
-        self.assistant = self.client.beta.assistants.create( # initialise assistant
-            name="Teaching Assistant",
-            instructions=self.prompt,
-            tools=self.config.tools,
-            model=self.config.model,
-            tool_resources={
-                "file_search": {
-                    "vector_store_ids": [self.vector_store.id]
-                }
-            }
-        )
+        ledger.open_session(self.session_id) # everything created for this agent is recorded against it, see close()
+        state, bundle = self._reattach() if resume is not None else (None, None)
+        self.resumed = bundle is not None
+        
+        if bundle is None and pool is not None:
+            bundle = pool.acquire(self.config, self.prompt) # warm bundle if one is ready
+            
+            if bundle is not None:
+                ledger.adopt([r.id for r in (bundle.assistant, bundle.vector_store, bundle.thread, bundle.st_thread) if r is not None], self.session_id)
+                self.logger.log("Using pre-provisioned assistant and vector storage.", "debug")
+        
+        if bundle is None:
+            bundle = provision(self.client, self.config, self.prompt, owner=self.session_id)
+        
+        self.thread = bundle.thread
+        self.st_thread = bundle.st_thread
+        self.vector_store = bundle.vector_store
+        self.assistant = bundle.assistant
+        
+        self.ra = RevisionTool(self.assistant, self.client, self.vector_store, self.logger, self.file_hashes)
+        
+        if self.resumed:
+            self.file_hashes.update(state["file_hashes"])
+            self._pages = set(state["pages"])
+            self._turns = dict(state["turns"])
+            self.transcript = list(state["transcript"])
+            self.ra.overview = state["overview"]
+            self.in_session = state["in_session"]
+            self.logger.log(f"Resumed session with {len(self.file_hashes)} file{'s' if len(self.file_hashes) != 1 else ''}{' and its overview' if self.ra.overview else ''}.")
         
-        self.ra = RevisionTool(self.assistant, self.client, self.vector_store, self.logger)
         self.logger.log("Initialised assistant and vector storage.", "debug")
     
-    def add_files(self, *filepaths: str | list[str], binaries: bool = False) -> None: # single or batch file upload to vector storage
-        if isinstance(filepaths[0], list):
+    def _config_key(self) -> str: # a snapshot only resumes under the config and prompt its assistant was created with
+        return digest(repr((self.config, self.prompt)).encode("utf-8"))
+    
+    def _reattach(self) -> tuple[Optional[dict], Optional[Bundle]]:
+        """
+        (snapshot state, bundle of its still existing resources), or (None, None) - anything the snapshot left behind is
+        then deleted. The resources are checked concurrently, one retrieve each, and nothing is uploaded or regenerated.
+        """
+        
+        state = ledger.load_snapshot(self.session_id)
+        
+        if state is None:
+            self.logger.log("No snapshot to resume, starting a new session.", "warning")
+            return None, None
+        
+        if state.get("version") != SNAPSHOT_VERSION or state.get("config") != self._config_key():
+            self.logger.log("Snapshot was taken with a different config or prompt, starting a new session.", "warning")
+            return self._discard_snapshot()
+        
+        retrieve = {
+            "assistant": self.client.beta.assistants.retrieve,
+            "vector_store": self.client.beta.vector_stores.retrieve,
+            "thread": self.client.beta.threads.retrieve,
+            "st_thread": self.client.beta.threads.retrieve,
+        }
+        jobs = {kind: submit_blocking(scheduler.call, Priority.INTERACTIVE, retrieve[kind], state[kind]) for kind in retrieve if state.get(kind)}
+        
+        try:
+            found = {kind: job.result() for kind, job in jobs.items()}
+        except Exception as e:
+            if getattr(e, "status_code", None) != 404: # e.g. offline, leave them for close() or sweep() rather than guess
+                self.logger.log(f"Could not check snapshot resources ({e}), starting a new session.", "warning")
+                return None, None
+            
+            self.logger.log("Snapshot resources were deleted, starting a new session.", "warning")
+            return self._discard_snapshot()
+        
+        return state, Bundle(found["assistant"], found["vector_store"], found["thread"], found.get("st_thread"))
+    
+    def _discard_snapshot(self) -> tuple[None, None]:
+        ledger.drop_snapshot(self.session_id)
+        delete_resources(self.client, ledger.owned(self.session_id), priority=Priority.INTERACTIVE)
+        return None, None
+    
+    def snapshot(self) -> str:
+        """
+        Save what a restarted process needs to resume this session - resource ids, the files in the vector store, chat
+        threads and recent transcript, and the overview - to the ledger database, and return the session_id to pass as
+        resume=. While a snapshot exists sweep() leaves the session's resources alone until it goes stale ([ledger]
+        stale_hours), and close() drops it. Taken automatically as the session changes unless [snapshot] enabled is false.
+        """
+        
+        ledger.save_snapshot(self.session_id, {
+            "version": SNAPSHOT_VERSION,
+            "config": self._config_key(),
+            "assistant": self.assistant.id,
+            "vector_store": self.vector_store.id,
+            "thread": self.thread.id,
+            "st_thread": self.st_thread.id if self.st_thread is not None else None,
+            "file_hashes": dict(self.file_hashes),
+            "pages": sorted(self._pages),
+            "turns": dict(self._turns),
+            "transcript": list(self.transcript),
+            "overview": self.ra.overview,
+            "in_session": self.in_session,
+            "saved": time.time(),
+        })
+        
+        return self.session_id
+    
+    def _autosave(self) -> None: # after anything a resume would otherwise lose, in the background, never fails the caller
+        if not cfg.get("snapshot", {}).get("enabled", True):
+            return
+        
+        with self._save_lock:
+            if not self._autosaving or (self._save is not None and not self._save.running() and not self._save.done()): # a queued save will see this change too
+                return
+            
+            self._save = _snapshots.submit(self._write_snapshot)
+    
+    def _write_snapshot(self) -> None:
+        try:
+            self.snapshot()
+        except Exception as e:
+            self.logger.log(f"Could not save session snapshot: {e}", "warning")
+    
+    def _stop_autosave(self) -> None: # wait out any pending save, then take no more, so a dropped snapshot stays dropped
+        with self._save_lock:
+            self._autosaving = False
+        
+        if self._save is not None:
+            self._save.result()
+    
+    def _transcribe(self, prompt: str, answer: str) -> None: # questions only ever reach runs as instructions, so threads hold just the replies
+        self.transcript += [{"role": "user", "content": prompt}, {"role": "assistant", "content": answer}]
+        del self.transcript[:-cfg.get("snapshot", {}).get("max_messages", 200)]
+    
+    def add_files(self, *filepaths: str | list[str], binaries: bool = False) -> list[str]: # single or batch file upload to vector storage, returns the file ids newly attached
+        return self.ingest(*filepaths, binaries=binaries).result()
+    
+    def ingest(self, *filepaths: str | list[str], binaries: bool = False, on_progress: Optional[Callable[[FileProgress], None]] = None) -> Ingestion:
+        """
+        Upload and index files in the background and return straight away - chats can carry on meanwhile, searching each
+        file as soon as it is indexed. Up to [ingestion] max_open_files files are open (hashed, then streamed to the API)
+        at once. Content-addressed: bytes already in this vector store or the file index are never uploaded again.
+        
+        PDFs are uploaded as compact text where possible, see _prepare. Each file's savings end up in its progress entry.
+        """
+        
+        if filepaths and isinstance(filepaths[0], list):
             filepaths = filepaths[0]
         
         if not binaries:
@@ -76,117 +265,819 @@ class TeachingAgent:
             fps = filepaths[:]
             self.logger.log(f"Uploading file binaries...")
         
-        batch = self.client.beta.vector_stores.file_batches.upload_and_poll( # streaming done on their end
-            vector_store_id=self.vector_store.id,
-            files=[open(fp, "rb") if not binaries else fp for fp in fps],
+        ingestion = Ingestion([os.path.basename(fp) if not binaries else getattr(fp, "name", "upload") for fp in fps], on_progress)
+        workers = max(1, min(cfg.get("ingestion", {}).get("max_open_files", 8), len(fps))) # one open file per worker
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="Ingestion")
+        jobs = [executor.submit(self._ingest_file, ingestion, i, fp, binaries) for i, fp in enumerate(fps)]
+        
+        def finish() -> None:
+            try:
+                file_ids = [job.result() for job in jobs]
+            except Exception as e: # e.g. an on_progress callback raised
+                ingestion.finish([], e)
+                return
+            finally:
+                executor.shutdown(wait=False)
+            
+            counts = ingestion.counts()
+            self.logger.log(f"Ingested {counts['completed']}/{len(fps)} file{'s' if len(fps) != 1 else ''} ({counts['skipped']} skipped, {counts['failed']} failed).")
+            self._autosave()
+            ingestion.finish([file_id for file_id in file_ids if file_id is not None])
+        
+        threading.Thread(target=finish, name="Ingestion", daemon=True).start()
+        return ingestion
+    
+    def _ingest_file(self, ingestion: Ingestion, i: int, fp: str | IO[bytes], binaries: bool) -> Optional[str]: # file id if newly attached
+        ingestion.update(i, status="reading", started=time.monotonic())
+        sha256, prepared = None, None
+        
+        try:
+            with TeachingAgent._open_file(fp, binaries) as (name, f):
+                sha256, size = digest_file(f)
+                ingestion.update(i, size=size)
+                
+                with self._ingest_lock: # identical bytes in flight from another worker count as present
+                    if sha256 in self.file_hashes or sha256 in self._ingesting:
+                        self.logger.log(f"'{name}' is already in this vector store. Skipped upload.", "debug")
+                        ingestion.update(i, status="skipped", file_id=self.file_hashes.get(sha256))
+                        sha256 = None # not ours to release
+                        return None
+                    
+                    self._ingesting.add(sha256)
+                
+                upload, content_sha256, chunking = (name, f), sha256, None # streamed from the open file
+                
+                if (prepared := self._prepare(name, f, sha256, size)) is not None:
+                    ingestion.update(i, preprocessed=prepared.report())
+                    
+                    if not prepared.data:
+                        self.logger.log(f"Every page of '{name}' is already in this vector store. Skipped upload.", "debug")
+                        ingestion.update(i, status="skipped")
+                        return None
+                    
+                    upload, content_sha256, chunking = (prepared.name, io.BytesIO(prepared.data)), digest(prepared.data), prepared.chunking
+                
+                file_id = self._cached_file_id(content_sha256)
+                
+                if file_id is None:
+                    ingestion.update(i, status="uploading")
+                    file_id = scheduler.call(Priority.INGESTION, self.client.files.create, file=upload, purpose="assistants").id
+                    ledger.record("file", file_id) # shared through the file index, so not owned by this session
+                    self.file_index.put(content_sha256, file_id, upload[0], size if prepared is None else len(prepared.data))
+                    self.logger.log(f"Uploaded '{name}' as {file_id}.", "debug")
+                else:
+                    self.logger.log(f"Reusing indexed file {file_id} for '{name}'.", "debug")
+            
+            ingestion.update(i, status="indexing", file_id=file_id)
+            vs_file = scheduler.call(
+                Priority.INGESTION,
+                self.client.beta.vector_stores.files.create_and_poll,
+                vector_store_id=self.vector_store.id,
+                file_id=file_id,
+                **({"chunking_strategy": chunking} if chunking is not None else {}),
+            )
+            self.file_index.set_status(file_id, vs_file.status)
+            
+            if vs_file.status != "completed":
+                error = getattr(vs_file, "last_error", None)
+                ingestion.update(i, status="failed", error=getattr(error, "message", None) or vs_file.status)
+                self.logger.log(f"Indexing '{name}' ended with status: {vs_file.status}.", "warning")
+                self._release_pages(prepared)
+                return None
+            
+            self.file_hashes[sha256] = file_id # only indexed files count towards the overview
+            ingestion.update(i, status="completed")
+            return file_id
+        
+        except Exception as e:
+            ingestion.update(i, status="failed", error=str(e))
+            self.logger.log(f"Failed to ingest '{ingestion.files[i].name}': {e}", "warning")
+            self._release_pages(prepared)
+            return None
+        
+        finally:
+            if sha256 is not None:
+                with self._ingest_lock:
+                    self._ingesting.discard(sha256)
+        
+    def _prepare(self, name: str, f: IO[bytes], sha256: str, size: int) -> Optional[PreparedFile]:
+        """
+        Compact text for a PDF (see preprocess.prepare_pdf), chunked to suit the document, or None to upload the file 
+        as-is: not a PDF, [preprocess] enabled = false, pypdf not installed, or a scan without a text layer. Extracted 
+        text is cached by file hash, and pages already in this vector store are dropped.
+        """
+        
+        if not name.lower().endswith(".pdf") or not cfg.get("preprocess", {}).get("enabled", True):
+            return None
+        
+        if (pages := self.page_cache.get(sha256)) is None:
+            if (pages := extract_pages(f)) is None:
+                self.logger.log(f"Could not extract text from '{name}' (is pypdf installed?), uploading the PDF.", "debug")
+                return None
+            
+            self.page_cache.put(sha256, pages)
+        
+        with self._ingest_lock: # page de-duplication across concurrent uploads
+            prepared = prepare_pdf(name, f, size, self._pages, CHUNKING_STRATEGY, pages)
+        
+        if prepared is None:
+            self.logger.log(f"'{name}' has too little text (scanned?), uploading the PDF.", "debug")
+            return None
+        
+        report = prepared.report()
+        self.logger.log(
+            f"Prepared '{name}': {report['bytes_saved']} bytes and ~{report['chunks_saved']} chunks saved "
+            f"({prepared.dropped_pages} pages dropped, {prepared.duplicate_pages} duplicate, {prepared.boilerplate_lines} boilerplate lines).", 
+            "debug",
         )
-        self.logger.log(f"Batch upload: {batch.status}")
         
-    async def _session(self, num_faq_questions: Optional[int] = 5) -> None:
-        summary = asyncio.create_task(self.ra.prep_overview(num_faq_questions)) # concurrently generate revision help - see RevisionTool()
-        summary.add_done_callback(lambda fut: print(f"Revision Overview Result: {fut.result()}"))
-        thread = self.client.beta.threads.create() # main thread for session
+        return prepared
+    
+    def _release_pages(self, prepared: Optional[PreparedFile]) -> None: # pages of a failed upload may come again
+        if prepared is not None:
+            with self._ingest_lock:
+                self._pages.difference_update(prepared.page_hashes)
+    
+    def _cached_file_id(self, sha256: str) -> Optional[str]: # id of a previously indexed copy that still exists remotely
+        entry = self.file_index.get(sha256)
+        
+        if entry is None or entry["status"] != "completed":
+            return None
         
+        try:
+            scheduler.call(Priority.INGESTION, self.client.files.retrieve, entry["file_id"])
+        except Exception: # deleted remotely (e.g. by quick_delete)
+            self.file_index.drop(sha256)
+            return None
+        
+        return entry["file_id"]
+    
+    @staticmethod
+    @contextmanager
+    def _open_file(fp: str | IO[bytes], binaries: bool) -> Iterator[tuple[str, IO[bytes]]]: # paths are closed afterwards, binaries rewound
+        if not binaries:
+            with open(fp, "rb") as f:
+                yield os.path.basename(fp), f
+            
+            return
+        
+        fp.seek(0)
+        
+        try:
+            yield getattr(fp, "name", "upload"), fp
+        finally:
+            fp.seek(0)
+        
+    async def _overview_when_ready(self, ingestion: Optional[Ingestion], num_faq_questions: Optional[int] = 5, on_topic: Optional[Callable[[str, dict[str, str]], None]] = None) -> list[dict[str, list[str]], str, list[str]]:
+        if ingestion is not None: # the overview needs the whole corpus, chats don't
+            await ingestion
+        
+        if self.resumed and self.ra.overview is not None and not (ingestion is not None and ingestion.result()): # nothing new since the snapshot
+            overview = self.ra.overview
+        else:
+            overview = await self.ra.prep_overview(num_faq_questions, on_topic=on_topic)
+            self._autosave()
+        
+        if cfg.get("answers", {}).get("prewarm", True):
+            await self.prewarm_answers(overview[2])
+        
+        return overview
+    
+    async def _session(self, num_faq_questions: Optional[int] = 5, on_topic: Optional[Callable[[str, dict[str, str]], None]] = None, ingestion: Optional[Ingestion] = None) -> None:
+        summary = asyncio.create_task(self._overview_when_ready(ingestion, num_faq_questions, on_topic)) # concurrently generate revision help - see RevisionTool()
+        summary.add_done_callback(lambda fut: fut.cancelled() or print(f"Revision Overview Result: {fut.result()}"))
         while True: 
-            next_msg = input(r"Next chat (ENTER to return): ")
+            next_msg = await asyncio.to_thread(input, r"Next chat (ENTER to return): ") # keep the loop free for the overview
             
             if not next_msg.strip():
                 summary.cancel()
+                
+                with suppress(asyncio.CancelledError): # let it cancel its runs and delete its threads
+                    await summary
+                    
                 break
             
-            status, resp = TeachingAgent._handle_run_step(
-                client=self.client, 
-                thread=thread, 
-                assistant=self.assistant, 
-                prompt=next_msg, 
-                logger=self.logger,
-            )
+            self.thread = await run_blocking(self._usable, self.thread)
+            resp = await run_blocking(self._print_stream, self.thread, next_msg) # tokens are printed as they arrive, on the session's (resumable) thread
+            ledger.touch(self.session_id)
             
-            if not status: # run call failed
-                continue
+            if resp:
+                self.logger.log(f"Run response: {resp}")
+                self.thread = await run_blocking(self._bound_context, self.thread)
+                self._autosave()
             
-            self.logger.log(f"Run response: {resp}")
-            print(f"TeachingAgent: {resp}\n")
+    def _print_stream(self, thread: Thread, prompt: str) -> str:
+        print("TeachingAgent: ", end="", flush=True)
+        
+        if (cached := self._cached_answer(thread, prompt)) is not None:
+            print(cached, end="\n\n", flush=True)
+            self._transcribe(prompt, cached)
+            return cached
+        
+        parts = []
+        
+        try:
+            for delta in TeachingAgent._stream_run_step(client=self.client, thread=thread, assistant=self.assistant, prompt=prompt, logger=self.logger, truncation_strategy=self._truncation()):
+                print(delta, end="", flush=True)
+                parts.append(delta)
+                
+        except TimeoutError: # an incomplete answer, never cached
+            print(" [timed out]\n")
+            return str()
+        
+        except RuntimeError: # failed, incomplete or cancelled run, likewise
+            print(" [reply cut off, please ask again]\n")
+            return str()
             
-    async def _session_streamlit(self, callback: Callable, num_faq_questions: Optional[int] = 5) -> None:
-        self.st_summary = asyncio.create_task(self.ra.prep_overview(num_faq_questions)) # concurrently generate revision help - see RevisionTool()
-        self.st_summary.add_done_callback(callback)
+        print("\n")
+        self._remember(prompt, "".join(parts))
+        self._transcribe(prompt, "".join(parts))
+        return "".join(parts)
+            
+    async def _session_streamlit(self, callback: Optional[Callable], num_faq_questions: Optional[int] = 5, on_topic: Optional[Callable[[str, dict[str, str]], None]] = None) -> None:
+        self.st_summary = asyncio.create_task(self.ra.prep_overview(num_faq_questions, on_topic=on_topic)) # concurrently generate revision help - see RevisionTool()
+        self.st_summary.add_done_callback(lambda task: task.cancelled() or task.exception() or self._autosave())
+        
+        if callback is not None:
+            self.st_summary.add_done_callback(callback)
         
-    def session(self, num_faq_questions: Optional[int] = 5) -> None: # synchronous wrapper
+    def session(self, num_faq_questions: Optional[int] = 5, on_topic: Optional[Callable[[str, dict[str, str]], None]] = None, ingestion: Optional[Ingestion] = None) -> None: # synchronous wrapper, pass an ingest() handle to chat while it indexes
         if self.in_session: # extra protection
             self.logger.log("Attempted call of another session, returning.", "warning")
             return 
         
         self.in_session = True
-        asyncio.run(self._session(num_faq_questions))
+        asyncio.run(self._session(num_faq_questions, on_topic, ingestion))
         self.in_session = False
         
-    def session_streamlit(self, callback: Callable) -> None:
+    async def _update_streamlit(self, callback: Optional[Callable], file_ids: list[str], num_faq_questions: Optional[int] = 5, on_topic: Optional[Callable[[str, dict[str, str]], None]] = None) -> None:
+        update = asyncio.create_task(self.ra.update_overview(file_ids, num_faq_questions, on_topic=on_topic)) # only the new files' topics - see RevisionTool.update_overview()
+        update.add_done_callback(lambda task: task.cancelled() or task.exception() or self._autosave())
+        
+        if callback is not None:
+            update.add_done_callback(callback)
+        
+        await update # a fraction of a full overview, so wait for it
+        
+    def session_streamlit(
+            self, 
+            callback: Optional[Callable] = None, 
+            on_topic: Optional[Callable[[str, dict[str, str]], None]] = None, 
+            new_files: Optional[list[str]] = None, 
+            worker: Optional[OverviewWorker] = None,
+        ) -> Optional[OverviewJob]:
+        """
+        Start the session overview, or fold files uploaded mid-session (ids from add_files/ingest) into it. With a worker 
+        the overview is built on the worker's long-lived loop and the OverviewJob is returned straight away for the page 
+        to poll, otherwise it is tied to this call's event loop.
+        """
+        
+        if worker is not None:
+            if self.in_session and not new_files:
+                self.logger.log("Attempted call of another session, returning.", "warning")
+                return None
+            
+            self._ensure_st_thread()
+            job = worker.submit(self, new_files if self.in_session else None, on_topic=on_topic)
+            self.in_session = True
+            
+            if callback is not None:
+                job.add_done_callback(callback)
+            
+            return job
+        
         if self.in_session:
+            if new_files: # uploaded mid-session (file ids from add_files), fold them into the current overview
+                asyncio.run(self._update_streamlit(callback, new_files, on_topic=on_topic))
+                return
+            
             self.logger.log("Attempted call of another session, returning.", "warning")
             return 
         
-        self.st_thread = self.client.beta.threads.create() # main thread for session
-        
+        self._ensure_st_thread()
         self.in_session = True
-        asyncio.run(self._session_streamlit(callback))
+        asyncio.run(self._session_streamlit(callback, on_topic=on_topic))
+        
+    def _ensure_st_thread(self) -> None:
+        if self.st_thread is None: # pooled agents already have one
+            self.st_thread = scheduler.call(Priority.INTERACTIVE, self.client.beta.threads.create) # main thread for session
+            ledger.record("thread", self.st_thread.id, owner=self.session_id)
+            self._autosave()
         
     def converse_streamlit(self, prompt: str) -> str:
-        assert self.in_session
+        self._ensure_st_thread() # no need to wait for the session overview (or files still indexing)
+        
+        if (cached := self._cached_answer(self.st_thread, prompt)) is not None:
+            self._transcribe(prompt, cached)
+            ledger.touch(self.session_id)
+            self.st_thread = self._bound_context(self.st_thread)
+            self._autosave()
+            return cached
         
+        self._settle_thread()
+        self.st_thread = self._usable(self.st_thread)
         status, resp = TeachingAgent._handle_run_step(
             client=self.client, 
             thread=self.st_thread, 
             assistant=self.assistant, 
             prompt=prompt, 
             logger=self.logger,
+            truncation_strategy=self._truncation(),
         )
         
         if not status: # run call failed
             return "Failed to generate response."
         
         self.logger.log(f"Run response: {resp}")
+        self._remember(prompt, resp)
+        self._transcribe(prompt, resp)
+        ledger.touch(self.session_id)
+        self.st_thread = self._bound_context(self.st_thread)
+        self._autosave()
         return resp        
         
+    def converse_streamlit_stream(self, prompt: str) -> Iterator[str]: # streaming converse_streamlit, e.g. for st.write_stream
+        self._ensure_st_thread() # no need to wait for the session overview (or files still indexing)
+        
+        if (cached := self._cached_answer(self.st_thread, prompt)) is not None:
+            yield cached
+            self._transcribe(prompt, cached)
+            ledger.touch(self.session_id)
+            self.st_thread = self._bound_context(self.st_thread)
+            self._autosave()
+            return
+        
+        self._settle_thread()
+        self.st_thread = self._usable(self.st_thread)
+        parts = []
+        
+        try:
+            for delta in TeachingAgent._stream_run_step(client=self.client, thread=self.st_thread, assistant=self.assistant, prompt=prompt, logger=self.logger, truncation_strategy=self._truncation()):
+                parts.append(delta)
+                yield delta
+            
+        except TimeoutError: # an incomplete answer, never cached
+            yield "\n\nTimed out, please ask again."
+            return
+        
+        except RuntimeError: # failed, incomplete or cancelled run, likewise
+            yield "\n\nThe reply was cut off, please ask again."
+            return
+        
+        if not parts: # run call failed
+            yield "Failed to generate response."
+            return
+            
+        self.logger.log(f"Run response: {''.join(parts)}")
+        self._remember(prompt, "".join(parts))
+        self._transcribe(prompt, "".join(parts))
+        ledger.touch(self.session_id)
+        self.st_thread = self._bound_context(self.st_thread)
+        self._autosave()
+        
+    def _corpus(self) -> Optional[str]: # answer cache key: this vector store's content, prompt, model and sampling
+        if not self.file_hashes or not cfg.get("answers", {}).get("enabled", True):
+            return None
+        
+        sampling = [self.config.temperature, self.config.top_p] # what chat runs inherit from the assistant, unless routed
+        return answers.corpus(self.file_hashes, self.prompt, self.config.model, *sampling, *filter(None, [route("chat")])) # prewarmed answers take the same route
+    
+    def _cached_answer(self, thread: Thread, prompt: str) -> Optional[str]:
+        """
+        Answer from the answer cache if this question (or a near-duplicate) was answered before against the same files.
+        The answer is also appended to the thread in the background, as a run would have, so follow-ups keep their context.
+        """
+        
+        if (corpus := self._corpus()) is None or (answer := answers.get(corpus, prompt)) is None:
+            return None
+        
+        self._settle_thread() # keep replies in order
+        self._pending_reply = submit_blocking(scheduler.call, Priority.INTERACTIVE, self.client.beta.threads.messages.create, thread_id=thread.id, role="assistant", content=answer)
+        self.logger.log(f"Answered from cache: {answer}")
+        
+        return answer
+    
+    def _remember(self, prompt: str, answer: str) -> None: # only for completed runs: partial replies raise first (see _stream_run_step)
+        if answer and (corpus := self._corpus()) is not None:
+            answers.put(corpus, prompt, answer)
+    
+    def _settle_thread(self) -> None: # wait for a cached reply to land before the next run on the thread
+        if self._pending_reply is None:
+            return
+        
+        try:
+            self._pending_reply.result()
+        except Exception as e: # the answer was still shown, the thread just misses it
+            self.logger.log(f"Could not add cached answer to thread: {e}", "warning")
+        
+        self._pending_reply = None
+    
+    async def prewarm_answers(self, questions: list[str], cancel: Optional[CancelScope] = None) -> int:
+        """
+        Answer questions (e.g. the FAQs from the overview) ahead of time at overview priority, each on a scratch thread,
+        and store the answers in the answer cache. Returns how many were added.
+        """
+        
+        if (corpus := self._corpus()) is None:
+            return 0
+        
+        todo = [question for question in dict.fromkeys(questions or []) if self_contained(question) and not answers.contains(corpus, question)]
+        cancel = CancelScope() if cancel is None else cancel
+        threads = []
+        
+        async def answer(question: str) -> bool:
+            thread = await run_blocking(scheduler.call, Priority.OVERVIEW, self.client.beta.threads.create)
+            ledger.record("thread", thread.id, owner=self.session_id)
+            threads.append(thread.id)
+            
+            status, resp = await TeachingAgent._handle_run_step_async(
+                client=self.client,
+                thread=thread,
+                assistant=self.assistant,
+                prompt=question,
+                logger=self.logger,
+                stage="chat_prewarm",
+                cancel=cancel,
+            )
+            return status and answers.put(corpus, question, resp)
+        
+        try:
+            added = sum(await asyncio.gather(*map(answer, todo)))
+        except asyncio.CancelledError:
+            cancel.cancel()
+            raise
+        except Exception as e: # never fails the overview it follows
+            self.logger.log(f"Pre-warming the answer cache failed: {e}", "warning")
+            return 0
+        finally:
+            await run_blocking(cancel.idle, 30) # runs stop at their next poll, then their threads can go
+            await run_blocking(delete_resources, self.client, [("thread", thread) for thread in threads])
+        
+        self.logger.log(f"Pre-warmed the answer cache with {added} of {len(todo)} question{'s' if len(todo) != 1 else ''}.", "debug")
+        return added
+    
+    def _truncation(self) -> Optional[dict]: # "truncate" mode: cap the history each chat run replays
+        if self.context.get("mode") != "truncate":
+            return None
+        
+        return {"type": "last_messages", "last_messages": self.context.get("last_messages", 10)}
+    
+    def _bound_context(self, thread: Thread) -> Thread:
+        """
+        Called after each chat turn. In "summarise" mode, once a thread reaches max_turns its history is rolled into a 
+        summary message on a fresh thread, which is returned in its place.
+        """
+        
+        if self.context.get("mode") != "summarise":
+            return thread
+        
+        self._settle_thread()
+        self._turns[thread.id] = self._turns.get(thread.id, 0) + 1
+        
+        if self._turns[thread.id] < self.context.get("max_turns", 20):
+            return thread
+        
+        status, summary = TeachingAgent._handle_run_step(
+            client=self.client,
+            thread=thread,
+            assistant=self.assistant,
+            prompt=prompts["chat_summary"].text,
+            logger=self.logger,
+            stage="chat_summary",
+        )
+        
+        if not status: # keep the long thread, try again next turn
+            return thread
+        
+        rolled = scheduler.call(
+            Priority.INTERACTIVE,
+            self.client.beta.threads.create,
+            messages=[{"role": "assistant", "content": f"Summary of the conversation so far:\n{summary}"}],
+        )
+        ledger.record("thread", rolled.id, owner=self.session_id)
+        delete_resources(self.client, [("thread", thread.id)], priority=Priority.INTERACTIVE)
+        del self._turns[thread.id]
+        self.logger.log(f"Rolled chat history into a summary after {self.context.get('max_turns', 20)} turns.", "debug")
+        
+        return rolled
+        
     @staticmethod
-    def _handle_run_step(*, client: OpenAI, thread: Thread, assistant: Assistant, prompt: str, logger: Optional[Logger] = None) -> list[bool, str]:
+    def _handle_run_step(
+            *, 
+            client: OpenAI, 
+            thread: Thread, 
+            assistant: Assistant, 
+            prompt: str, 
+            logger: Optional[Logger] = None, 
+            stage: str = "chat", 
+            queued_at: Optional[float] = None,
+            response_format: Optional[dict] = None,
+            truncation_strategy: Optional[dict] = None,
+            priority: Optional[Priority] = None,
+            cancel: Optional[CancelScope] = None,
+            timeout: Optional[float] = None,
+        ) -> list[bool, str]:
         if logger is None:
-            logger = Logger(_parent / "sessions.log")
+            logger = Logger()
         
-        run = client.beta.threads.runs.create_and_poll( # send message
-            thread_id=thread.id,
-            assistant_id=assistant.id,
-            instructions=prompt,
-        )
+        priority = STAGE_PRIORITY.get(stage, Priority.OVERVIEW) if priority is None else priority
+        timeout = cfg.get("timeouts", {}).get(stage) if timeout is None else timeout # seconds from creation, None/0 = no limit
         
-        if run.status == "completed":
-            logger.log(f"Run prompt=[{prompt if len(prompt) < 20 else prompt[:20]+'...'}] completed.", "debug")
-            return True, client.beta.threads.messages.list(
+        with cancel.running() if cancel is not None else nullcontext():
+            if cancel is not None and cancel.cancelled: # safe point: never start a run for cancelled work
+                cancel.abandon("runs_skipped")
+                return False, str()
+            
+            estimate = TeachingAgent._estimate_tokens(prompt)
+            overrides = route(stage) # this stage's model and sampling, if routed
+            started = time.perf_counter()
+            record = RunRecord(
+                stage=stage, 
+                assistant=getattr(assistant, "name", None) or assistant.id, 
+                status="queued", 
+                model=overrides.get("model", getattr(assistant, "model", None)),
+                queue_seconds=started - queued_at if queued_at else 0.0,
+            )
+            
+            run = scheduler.call( # send message
+                priority,
+                client.beta.threads.runs.create,
+                tokens=estimate,
                 thread_id=thread.id,
-            ).data[0].content[0].text.value # return assistant response & run status
+                assistant_id=assistant.id,
+                instructions=prompt,
+                **overrides,
+                **({"response_format": response_format} if response_format is not None else {}),
+                **({"truncation_strategy": truncation_strategy} if truncation_strategy is not None else {}),
+            )
+            
+            poll_interval = cfg.get("engine", {}).get("poll_interval", 0.5)
+            stopped = None # "cancelled" or "expired" if this side gave up on the run
+            
+            while run.status in ("queued", "in_progress", "cancelling"): # poll by hand so polls and server queue time can be measured
+                if cancel is not None:
+                    cancel.wait(poll_interval) # woken straight away by cancel()
+                else:
+                    time.sleep(poll_interval)
+                
+                expired = bool(timeout) and time.perf_counter() - started > timeout
+                
+                if expired or (cancel is not None and cancel.cancelled): # stop burning tokens server-side
+                    TeachingAgent._cancel_run(client, thread, run, priority, logger)
+                    stopped = "expired" if expired else "cancelled"
+                    
+                    if cancel is not None:
+                        cancel.abandon("runs_timed_out" if expired else "runs_cancelled")
+                    
+                    break
+                
+                polled = time.perf_counter()
+                was_queued = run.status == "queued"
+                run = scheduler.call(priority, client.beta.threads.runs.retrieve, thread_id=thread.id, run_id=run.id)
+                record.polls += 1
+                
+                if was_queued:
+                    record.server_queue_seconds += time.perf_counter() - polled + poll_interval
+            
+            record.status = stopped or run.status
+            record.run_seconds = time.perf_counter() - started
+            
+            if getattr(run, "usage", None) is not None:
+                record.prompt_tokens, record.completion_tokens = run.usage.prompt_tokens, run.usage.completion_tokens
+                scheduler.settle(record.prompt_tokens + record.completion_tokens - estimate)
+            
+            if record.status == "completed":
+                logger.log(f"Run prompt=[{prompt if len(prompt) < 20 else prompt[:20]+'...'}] completed.", "debug")
+                
+                fetch_started = time.perf_counter()
+                resp = scheduler.call( # just this run's reply, not a full page of history
+                    priority,
+                    client.beta.threads.messages.list,
+                    thread_id=thread.id,
+                    run_id=run.id,
+                    order="desc",
+                    limit=1,
+                ).data[0].content[0].text.value
+                record.fetch_seconds = time.perf_counter() - fetch_started
+                metrics.record(record)
+                
+                return True, resp # return assistant response & run status
+            
+            else:
+                metrics.record(record)
+                logger.log(f"Run prompt=[{prompt if len(prompt) < 20 else prompt[:20]+'...'}] failed with status: {record.status}.", "warning")
+                return False, str()        
+    
+    @staticmethod
+    def _cancel_run(client: OpenAI, thread: Thread, run: object, priority: Priority, logger: Logger) -> bool:
+        try:
+            scheduler.call(priority, client.beta.threads.runs.cancel, thread_id=thread.id, run_id=run.id)
+        except Exception as e: # already finished
+            logger.log(f"Could not cancel run {run.id}: {e}", "debug")
         
-        else:
+        return TeachingAgent._await_stopped(client, thread, run, priority, logger)
+    
+    @staticmethod
+    def _await_stopped(client: OpenAI, thread: Thread, run: Optional[object], priority: Priority, logger: Logger, wait: Optional[float] = None) -> bool:
+        """
+        Wait up to `wait` seconds ([timeouts] cancel) for a cancelled run to stop, as a thread takes no new run while one
+        is still cancelling. True once it has, else the thread is marked unsettled (see _settled). A run whose id isn't
+        known (None) can't be waited on, so its thread is unsettled straight away.
+        """
+        
+        if run is None:
+            TeachingAgent._unsettled.add(thread.id)
+            return False
+        
+        wait = cfg.get("timeouts", {}).get("cancel", 30) if wait is None else wait
+        poll_interval = cfg.get("engine", {}).get("poll_interval", 0.5)
+        deadline = time.perf_counter() + wait
+        
+        while True:
+            try:
+                status = scheduler.call(priority, client.beta.threads.runs.retrieve, thread_id=thread.id, run_id=run.id).status
+            except Exception as e:
+                logger.log(f"Could not check cancelled run {run.id}: {e}", "debug")
+                status = "unknown"
+            
+            if status not in ("queued", "in_progress", "cancelling", "requires_action", "unknown"): # cancelled, or finished first
+                return True
+            
+            if time.perf_counter() >= deadline:
+                logger.log(f"Run {run.id} was still {status} {wait:g}s after being cancelled.", "warning")
+                TeachingAgent._unsettled.add(thread.id)
+                return False
+            
+            time.sleep(poll_interval)
+    
+    @staticmethod
+    def _settled(thread: Thread) -> bool: # False (once) if a cancelled run may still be active on the thread, so it can't be reused
+        if thread.id in TeachingAgent._unsettled:
+            TeachingAgent._unsettled.discard(thread.id)
+            return False
+        
+        return True
+    
+    def _usable(self, thread: Thread) -> Thread: # the thread, or a new one for the chat if a cancelled run is stuck on it
+        if TeachingAgent._settled(thread):
+            return thread
+        
+        self.logger.log("A cancelled run is still active on the chat thread, continuing on a new thread.", "warning")
+        fresh = scheduler.call(Priority.INTERACTIVE, self.client.beta.threads.create)
+        ledger.record("thread", fresh.id, owner=self.session_id) # the old one is deleted with the session
+        self._autosave()
+        
+        return fresh
+        
+    @staticmethod
+    def _stream_run_step(
+            *, 
+            client: OpenAI, 
+            thread: Thread, 
+            assistant: Assistant, 
+            prompt: str, 
+            logger: Optional[Logger] = None, 
+            stage: str = "chat", 
+            truncation_strategy: Optional[dict] = None,
+            priority: Optional[Priority] = None,
+            timeout: Optional[float] = None,
+        ) -> Iterator[str]:
+        """
+        Streaming _handle_run_step: yields text deltas from the run event stream as they are generated.
+        
+        A run still going `timeout` seconds after it was requested ([timeouts] for its stage) is cancelled server-side and 
+        its stream closed, then TimeoutError is raised. A run that ends any other way than completed (failed, incomplete, 
+        cancelled) raises RuntimeError once its stream is done. Either way, whatever was yielded so far is an incomplete answer.
+        """
+        
+        if logger is None:
+            logger = Logger()
+        
+        priority = STAGE_PRIORITY.get(stage, Priority.OVERVIEW) if priority is None else priority
+        timeout = cfg.get("timeouts", {}).get(stage) if timeout is None else timeout # seconds from creation, None/0 = no limit
+        expired = threading.Event()
+        estimate = TeachingAgent._estimate_tokens(prompt)
+        overrides = route(stage)
+        started = time.perf_counter()
+        record = RunRecord(stage=stage, assistant=getattr(assistant, "name", None) or assistant.id, status="queued", model=overrides.get("model", getattr(assistant, "model", None)))
+        
+        with ExitStack() as stack:
+            stream = scheduler.call( # the request is only sent on __enter__, so open a fresh stream per attempt
+                priority,
+                lambda: stack.enter_context(client.beta.threads.runs.stream(
+                    thread_id=thread.id,
+                    assistant_id=assistant.id,
+                    instructions=prompt,
+                    **overrides,
+                    **({"truncation_strategy": truncation_strategy} if truncation_strategy is not None else {}),
+                )),
+                tokens=estimate,
+            )
+            
+            def expire() -> None: # stop burning tokens server-side, and unblock a stream that has stalled
+                expired.set()
+                
+                if (run := getattr(stream, "current_run", None)) is not None:
+                    with suppress(Exception): # already finished
+                        scheduler.call(priority, client.beta.threads.runs.cancel, thread_id=thread.id, run_id=run.id)
+                
+                with suppress(Exception):
+                    stream.close()
+                
+                TeachingAgent._await_stopped(client, thread, run, priority, logger)
+            
+            timer = None
+            
+            if timeout:
+                timer = threading.Timer(max(0.0, timeout - (time.perf_counter() - started)), expire)
+                timer.daemon = True
+                timer.start()
+                stack.callback(timer.cancel)
+            
+            try:
+                for delta in stream.text_deltas:
+                    if expired.is_set():
+                        break
+                    
+                    if record.first_token_seconds is None:
+                        record.first_token_seconds = time.perf_counter() - started
+                        
+                    yield delta
+                    
+            except Exception:
+                if not expired.is_set(): # otherwise just the closed stream
+                    raise
+            
+            if expired.is_set(): # the thread is only free once the cancelled run has stopped
+                timer.join()
+            
+            run = None if expired.is_set() else stream.get_final_run()
+        
+        record.status = "expired" if run is None else run.status
+        record.run_seconds = time.perf_counter() - started
+        
+        if run is None:
+            metrics.record(record)
+            logger.log(f"Run prompt=[{prompt if len(prompt) < 20 else prompt[:20]+'...'}] timed out after {timeout:g}s.", "warning")
+            raise TimeoutError(f"{stage} run timed out after {timeout:g}s")
+        
+        if getattr(run, "usage", None) is not None:
+            record.prompt_tokens, record.completion_tokens = run.usage.prompt_tokens, run.usage.completion_tokens
+            scheduler.settle(record.prompt_tokens + record.completion_tokens - estimate)
+            
+        metrics.record(record)
+            
+        if run.status != "completed":
             logger.log(f"Run prompt=[{prompt if len(prompt) < 20 else prompt[:20]+'...'}] failed with status: {run.status}.", "warning")
-            return False, str()        
+            raise RuntimeError(f"{stage} run ended with status: {run.status}")
+        
+        logger.log(f"Run prompt=[{prompt if len(prompt) < 20 else prompt[:20]+'...'}] completed.", "debug")
+        
+    @staticmethod
+    def _estimate_tokens(prompt: str) -> int: # charged against the scheduler's tokens per minute until run.usage is known
+        return len(prompt) // 4 + cfg.get("scheduler", {}).get("run_tokens", 2000)
+        
+    @staticmethod
+    async def _handle_run_step_async(**kwargs) -> list[bool, str]: # awaitable _handle_run_step, runs on the engine's bounded executor
+        return await run_blocking(TeachingAgent._handle_run_step, queued_at=time.perf_counter(), **kwargs)
 
     def close(self) -> None: # "end" instance
         self.in_session = False
-        
-        self.client.beta.assistants.delete(self.assistant.id)
         self.ra.close()
-        self.logger.log("Deleted assistants.")
-        self.client.beta.threads.delete(self.thread.id)
-        self.client.beta.vector_stores.delete(self.vector_store.id)
+        self._stop_autosave()
+        ledger.drop_snapshot(self.session_id) # nothing left to resume
+        TeachingAgent._live.pop(self.session_id, None)
+        
+        resources = [("assistant", self.assistant.id), ("vector_store", self.vector_store.id), ("thread", self.thread.id)]
+        resources += [("thread", self.st_thread.id)] if self.st_thread is not None else []
+        result = delete_resources(self.client, resources + ledger.owned(self.session_id)) # plus any threads left by chats and overviews
+        
+        if result["failed"]: # left in the ledger for sweep()
+            self.logger.log(f"Failed to delete {len(result['failed'])} resource{'s' if len(result['failed']) != 1 else ''}: {', '.join(result['failed'])}.", "warning")
+        else:
+            ledger.close_session(self.session_id)
+            
+        self.logger.log(f"Deleted {len(result['deleted'])} assistant, thread and vector store resource{'s' if len(result['deleted']) != 1 else ''}.")
         
         self.logger.log("Ended session. Create a new instance of TeachingAgent() for a new session.")
         
 class RevisionTool:
-    def __init__(self, base_assistant: Assistant, client: OpenAI, vector_store: VectorStore, logger: Logger) -> None:
+    def __init__(self, base_assistant: Assistant, client: OpenAI, vector_store: VectorStore, logger: Logger, file_hashes: Optional[dict[str, str]] = None) -> None:
         self.assistant = base_assistant
         self.client = client
         self.vector_store = vector_store
+        self.file_hashes = file_hashes if file_hashes is not None else {} # shared with TeachingAgent, updated by add_files
+        self._use_schema = True # cleared if the API rejects json_schema response formats for this assistant
+        self.abandoned = {} # work given up by the last cancelled or timed out prep_overview, by kind
+        self.overview = None # [topics, revision, questions] from the last prep_overview/update_overview, see update_overview
+        self.helpers = helpers # process-wide, so concurrent sessions share one create per helper
+        self.overview_cache = OverviewCache(
+            _parent / cfg.get("cache", {}).get("file_index", "cache.sqlite3"),
+            max_bytes=int(cfg.get("cache", {}).get("overview_max_mb", 64) * 2 ** 20),
+        )
 
         self.base_logger = logger
+        self.owner = getattr(logger, "session", None) # ledger session for temporary threads and vector stores
         self.log = lambda m, l="info": self.base_logger.log(f"[GEN_SUMMARY]: {m}", l)
         self.logger = type(
             "Logger[Overview]", 
@@ -194,124 +1085,288 @@ class RevisionTool:
             {"log": partial(self.log)}
         )() # a cool yet horrible use case for metaclasses`
         
-    async def _revision_guide(self, topics: dict[str, list[str]], log: Callable[[str, str], None]) -> dict[str, dict[str, str]]: # topic: {subtopic: content} 
+    async def _revision_guide(
+            self, 
+            topics: dict[str, list[str]], 
+            log: Callable[[str, str], None], 
+            workers: Optional[int] = None, 
+            on_topic: Optional[Callable[[str, dict[str, str]], None]] = None,
+            batch_tokens: Optional[int] = None,
+            cancel: Optional[CancelScope] = None,
+        ) -> dict[str, dict[str, str]]: # topic: {subtopic: content} 
         """
-        Generate a revision sheet for the provided content.        
+        Generate a revision sheet for the provided content.
+        
+        Topics are fanned out over up to `workers` concurrent runs (see _iter_revision_guide), optionally packed several 
+        to a run. If provided, on_topic is called with (topic, {subtopic: content}) as soon as each topic is ready.
         """
         
-        thread = self.client.beta.threads.create()
         revision_sheet = {}
         
-        with open(cfg["prompts"]["summary_gen"], "r") as f:
-            p = f.read()
+        async with aclosing(self._iter_revision_guide(topics, log, workers, batch_tokens, cancel)) as sheets: # cleans up as soon as this is cancelled
+            async for topic, content in sheets:
+                revision_sheet[topic] = content
+                
+                if on_topic is not None:
+                    on_topic(topic, content)
+        
+        return {topic: revision_sheet[topic] for topic in topics if topic in revision_sheet} # merge back in topic order
+    
+    async def _iter_revision_guide(
+            self, 
+            topics: dict[str, list[str]], 
+            log: Callable[[str, str], None], 
+            workers: Optional[int] = None, 
+            batch_tokens: Optional[int] = None,
+            cancel: Optional[CancelScope] = None,
+        ) -> AsyncIterator[tuple[str, dict[str, str]]]:
+        """
+        Yield (topic, {subtopic: content}) in order of completion. Each worker owns one thread, so at most `workers` runs
+        are in flight and no two runs share a thread.
+        
+        With batch_tokens (default overview.batch_tokens, 0 = off), topics are packed into multi-topic runs sized by an 
+        estimated output budget, replies are requested against a JSON schema and validated locally, and only the topics 
+        that failed are retried, in smaller batches.
+        
+        If the consumer stops early (e.g. the overview is cancelled), `cancel` is set so in-flight runs are cancelled
+        server-side, and the worker threads are only deleted once those runs have stopped.
+        """
+        
+        if not topics:
+            return
+        
+        cancel = cancel or CancelScope()
+        
+        overview_cfg = cfg.get("overview", {})
+        batch_tokens = overview_cfg.get("batch_tokens", 0) if batch_tokens is None else batch_tokens
+        retries = overview_cfg.get("batch_retries", 2) if batch_tokens else 0
+        units = RevisionTool._pack_topics(topics, batch_tokens) if batch_tokens else [{topic: subtopics} for topic, subtopics in topics.items()]
+        workers = max(1, min(workers or overview_cfg.get("revision_workers", 4), len(units)))
+        
+        threads = await asyncio.gather(*(run_blocking(scheduler.call, Priority.OVERVIEW, self.client.beta.threads.create) for _ in range(workers)))
+        ledger.record("thread", *(thread.id for thread in threads), owner=self.owner)
+        idle = asyncio.Queue() # free threads, doubles as the concurrency limit
+        
+        for thread in threads:
+            idle.put_nowait(thread)
+        
+        async def generate(unit: dict[str, list[str]], attempt: int) -> tuple[dict[str, list[str]], dict[str, dict[str, str]], int]:
+            if batch_tokens:
+                prompt = prompts.render("revision_batch", topics="\n\n".join(f"Topic: {t}\n\t{'\n\t- '.join(s)}" for t, s in unit.items()))
+            else:
+                topic, subtopics = next(iter(unit.items()))
+                prompt = prompts.render("revision_topic", topic=topic, subtopics="\n\t- ".join(subtopics))
             
-        for topic, subtopics in topics.items():
-            status, resp = TeachingAgent._handle_run_step(
-                client=self.client,
-                thread=thread,
-                assistant=self.assistant,
-                prompt=f"{p}\n\nBelow are the topic and list of subtopics you are to create a revision sheet for:\nTopic: {topic}\n\t{'\n\t- '.join(subtopics)}",
-                logger=self.logger,
-            )
+            thread = await idle.get()
             
-            if not status:
-                log(f"Failed to generate revision notes for topic '{topic}'.")
-                continue
-        
             try:
-                revision_sheet[topic] = json.loads(resp)[topic] # {subtopic: content}
+                status, resp = await TeachingAgent._handle_run_step_async(
+                    client=self.client,
+                    thread=thread,
+                    assistant=self.assistant,
+                    prompt=prompt,
+                    logger=self.logger,
+                    stage="revision",
+                    response_format=revision_schema(unit) if batch_tokens and self._use_schema else None,
+                    cancel=cancel,
+                )
+            except Exception as e:
+                status, resp = False, str()
+                log(f"Run for {', '.join(map(repr, unit))} raised: {e}", "warning")
                 
-            except:
-                log(f"Topic [{topic}] was returned in an incorrect format: {resp}", "debug")
+                if batch_tokens and self._use_schema and "response_format" in str(e): # not accepted alongside these tools, rely on local validation
+                    self._use_schema = False
+            finally:
+                if not TeachingAgent._settled(thread): # a cancelled run is still on it, so the next unit gets a new thread
+                    threads.append(thread := await run_blocking(scheduler.call, Priority.OVERVIEW, self.client.beta.threads.create))
+                    ledger.record("thread", thread.id, owner=self.owner)
+                
+                idle.put_nowait(thread)
+            
+            if not status:
+                log(f"Failed to generate revision notes for {', '.join(map(repr, unit))}.")
+                return unit, {}, attempt
             
-            log(f"Generated revision notes for topic '{topic}'.")
+            if batch_tokens:
+                sheet = validate_revision(resp, unit)
+            else:
+                try:
+                    sheet = {topic: json.loads(resp)[topic]} # {subtopic: content}
+                except:
+                    sheet = {}
+            
+            for topic in unit:
+                if topic in sheet:
+                    log(f"Generated revision notes for topic '{topic}'.")
+                else:
+                    log(f"Topic [{topic}] was returned in an incorrect format: {resp}", "debug")
+            
+            return unit, sheet, attempt
         
-        self.client.beta.threads.delete(thread.id)
+        pending = {asyncio.create_task(generate(unit, 0)) for unit in units}
+        remaining = set(topics) # neither yielded nor given up on
+        
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                
+                for task in done:
+                    unit, sheet, attempt = task.result()
+                    remaining -= sheet.keys()
+                    
+                    for topic, content in sheet.items():
+                        yield topic, content
+                    
+                    failed = {topic: subtopics for topic, subtopics in unit.items() if topic not in sheet}
+                    
+                    if failed and attempt < retries: # retry just the failures, split in two
+                        half = -(-len(failed) // 2)
+                        items = list(failed.items())
+                        
+                        for part in (items[:half], items[half:]):
+                            if part:
+                                pending.add(asyncio.create_task(generate(dict(part), attempt + 1)))
+                    elif failed:
+                        remaining -= failed.keys()
+                        
+                        if batch_tokens:
+                            log(f"Gave up on {', '.join(map(repr, failed))} after {attempt + 1} attempts.", "warning")
+        finally:
+            if pending: # only left running if the consumer stopped early
+                cancel.cancel()
+                cancel.abandon("topics", len(remaining))
+                
+                for task in pending:
+                    task.cancel()
+                
+                await run_blocking(cancel.idle, 60) # runs on these threads cancel themselves at their next poll
+                
+            await run_blocking(delete_resources, self.client, [("thread", thread.id) for thread in threads])
+    
+    @staticmethod
+    def _pack_topics(topics: dict[str, list[str]], batch_tokens: int) -> list[dict[str, list[str]]]: # greedy, in topic order
+        per_subtopic = cfg.get("overview", {}).get("tokens_per_subtopic", 350) # rough size of the notes for one subtopic
+        batches, batch, used = [], {}, 0
         
-        return revision_sheet
+        for topic, subtopics in topics.items():
+            estimate = per_subtopic * max(len(subtopics), 1)
+            
+            if batch and used + estimate > batch_tokens:
+                batches.append(batch)
+                batch, used = {}, 0
+                
+            batch[topic] = subtopics
+            used += estimate
+            
+        return batches + [batch] if batch else batches
         
-    async def _questions(self, topics: dict[str, list[str]], log: Callable[[str, str], None], n: int = 5) -> list[str]:
+    async def _questions(self, topics: dict[str, list[str]], log: Callable[[str, str], None], n: int = 5, cancel: Optional[CancelScope] = None, existing: Optional[list[str]] = None) -> list[str]:
         """
         Generate a list of n questions which learners may ask about the revision material.      
+        
+        Questions from `existing` (e.g. a previous overview's FAQs) are evaluated and ranked alongside the new ones.
         """
         
-        with open(cfg["prompts"]["gen_questions"], "r") as f:
-            self.faq_assistant = self.client.beta.assistants.create(
-                name="FAQ Generator",
-                instructions=f.read(),
-                tools=[{"type": "file_search"}],
-                model=cfg["openai"]["model"],
-                tool_resources={
-                    "file_search": {
-                        "vector_store_ids": [self.vector_store.id]
-                    }
-                }
-            )
+        cancel = cancel or CancelScope()
         
-        with open(cfg["prompts"]["pick_questions"], "r") as f:
-            self.selector_assistant = self.client.beta.assistants.create( 
-                name="FAQ Selector",
-                instructions=f.read().replace("[NUM_OF_QUESTIONS]", str(n)),
-                tools=[{"type": "file_search"}],
-                model=cfg["openai"]["model"],
-                tool_resources={
-                    "file_search": {
-                        "vector_store_ids": [self.vector_store.id]
-                    }
-                }
-            )
+        generator = dict(
+            name="FAQ Generator",
+            instructions=prompts["gen_questions"].text,
+            model=cfg["openai"]["model"],
+            tools=[{"type": "file_search"}],
+        )
+        selector = dict(
+            name="FAQ Selector",
+            instructions=prompts.render("pick_questions", num_of_questions=n),
+            model=cfg["openai"]["model"],
+            tools=[{"type": "file_search"}],
+        )
+        await asyncio.gather( # reused across overviews and sessions, see HelperRegistry
+            run_blocking(self.helpers.get, self.client, **generator),
+            run_blocking(self.helpers.get, self.client, **selector),
+        )
             
         log("Initialised question creation assistants.")
         
-        thread = self.client.beta.threads.create()
-        
-        # 1: Generate questions
-        status, all_qs = TeachingAgent._handle_run_step(
-            client=self.client,
-            thread=thread,
-            assistant=self.faq_assistant,
-            prompt=f"Generate {n} questions each for the following topics: {', '.join(topics.keys())}.",
-            logger=self.logger,
+        thread = await run_blocking( # helpers have no vector store of their own, so attach it to the thread
+            scheduler.call,
+            Priority.OVERVIEW,
+            self.client.beta.threads.create,
+            tool_resources={
+                "file_search": {
+                    "vector_store_ids": [self.vector_store.id]
+                }
+            },
         )
-
-        if not status:
-            return list()
-        
-        log("Generated initial questions.")
-        
-        # 2: Evaluate
+        ledger.record("thread", thread.id, owner=self.owner)
+        stages = 0 # FAQ runs finished, of 3
         
-        with open(cfg["prompts"]["eval_questions"], "r") as f:
-            status, feedback = TeachingAgent._handle_run_step(
+        try:
+            # 1: Generate questions
+            status, all_qs = await self._helper_step(
+                generator,
+                thread=thread,
+                prompt=prompts.render("faq_generate", n=n, topics=", ".join(topics.keys())),
+                logger=self.logger,
+                stage="faq_generate",
+                cancel=cancel,
+            )
+
+            if not status:
+                return list()
+            
+            stages += 1
+            log("Generated initial questions.")
+            
+            if existing:
+                all_qs = f"{all_qs}\n\nPreviously selected questions: {json.dumps(existing)}"
+            
+            # 2: Evaluate
+            
+            status, feedback = await TeachingAgent._handle_run_step_async(
                 client=self.client,
                 thread=thread,
                 assistant=self.assistant,
-                prompt=f"{f.read()}. The questions provided are {all_qs}",
+                prompt=prompts.render("faq_evaluate", questions=all_qs),
                 logger=self.logger,
+                stage="evaluate",
+                cancel=cancel,
             )
-        
-        if not status:
-            return list()
-        
-        log("Evaluated initial questions.")
-        
-        # 3: Finalise
-        
-        with open(cfg["prompts"]["pick_questions"], "r") as f:
-            status, qs = TeachingAgent._handle_run_step(
-                client=self.client,
+            
+            if not status:
+                return list()
+            
+            stages += 1
+            log("Evaluated initial questions.")
+            
+            # 3: Finalise
+            
+            status, qs = await self._helper_step(
+                selector,
                 thread=thread,
-                assistant=self.selector_assistant,
-                prompt=f"{f.read()}\n\nQuestions: {all_qs}\n\nFeedback: {feedback}",
+                prompt=prompts.render("faq_select", num_of_questions=n, questions=all_qs, feedback=feedback),
                 logger=self.logger,
+                stage="select",
+                cancel=cancel,
             )
+            
+            if not status:
+                return list()
+            
+            stages += 1
+            
+        except asyncio.CancelledError: # the run on this thread keeps going server-side unless told otherwise
+            cancel.cancel()
+            raise
         
-        self.client.beta.threads.delete(thread.id)
+        finally:
+            if cancel.cancelled:
+                cancel.abandon("faq_stages", 3 - stages)
+                await run_blocking(cancel.idle, 60) # don't delete the thread under a run that is still being cancelled
+            
+            await run_blocking(delete_resources, self.client, [("thread", thread.id)])
 
         try:
-            if not status:
-                raise
-            
             questions = json.loads(qs)["Questions"] # ensure correct format
             log("Successfully generated FAQs.")
             
@@ -319,58 +1374,350 @@ class RevisionTool:
             
         except:
             return list()
-        
-    async def prep_overview(self, num_faq_questions: Optional[int] = 5) -> list[dict[str, list[str]], str, list[str]]:
+    
+    async def _topic_list(
+            self, 
+            cancel: Optional[CancelScope] = None, 
+            vector_store: Optional[VectorStore] = None, 
+            existing: Optional[dict[str, list[str]]] = None,
+            ready: Optional[Awaitable] = None,
+        ) -> Optional[dict[str, list[str]]]: # topic: [subtopic, ...]
         """
-        Runs 2 pipelines concurrently:
-        
-        Builds topic list
-        1) Find 3 questions per topic > compile top n questions
-        2) Extract bullet points from each subtopic > compile into a revision sheet
+        Topics in this tool's vector store or, if given, another one (e.g. just the files added since the last overview). 
+        Other stores are searched by a shared helper assistant on a thread carrying the store, told about `existing` 
+        topics so overlapping ones keep their names. The run waits for `ready` (e.g. the store still indexing), which 
+        overlaps with setting up the thread and helper.
         """
         
-        overview_thread = self.client.beta.threads.create()
-
-        # Step 1: generate list of topics and subtopics in json format 
-        # potential TODO: add a quality assurance agent for formatting
+        cancel = cancel or CancelScope()
+        prompt = prompts["topics"].text if not existing else prompts.render("topics_incremental", existing=json.dumps(existing))
+        extractor = None if vector_store is None else dict(
+            name="Topic Extractor",
+            instructions=prompts["topics"].text,
+            model=cfg["openai"]["model"],
+            tools=[{"type": "file_search"}],
+        )
         
-        with open(cfg["prompts"]["topics"], "r") as f:
-            topic_prompt = f.read()
+        async def new_thread() -> Thread:
+            thread = await run_blocking(
+                scheduler.call, 
+                Priority.OVERVIEW, 
+                self.client.beta.threads.create,
+                **({"tool_resources": {"file_search": {"vector_store_ids": [vector_store.id]}}} if vector_store is not None else {}),
+            )
+            ledger.record("thread", thread.id, owner=self.owner)
+            return thread
         
-        status, resp = TeachingAgent._handle_run_step( # generate list of topics from dataset
-            client=self.client, 
-            thread=overview_thread,
-            assistant=self.assistant, 
-            prompt=topic_prompt, 
-            logger=self.logger,
+        overview_thread, *_ = await asyncio.gather(
+            new_thread(),
+            *([run_blocking(self.helpers.get, self.client, **extractor)] if extractor is not None else []), # verified now, _helper_step then finds it
+            *([ready] if ready is not None else []),
         )
+
+        # potential TODO: add a quality assurance agent for formatting
         
-        self.client.beta.threads.delete(thread_id=overview_thread.id)
+        try:
+            status, resp = await self._helper_step( # generate list of topics from dataset
+                extractor,
+                thread=overview_thread,
+                prompt=prompt, 
+                logger=self.logger,
+                stage="topics",
+                cancel=cancel,
+            )
+        except asyncio.CancelledError:
+            cancel.cancel()
+            cancel.abandon("topic_list")
+            raise
+        finally:
+            if cancel.cancelled:
+                await run_blocking(cancel.idle, 60)
+            
+            await run_blocking(delete_resources, self.client, [("thread", overview_thread.id)])
         
         try:
             if not status:
                 raise
             
-            topics = json.loads(resp)
+            return json.loads(resp)
         except:
-            self.log("Failed to generate topics from dataset.", "warning")
-            return dict(), str(), list()
+            return None
+        
+    async def prep_overview(
+            self, 
+            num_faq_questions: Optional[int] = 5, 
+            revision_workers: Optional[int] = None, 
+            on_topic: Optional[Callable[[str, dict[str, str]], None]] = None,
+            use_cache: bool = True,
+            batch_tokens: Optional[int] = None,
+            timeout: Optional[float] = None,
+            on_stage: Optional[Callable[[str, object], None]] = None,
+        ) -> list[dict[str, list[str]], str, list[str]]:
+        """
+        Runs 2 pipelines concurrently (both await the run engine, so wall-clock time is close to the longer one):
+        
+        Builds topic list
+        1) Find 3 questions per topic > compile top n questions
+        2) Extract bullet points from each subtopic > compile into a revision sheet (topics fanned out over revision_workers, 
+           packed into multi-topic runs if batch_tokens is set, each finished topic is passed to on_topic straight away)
+        
+        Results are memoised on disk (see _overview_key), so an unchanged corpus and prompt set returns straight away.
+        
+        Cancelling the task (or hitting `timeout` seconds, after which the topics finished so far are returned) stops 
+        at the next safe point: no new runs start, in-flight runs are cancelled server-side and temporary threads are 
+        deleted. What was given up is logged and left in self.abandoned. Individual runs are also bounded by the 
+        per-stage [timeouts] config.
+        
+        on_stage, if provided, is called with ("topics", topics) once the topic list exists and ("questions", questions) 
+        as soon as the FAQs are ready, before the revision sheet has necessarily finished.
+        """
+        
+        key = self._overview_key(num_faq_questions) if use_cache and self.file_hashes else None
+        
+        if key is not None and (cached := self.overview_cache.get(key)) is not None:
+            topics, revision, questions = cached
+            self.log("Loaded overview from cache.")
+            
+            if on_stage is not None:
+                on_stage("topics", topics)
             
-        self.log("Created topic list.")
+            if on_topic is not None:
+                for topic, content in revision.items():
+                    on_topic(topic, content)
+            
+            if on_stage is not None:
+                on_stage("questions", questions)
+            
+            self.overview = [topics, revision, questions]
+            return topics, revision, questions
         
-        # Step 2: pass topics into pipelines
+        cancel = CancelScope()
+        topics, finished = dict(), dict() # finished: topics from the revision pipeline so far, returned on timeout
         
-        revision, questions = await asyncio.gather(
-            self._revision_guide(topics, self.log),
-            self._questions(topics, self.log, num_faq_questions)
-        )
+        def collect(topic: str, content: dict[str, str]) -> None:
+            finished[topic] = content
+            
+            if on_topic is not None:
+                on_topic(topic, content)
+        
+        try:
+            async with asyncio.timeout(timeout):
+                # Step 1: generate list of topics and subtopics in json format 
+                
+                if (topics := await self._topic_list(cancel)) is None:
+                    self.log("Failed to generate topics from dataset.", "warning")
+                    return dict(), str(), list()
+                    
+                self.log("Created topic list.")
+                
+                if on_stage is not None:
+                    on_stage("topics", topics)
+                
+                # Step 2: pass topics into pipelines
+                
+                revision, questions = await asyncio.gather(
+                    self._revision_guide(topics, self.log, revision_workers, collect, batch_tokens, cancel),
+                    RevisionTool._staged(self._questions(topics, self.log, num_faq_questions, cancel), "questions", on_stage),
+                )
+                
+        except TimeoutError:
+            self._report_abandoned(cancel, f"timed out after {timeout:g}s")
+            self.overview = [topics, {topic: finished[topic] for topic in topics if topic in finished}, list()] # update_overview, even without new files, fills in the rest
+            return self.overview
+        
+        except asyncio.CancelledError:
+            cancel.cancel()
+            self._report_abandoned(cancel, "cancelled")
+            raise
+        
+        finally:
+            self.abandoned = dict(cancel.abandoned) # e.g. {"topics": 3, "faq_stages": 2, "runs_cancelled": 4}
+        
+        if key is not None and revision and questions: # don't memoise partial failures
+            self.overview_cache.put(key, [topics, revision, questions])
+        
+        self.overview = [topics, revision, questions]
 
         return topics, revision, questions
     
-    def close(self) -> None:
+    async def update_overview(
+            self, 
+            file_ids: list[str], 
+            num_faq_questions: Optional[int] = 5, 
+            revision_workers: Optional[int] = None, 
+            on_topic: Optional[Callable[[str, dict[str, str]], None]] = None,
+            batch_tokens: Optional[int] = None,
+            timeout: Optional[float] = None,
+            on_stage: Optional[Callable[[str, object], None]] = None,
+        ) -> list[dict[str, list[str]], str, list[str]]:
+        """
+        Fold newly added files (ids returned by TeachingAgent.add_files) into the last overview instead of recomputing it:
+        
+        Topics are extracted from the new files only (indexed into a temporary vector store) and merged into the previous 
+        topic list. Revision notes are regenerated just for new topics, topics that gained subtopics and topics that had 
+        no notes, and FAQs are generated for those topics and re-ranked together with the previous ones. Without new files
+        it just completes an overview a timed out prep_overview left partial. Falls back to prep_overview if there is no 
+        previous overview. Cancellation, timeout and on_stage behave as in prep_overview (on_stage gets the merged topic 
+        list).
+        
+        file_search can't be limited to some of a vector store's files, so the new files are indexed a second time into 
+        the temporary store. Missing notes are generated and the topic run's thread and helper set up while it indexes, 
+        and it is deleted while the notes and FAQs are generated, so only its creation is on top of a topic run. That 
+        pays off for a few files added to a large corpus; when most of the corpus is new, prep_overview costs about the same.
+        """
+        
+        if self.overview is None or not self.overview[0]:
+            return await self.prep_overview(num_faq_questions, revision_workers, on_topic, batch_tokens=batch_tokens, timeout=timeout, on_stage=on_stage)
+        
+        topics, revision, questions = self.overview
+        missing = {topic: subtopics for topic, subtopics in topics.items() if topic not in revision} # never generated, e.g. after a timeout
+        
+        if not file_ids and not missing and questions:
+            return topics, revision, questions
+        
+        cancel = CancelScope()
+        deletions = [] # the temporary store's, off the critical path
+        
+        async def topics_added() -> Optional[tuple[dict[str, list[str]], dict[str, list[str]]]]: # (merged, new or changed), None if extraction failed
+            if not file_ids:
+                return topics, {}
+            
+            delta_store = await run_blocking(scheduler.call, Priority.OVERVIEW, self.client.beta.vector_stores.create, chunking_strategy=CHUNKING_STRATEGY, name="textbook-delta")
+            ledger.record("vector_store", delta_store.id, owner=self.owner)
+            
+            try:
+                indexed = run_blocking(scheduler.call, Priority.OVERVIEW, self.client.beta.vector_stores.file_batches.create_and_poll, vector_store_id=delta_store.id, file_ids=file_ids)
+                
+                if (new_topics := await self._topic_list(cancel, delta_store, topics, ready=indexed)) is None:
+                    return None
+                
+                return RevisionTool._merge_topics(topics, new_topics)
+            
+            finally: # only the topic run needs it, the files stay in the main store
+                deletions.append(asyncio.ensure_future(run_blocking(delete_resources, self.client, [("vector_store", delta_store.id)])))
+        
+        async def update() -> Optional[tuple[dict[str, list[str]], dict[str, str], list[str]]]: # (merged topics, notes for changed ones, FAQs)
+            if (added := await topics_added()) is None:
+                self.log("Failed to generate topics from the new files.", "warning")
+                return None
+            
+            merged, changed = added
+            delta = changed | missing
+            
+            if file_ids and on_stage is not None:
+                on_stage("topics", merged)
+            
+            self.log(f"{len(delta)} of {len(merged)} topics are new, changed or missing notes.")
+            
+            if not delta and questions:
+                return merged, {}, questions
+            
+            return merged, *await asyncio.gather(
+                self._revision_guide(changed, self.log, revision_workers, on_topic, batch_tokens, cancel) if changed else asyncio.sleep(0, {}),
+                RevisionTool._staged(self._questions(delta or merged, self.log, num_faq_questions, cancel, existing=questions), "questions", on_stage),
+            )
+        
+        try:
+            async with asyncio.timeout(timeout):
+                backfill, updated = await asyncio.gather( # notes the last overview is missing don't wait for the new files' topics
+                    self._revision_guide(missing, self.log, revision_workers, on_topic, batch_tokens, cancel) if missing else asyncio.sleep(0, {}),
+                    update(),
+                )
+                
+        except TimeoutError:
+            self._report_abandoned(cancel, f"update timed out after {timeout:g}s")
+            return topics, revision, questions
+        
+        except asyncio.CancelledError:
+            cancel.cancel()
+            self._report_abandoned(cancel, "update cancelled")
+            raise
+        
+        finally:
+            self.abandoned = dict(cancel.abandoned)
+            
+            if deletions:
+                await asyncio.gather(*deletions)
+        
+        merged, notes, new_questions = updated or (topics, {}, questions) # failed topic extraction still keeps the backfilled notes
+        notes = backfill | notes # a missing topic that also changed takes its fresh notes
+        revision = {topic: notes[topic] if topic in notes else revision[topic] for topic in merged if topic in notes or topic in revision}
+        questions = new_questions or questions # keep the old FAQs if re-ranking failed
+        self.overview = [merged, revision, questions]
+        
+        if self.file_hashes and len(revision) == len(merged) and questions: # the same result a full prep_overview would memoise
+            self.overview_cache.put(self._overview_key(num_faq_questions), [merged, revision, questions])
+        
+        return merged, revision, questions
+    
+    @staticmethod
+    async def _staged(stage: Awaitable[T], name: str, on_stage: Optional[Callable[[str, object], None]]) -> T: # report a pipeline's result as soon as it finishes
+        result = await stage
+        
+        if on_stage is not None:
+            on_stage(name, result)
+        
+        return result
+    
+    @staticmethod
+    def _merge_topics(topics: dict[str, list[str]], new_topics: dict[str, list[str]]) -> tuple[dict[str, list[str]], dict[str, list[str]]]: # (merged, new or changed)
+        merged, delta = {topic: list(subtopics) for topic, subtopics in topics.items()}, {}
+        
+        for topic, subtopics in new_topics.items():
+            known = merged.setdefault(topic, [])
+            added = [subtopic for subtopic in subtopics if subtopic not in known]
+            
+            if added or topic not in topics:
+                known.extend(added)
+                delta[topic] = known
+        
+        return merged, delta
+    
+    def _report_abandoned(self, cancel: CancelScope, reason: str) -> None:
+        abandoned = ", ".join(f"{n} {kind.replace('_', ' ')}" for kind, n in cancel.abandoned.items() if n) or "nothing in flight"
+        self.log(f"Overview {reason}, abandoned: {abandoned}.", "warning")
+    
+    def _overview_key(self, num_faq_questions: Optional[int]) -> str: # corpus content + every prompt the pipeline uses + models and sampling + n
+        texts = [prompts[name].text for name in ("topics", "summary_gen", "gen_questions", "eval_questions", "pick_questions")]
+        sampling = [getattr(self.assistant, "temperature", None), getattr(self.assistant, "top_p", None)] # helpers use the API defaults
+        routes = {stage: overrides for stage in ("topics", "revision", "faq_generate", "evaluate", "select") if (overrides := route(stage))}
+        
+        return OverviewCache.key(self.file_hashes, texts, self.assistant.model, cfg["openai"]["model"], num_faq_questions, sampling, routes)
+    
+    async def _helper_step(self, helper: Optional[dict], **kwargs) -> list[bool, str]:
+        """
+        _handle_run_step_async on the shared helper assistant described by `helper` (HelperRegistry.get arguments), or on 
+        this tool's own assistant if None. A helper deleted by another process's gc() since it was last checked 404s, 
+        so it is evicted, recreated and the run retried once.
+        """
+        
+        if helper is None:
+            return await TeachingAgent._handle_run_step_async(client=self.client, assistant=self.assistant, **kwargs)
+        
+        assistant = await run_blocking(self.helpers.get, self.client, **helper)
+        
+        try:
+            return await TeachingAgent._handle_run_step_async(client=self.client, assistant=assistant, **kwargs)
+        except Exception as e:
+            if getattr(e, "status_code", None) != 404:
+                raise
+            
+            self.logger.log(f"Helper assistant {helper['name']} was deleted elsewhere, recreating it.", "warning")
+            self.helpers.evict(assistant)
+            assistant = await run_blocking(self.helpers.get, self.client, **helper)
+            
+            return await TeachingAgent._handle_run_step_async(client=self.client, assistant=assistant, **kwargs)
+        
+    def invalidate_overview(self, num_faq_questions: Optional[int] = None) -> None: # drop the cached overview for this corpus, or every cached overview
+        if num_faq_questions is None:
+            self.overview_cache.invalidate()
+        else:
+            self.overview_cache.invalidate(self._overview_key(num_faq_questions))
+    
+    def close(self) -> None: # helper assistants outlive the session, only ones past their TTL are deleted
         try:
-            self.client.beta.assistants.delete(self.faq_assistant.id)
-            self.client.beta.assistants.delete(self.selector_assistant.id)
+            if (expired := self.helpers.gc(self.client)):
+                self.logger.log(f"Deleted {expired} expired helper assistant{'s' if expired != 1 else ''}.")
             
         except:
-            self.logger.log("Failed to delete helper assistants (likely from failed or interrupted execution of summary generation).")
\ No newline at end of file
+            self.logger.log("Failed to garbage collect helper assistants.", "warning")
\ No newline at end of file
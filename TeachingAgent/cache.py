@@ -0,0 +1,125 @@
+from contextlib import closing
+from pathlib import Path
+from typing import IO, Iterable, Optional
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+def digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def digest_file(f: IO[bytes], chunk_size: int = 2 ** 20) -> tuple[str, int]: # (sha256, size) in constant memory, rewinds f
+    sha256, size = hashlib.sha256(), 0
+    f.seek(0)
+
+    while chunk := f.read(chunk_size):
+        sha256.update(chunk)
+        size += len(chunk)
+
+    f.seek(0)
+    return sha256.hexdigest(), size
+
+class FileIndex:
+    """
+    Persistent map of file content (SHA-256) -> OpenAI file ID and indexing status, so identical files are only uploaded once.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = str(path)
+        self._lock = threading.Lock()
+
+        with closing(self._connect()) as db, db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "sha256 TEXT PRIMARY KEY, file_id TEXT NOT NULL, name TEXT, size INTEGER, status TEXT, updated REAL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS files_by_id ON files (file_id)")
+
+    def _connect(self) -> sqlite3.Connection: # short-lived connections, safe to use from any thread
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, sha256: str) -> Optional[dict[str, str | int]]:
+        with closing(self._connect()) as db:
+            row = db.execute("SELECT file_id, name, size, status FROM files WHERE sha256 = ?", (sha256, )).fetchone()
+
+        if row is None:
+            return None
+
+        return dict(zip(("file_id", "name", "size", "status"), row))
+
+    def put(self, sha256: str, file_id: str, name: str, size: int, status: str = "uploaded") -> None:
+        with self._lock, closing(self._connect()) as db, db:
+            db.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                (sha256, file_id, name, size, status, time.time()),
+            )
+
+    def set_status(self, file_id: str, status: str) -> None:
+        with self._lock, closing(self._connect()) as db, db:
+            db.execute("UPDATE files SET status = ?, updated = ? WHERE file_id = ?", (status, time.time(), file_id))
+
+    def drop(self, sha256: str) -> None:
+        with self._lock, closing(self._connect()) as db, db:
+            db.execute("DELETE FROM files WHERE sha256 = ?", (sha256, ))
+
+class OverviewCache:
+    """
+    On-disk memo of RevisionTool.prep_overview results with size-based LRU eviction. Other JSON values (e.g. extracted
+    PDF text by file hash) can be kept in their own `table`.
+    """
+
+    def __init__(self, path: str | Path, max_bytes: int = 64 * 2 ** 20, table: str = "overviews") -> None:
+        self.path = str(path)
+        self.max_bytes = max_bytes
+        self.table = table
+        self._lock = threading.Lock()
+
+        with closing(self._connect()) as db, db:
+            db.execute(f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER, accessed REAL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def key(file_hashes: Iterable[str], prompts: Iterable[str], *params: object) -> str: # corpus + prompt contents + model/n etc.
+        h = hashlib.sha256()
+
+        for part in (*sorted(file_hashes), "\0", *prompts, "\0", *map(repr, params)):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+
+        return h.hexdigest()
+
+    def get(self, key: str) -> Optional[object]:
+        with self._lock, closing(self._connect()) as db, db:
+            row = db.execute(f"SELECT value FROM {self.table} WHERE key = ?", (key, )).fetchone()
+
+            if row is None:
+                return None
+
+            db.execute(f"UPDATE {self.table} SET accessed = ? WHERE key = ?", (time.time(), key))
+
+        return json.loads(row[0])
+
+    def put(self, key: str, value: object) -> None:
+        data = json.dumps(value)
+
+        with self._lock, closing(self._connect()) as db, db:
+            db.execute(f"INSERT OR REPLACE INTO {self.table} VALUES (?, ?, ?, ?)", (key, data, len(data), time.time()))
+            total = db.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+
+            for old_key, size in db.execute(f"SELECT key, size FROM {self.table} ORDER BY accessed").fetchall(): # evict least recently used
+                if total <= self.max_bytes or old_key == key:
+                    break
+
+                db.execute(f"DELETE FROM {self.table} WHERE key = ?", (old_key, ))
+                total -= size
+
+    def invalidate(self, key: Optional[str] = None) -> None: # one entry, or everything if no key is given
+        with self._lock, closing(self._connect()) as db, db:
+            if key is None:
+                db.execute(f"DELETE FROM {self.table}")
+            else:
+                db.execute(f"DELETE FROM {self.table} WHERE key = ?", (key, ))
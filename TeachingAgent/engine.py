@@ -0,0 +1,78 @@
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from typing import Callable, Iterator, Optional, TypeVar
+import asyncio
+import threading
+from .utils import cfg
+
+T = TypeVar("T")
+
+_executor = None # bounded pool shared by every pipeline, sdk calls are blocking - created on first use
+_lock = threading.Lock()
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=cfg.get("engine", {}).get("max_workers", 16),
+                thread_name_prefix="RunEngine",
+            )
+            
+    return _executor
+
+async def run_blocking(fn: Callable[..., T], /, *args, **kwargs) -> T:
+    """
+    Await a blocking call (e.g. client.beta.threads.runs.create_and_poll) without blocking the event loop.
+    """
+
+    return await asyncio.get_running_loop().run_in_executor(_get_executor(), partial(fn, *args, **kwargs))
+
+def submit_blocking(fn: Callable[..., T], /, *args, **kwargs) -> Future[T]: # the same, from synchronous code that doesn't need to wait
+    return _get_executor().submit(fn, *args, **kwargs)
+
+class CancelScope:
+    """
+    Cooperative cancellation for blocking runs on the engine's executor, which cancelling an asyncio task can't interrupt.
+    Runs started under a scope check it before starting and on every poll (see TeachingAgent._handle_run_step), cancelling
+    themselves server-side once it is set. `abandoned` counts the work given up, by kind.
+    """
+
+    def __init__(self) -> None:
+        self.abandoned = Counter()
+        self._event = threading.Event()
+        self._cond = threading.Condition()
+        self._active = 0 # blocking runs currently inside running()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    def wait(self, seconds: float) -> bool: # sleep between polls, cut short (returning True) by cancel()
+        return self._event.wait(seconds)
+
+    def abandon(self, kind: str, n: int = 1) -> None:
+        with self._cond:
+            self.abandoned[kind] += n
+
+    @contextmanager
+    def running(self) -> Iterator[None]:
+        with self._cond:
+            self._active += 1
+
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify_all()
+
+    def idle(self, timeout: Optional[float] = None) -> bool: # block until every run in the scope has stopped
+        with self._cond:
+            return self._cond.wait_for(lambda: self._active == 0, timeout)
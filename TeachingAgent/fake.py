@@ -0,0 +1,394 @@
+from collections import Counter, deque
+from types import SimpleNamespace
+from typing import Callable, Iterator, Optional
+import itertools
+import json
+import random
+import re
+import threading
+import time
+
+class FakeOpenAI:
+    """
+    Offline stand-in for the subset of the OpenAI client this package uses (client.beta threads/runs/messages, vector stores,
+    file batches, assistants, and client.files). Every call sleeps for the configured latency and is counted, so
+    benchmarks can report round trips and the concurrency actually achieved.
+
+    latency: seconds per call, or a dict of {endpoint prefix: seconds} with an optional "default" (e.g. {"runs": 1.0}).
+    failure_rate: probability that a run ends with status "failed".
+    replies: callable(prompt) -> reply text, defaults to canned JSON matching the prompts in prompts/.
+    context_latency: extra seconds per thread message a run replays (after any truncation_strategy), to model history growth.
+    rate_limit: (requests, seconds) - calls beyond that many in any sliding window raise FakeRateLimitError (HTTP 429).
+    model_latency: {model: seconds per run} for runs on that model (the run's model override, else its assistant's), in
+    place of the "runs" latency, e.g. to compare stage routes.
+    cancel_latency: seconds a cancelled run stays "cancelling". Like the API, a thread rejects new runs (HTTP 400) while
+    one is still active on it.
+    """
+
+    def __init__(self, latency: float | dict[str, float] = 0.05, failure_rate: float = 0.0, replies: Optional[Callable[[str], str]] = None, seed: Optional[int] = None, context_latency: float = 0.0, rate_limit: Optional[tuple[int, float]] = None, model_latency: Optional[dict[str, float]] = None, cancel_latency: float = 0.1) -> None:
+        self.latency = latency if isinstance(latency, dict) else {"default": latency}
+        self.cancel_latency = cancel_latency
+        self.context_latency = context_latency
+        self.rate_limit = rate_limit
+        self.model_latency = model_latency or {}
+        self.runs_by_model = Counter()
+        self.rate_limited = 0 # calls rejected with a 429
+        self.failure_rate = failure_rate
+        self.replies = replies or canned_reply
+        self.calls = Counter()
+        self.active = 0
+        self.peak_concurrency = 0 # concurrent API calls
+        self.active_runs = 0
+        self.peak_runs = 0 # concurrent runs, whether polled by hand or through create_and_poll
+
+        self._random = random.Random(seed)
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._messages = {} # thread id: [message, ...], newest first
+        self._runs = {} # run id: [thread id, prompt, ready at, final run or None]
+        self._cancelling = {} # run id: when its cancellation completes
+        self._recent = deque() # call times within the rate_limit window
+        self._deleted = set() # ids deleted, retrieving them raises FakeNotFoundError
+        self._models = {} # assistant id: model
+
+        self.files = SimpleNamespace(
+            create=self._endpoint("files.create", self._create_file),
+            retrieve=self._endpoint("files.retrieve", lambda file_id: SimpleNamespace(id=file_id)),
+            delete=self._endpoint("files.delete", lambda file_id: None),
+            list=self._endpoint("files.list", lambda **kwargs: []),
+        )
+        self.beta = SimpleNamespace(
+            assistants=SimpleNamespace(
+                create=self._endpoint("assistants.create", self._create_assistant),
+                retrieve=self._endpoint("assistants.retrieve", lambda assistant_id: self._retrieve(assistant_id)),
+                delete=self._endpoint("assistants.delete", self._delete),
+                list=self._endpoint("assistants.list", lambda **kwargs: []),
+            ),
+            threads=SimpleNamespace(
+                create=self._endpoint("threads.create", self._create_thread),
+                retrieve=self._endpoint("threads.retrieve", lambda thread_id: self._retrieve(thread_id)),
+                delete=self._endpoint("threads.delete", self._delete),
+                runs=SimpleNamespace(
+                    create=self._endpoint("runs.create", self._create_run),
+                    retrieve=self._endpoint("runs.retrieve", self._retrieve_run),
+                    cancel=self._endpoint("runs.cancel", self._cancel_run),
+                    create_and_poll=self._endpoint("runs.create_and_poll", self._run),
+                    stream=self._stream,
+                ),
+                messages=SimpleNamespace(
+                    create=self._endpoint("messages.create", self._create_message),
+                    list=self._endpoint("messages.list", lambda thread_id, **kwargs: SimpleNamespace(data=self._messages.get(thread_id, []))),
+                ),
+            ),
+            vector_stores=SimpleNamespace(
+                create=self._endpoint("vector_stores.create", lambda **kwargs: SimpleNamespace(id=self._id("vs"), name=kwargs.get("name"))),
+                retrieve=self._endpoint("vector_stores.retrieve", lambda vector_store_id: self._retrieve(vector_store_id)),
+                delete=self._endpoint("vector_stores.delete", self._delete),
+                list=self._endpoint("vector_stores.list", lambda **kwargs: []),
+                files=SimpleNamespace(
+                    create_and_poll=self._endpoint("vector_stores.files.create_and_poll", lambda vector_store_id, file_id, **kwargs: SimpleNamespace(id=file_id, status="completed", last_error=None)),
+                ),
+                file_batches=SimpleNamespace(
+                    upload_and_poll=self._endpoint("file_batches.upload_and_poll", lambda vector_store_id, files: self._batch(len(files))),
+                    create_and_poll=self._endpoint("file_batches.create_and_poll", lambda vector_store_id, file_ids: self._batch(len(file_ids))),
+                    list_files=self._endpoint("file_batches.list_files", lambda vector_store_id, batch_id: []),
+                ),
+            ),
+        )
+
+    @property
+    def round_trips(self) -> int:
+        return sum(self.calls.values())
+
+    def reset_stats(self) -> None:
+        self.calls.clear()
+        self.runs_by_model.clear()
+        self.peak_concurrency = 0
+        self.peak_runs = 0
+        self.rate_limited = 0
+
+    def _id(self, prefix: str) -> str:
+        return f"{prefix}_fake{next(self._ids)}"
+
+    def _delay(self, endpoint: str) -> float:
+        if endpoint in self.latency:
+            return self.latency[endpoint]
+
+        if endpoint in ("runs.create", "runs.retrieve", "runs.cancel", "runs.create_and_poll"): # control plane, "runs" is the time a run takes
+            return self.latency.get("default", 0.0)
+
+        for prefix, seconds in self.latency.items():
+            if endpoint.startswith(prefix):
+                return seconds
+
+        return self.latency.get("default", 0.0)
+
+    def _admit(self) -> None: # caller holds self._lock
+        if self.rate_limit is None:
+            return
+
+        requests, seconds = self.rate_limit
+        now = time.monotonic()
+
+        while self._recent and self._recent[0] <= now - seconds:
+            self._recent.popleft()
+
+        if len(self._recent) >= requests:
+            self.rate_limited += 1
+            raise FakeRateLimitError(retry_after=None)
+
+        self._recent.append(now)
+
+    def _endpoint(self, endpoint: str, fn: Callable) -> Callable: # counts, tracks concurrency and sleeps around fn
+        def call(*args, **kwargs):
+            with self._lock:
+                self._admit()
+                self.calls[endpoint] += 1
+                self.active += 1
+                self.peak_concurrency = max(self.peak_concurrency, self.active)
+
+            try:
+                time.sleep(self._delay(endpoint))
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.active -= 1
+
+        return call
+
+    def _retrieve(self, id: str) -> SimpleNamespace:
+        if id in self._deleted:
+            raise FakeNotFoundError(id)
+
+        return SimpleNamespace(id=id)
+
+    def _delete(self, id: str) -> None:
+        self._deleted.add(id)
+
+    def _create_file(self, file, purpose: str) -> SimpleNamespace:
+        name, data = file if isinstance(file, tuple) else (getattr(file, "name", "upload"), file)
+        data = data.read() if hasattr(data, "read") else data # streamed uploads pass the open file
+        return SimpleNamespace(id=self._id("file"), filename=name, bytes=len(data), purpose=purpose)
+
+    def _create_assistant(self, **kwargs) -> SimpleNamespace:
+        assistant = SimpleNamespace(id=self._id("asst"), **kwargs)
+        self._models[assistant.id] = kwargs.get("model")
+        return assistant
+
+    def _run_delay(self, assistant_id: str, model: Optional[str] = None, endpoint: str = "runs") -> float:
+        model = model or self._models.get(assistant_id)
+
+        with self._lock:
+            self.runs_by_model[model] += 1
+
+        return self.model_latency.get(model, self._delay(endpoint))
+
+    def _create_thread(self, messages: list[dict] = [], **kwargs) -> SimpleNamespace:
+        thread = SimpleNamespace(id=self._id("thread"), **kwargs)
+        self._messages[thread.id] = [
+            SimpleNamespace(id=self._id("msg"), role=m["role"], content=[SimpleNamespace(type="text", text=SimpleNamespace(value=m["content"]))])
+            for m in reversed(messages)
+        ]
+        return thread
+
+    def _create_message(self, thread_id: str, role: str, content: str, **kwargs) -> SimpleNamespace:
+        message = SimpleNamespace(id=self._id("msg"), role=role, content=[SimpleNamespace(type="text", text=SimpleNamespace(value=content))])
+        self._messages.setdefault(thread_id, []).insert(0, message)
+        return message
+
+    def _context_delay(self, thread_id: str, truncation_strategy: Optional[dict] = None) -> float:
+        replayed = len(self._messages.get(thread_id, []))
+
+        if truncation_strategy and truncation_strategy.get("type") == "last_messages":
+            replayed = min(replayed, truncation_strategy["last_messages"])
+
+        return replayed * self.context_latency
+
+    def _batch(self, n: int) -> SimpleNamespace:
+        return SimpleNamespace(
+            id=self._id("vsfb"),
+            status="completed",
+            file_counts=SimpleNamespace(completed=n, failed=0, cancelled=0, in_progress=0, total=n),
+        )
+
+    def _reply(self, thread_id: str, prompt: str) -> tuple[SimpleNamespace, str]:
+        if self._random.random() < self.failure_rate:
+            return self._final_run("failed", prompt, str()), str()
+
+        text = self.replies(prompt)
+        message = SimpleNamespace(id=self._id("msg"), role="assistant", content=[SimpleNamespace(type="text", text=SimpleNamespace(value=text))])
+        self._messages.setdefault(thread_id, []).insert(0, message)
+
+        return self._final_run("completed", prompt, text), text
+
+    def _final_run(self, status: str, prompt: str, text: str) -> SimpleNamespace:
+        usage = SimpleNamespace(prompt_tokens=len(prompt) // 4, completion_tokens=len(text) // 4)
+        usage.total_tokens = usage.prompt_tokens + usage.completion_tokens
+        return SimpleNamespace(id=self._id("run"), status=status, usage=usage)
+
+    def _track_run(self, delta: int) -> None:
+        with self._lock:
+            self.active_runs += delta
+            self.peak_runs = max(self.peak_runs, self.active_runs)
+
+    def _run(self, thread_id: str, assistant_id: str, instructions: str = "", **kwargs) -> SimpleNamespace:
+        self._retrieve(assistant_id) # runs on deleted assistants 404
+        self._track_run(1)
+
+        try:
+            time.sleep(self._run_delay(assistant_id, kwargs.get("model")) + self._context_delay(thread_id, kwargs.get("truncation_strategy")))
+            return self._reply(thread_id, instructions)[0]
+        finally:
+            self._track_run(-1)
+
+    def _check_idle(self, thread_id: str) -> None: # the API allows one active run per thread
+        now = time.monotonic()
+
+        for run_id, (thread, _, ready_at, final) in list(self._runs.items()):
+            if thread == thread_id and (now < self._cancelling.get(run_id, 0.0) or (final is None and now < ready_at)):
+                raise FakeBadRequestError(f"Thread {thread_id} already has an active run {run_id}.")
+
+    def _create_run(self, thread_id: str, assistant_id: str, instructions: str = "", **kwargs) -> SimpleNamespace:
+        self._retrieve(assistant_id)
+        self._check_idle(thread_id)
+        run_id = self._id("run")
+        self._runs[run_id] = [thread_id, instructions, time.monotonic() + self._run_delay(assistant_id, kwargs.get("model")) + self._context_delay(thread_id, kwargs.get("truncation_strategy")), None]
+        self._track_run(1)
+
+        return SimpleNamespace(id=run_id, status="queued", usage=None)
+
+    def _retrieve_run(self, thread_id: str, run_id: str) -> SimpleNamespace:
+        run = self._runs[run_id]
+
+        if time.monotonic() < self._cancelling.get(run_id, 0.0):
+            return SimpleNamespace(id=run_id, status="cancelling", usage=None)
+
+        if run[3] is None and time.monotonic() < run[2]:
+            return SimpleNamespace(id=run_id, status="in_progress", usage=None)
+
+        if run[3] is None:
+            run[3] = self._reply(thread_id, run[1])[0]
+            run[3].id = run_id
+            self._track_run(-1)
+
+        return run[3]
+
+    def _cancel_run(self, thread_id: str, run_id: str) -> SimpleNamespace:
+        run = self._runs[run_id]
+
+        if run[3] is not None:
+            raise ValueError(f"Cannot cancel run with status '{run[3].status}'.")
+
+        run[3] = SimpleNamespace(id=run_id, status="cancelled", usage=None) # once cancel_latency has passed
+        self._cancelling[run_id] = time.monotonic() + self.cancel_latency
+        self._track_run(-1)
+
+        return SimpleNamespace(id=run_id, status="cancelling", usage=None)
+
+    def _stream(self, thread_id: str, assistant_id: str, instructions: str = "", **kwargs) -> "_FakeStream":
+        with self._lock:
+            self._admit()
+            self.calls["runs.stream"] += 1
+
+        self._retrieve(assistant_id)
+        self._check_idle(thread_id)
+        return _FakeStream(self, thread_id, instructions, self._context_delay(thread_id, kwargs.get("truncation_strategy")), self._run_delay(assistant_id, kwargs.get("model"), "runs.stream"))
+
+class FakeRateLimitError(Exception): # shaped like openai.RateLimitError as far as scheduler.is_rate_limited is concerned
+    status_code = 429
+
+    def __init__(self, retry_after: Optional[float] = None) -> None:
+        super().__init__("Error code: 429 - rate limit exceeded")
+        self.response = SimpleNamespace(headers={} if retry_after is None else {"retry-after": str(retry_after)})
+
+class FakeNotFoundError(Exception): # shaped like openai.NotFoundError
+    status_code = 404
+
+    def __init__(self, id: str) -> None:
+        super().__init__(f"Error code: 404 - no such object: {id}")
+
+class FakeBadRequestError(Exception): # shaped like openai.BadRequestError
+    status_code = 400
+
+    def __init__(self, message: str) -> None:
+        super().__init__(f"Error code: 400 - {message}")
+
+class _FakeStream: # mimics the AssistantStreamManager context manager: first token after the run latency, then per-token delays
+    def __init__(self, client: FakeOpenAI, thread_id: str, prompt: str, context_delay: float = 0.0, delay: float = 0.0) -> None:
+        self.client = client
+        self.context_delay = context_delay
+        self.delay = delay
+        self.thread_id = thread_id
+        self.prompt = prompt
+        self.current_run = None
+        self._closed = threading.Event()
+
+    def __enter__(self) -> "_FakeStream":
+        self.current_run = SimpleNamespace(id=self.client._id("run"), status="in_progress", usage=None)
+        self.client._runs[self.current_run.id] = [self.thread_id, self.prompt, float("inf"), None] # so runs.cancel can stop it
+        self.client._track_run(1)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._finish(SimpleNamespace(id=self.current_run.id, status="incomplete", usage=None)) # closed before the run finished
+
+    def close(self) -> None: # like closing the HTTP response, no more deltas
+        self._closed.set()
+
+    def _stopped(self, wait: float) -> bool: # closed, or cancelled through runs.cancel
+        return self._closed.wait(wait) or self.client._runs[self.current_run.id][3] is not None
+
+    def _finish(self, run: SimpleNamespace) -> None:
+        with self.client._lock:
+            entry = self.client._runs[self.current_run.id]
+
+            if entry[3] is not None:
+                return
+
+            entry[3] = run
+
+        self.client._track_run(-1)
+
+    @property
+    def text_deltas(self) -> Iterator[str]:
+        delay = self.delay
+
+        if self._stopped(delay / 4 + self.context_delay): # time to first token
+            return
+
+        run, text = self.client._reply(self.thread_id, self.prompt)
+        tokens = re.findall(r"\S+\s*", text)
+
+        for token in tokens:
+            if self._stopped(delay * 3 / 4 / max(len(tokens), 1)):
+                return
+
+            yield token
+
+        run.id = self.current_run.id
+        self._finish(run)
+
+    def get_final_run(self) -> SimpleNamespace:
+        return self.client._runs[self.current_run.id][3]
+
+def canned_reply(prompt: str) -> str: # recognises each pipeline prompt in prompts/ and answers in the format it asks for
+    if "Existing topics:" in prompt: # incremental: one existing topic gains a subtopic, one topic is new
+        return json.dumps({"Topic 1": ["Subtopic 1.0", "Subtopic 1.new"], "New topic": ["New subtopic 1", "New subtopic 2"]})
+
+    if "Find every single topic and subtopic" in prompt:
+        return json.dumps({f"Topic {i}": [f"Subtopic {i}.{j}" for j in range(3)] for i in range(1, 9)})
+
+    if (blocks := re.findall(r"\nTopic: (.+)((?:\n\t.*)*)", prompt)): # one or several topics, each followed by its subtopics
+        return json.dumps({topic: {s: f"Notes on {s}." for s in re.findall(r"\t(?:- )?(.+)", subtopics)} for topic, subtopics in blocks})
+
+    if "Questions:" in prompt and "Feedback:" in prompt:
+        n = re.search(r"top (\d+)", prompt)
+        return json.dumps({"Questions": [f"What is covered in section {i} of the course?" for i in range(1, int(n.group(1)) + 1 if n else 6)]})
+
+    if prompt.startswith("Generate "):
+        return json.dumps({t.strip(" ."): ["Q1?", "Q2?", "Q3?"] for t in prompt.split(": ", 1)[-1].split(", ")})
+
+    if "evaluate each question" in prompt:
+        return "The questions are reasonable; make the second question of each topic more specific."
+
+    return "This is a canned answer from FakeOpenAI. " * 8
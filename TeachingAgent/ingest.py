@@ -0,0 +1,83 @@
+from __future__ import annotations
+from concurrent.futures import Future
+from dataclasses import dataclass, replace
+from typing import Callable, Generator, Optional
+import asyncio
+import threading
+import time
+
+STATUSES = ("queued", "reading", "uploading", "indexing", "completed", "skipped", "failed")
+
+@dataclass
+class FileProgress:
+    name: str
+    status: str = "queued" # see STATUSES
+    size: int = 0
+    file_id: Optional[str] = None
+    error: Optional[str] = None
+    preprocessed: Optional[dict] = None # bytes and chunks saved, see PreparedFile.report
+    started: Optional[float] = None
+    finished: Optional[float] = None
+
+    @property
+    def seconds(self) -> Optional[float]:
+        return None if self.started is None else (self.finished or time.monotonic()) - self.started
+
+class Ingestion:
+    """
+    Handle for a background TeachingAgent.ingest(). Poll progress()/counts() while files upload and index, then block on
+    result() or `await` the handle for the ids of the files attached to the vector store. Files become searchable one by
+    one as they finish indexing, not when the whole batch does.
+    """
+
+    def __init__(self, names: list[str], on_progress: Optional[Callable[[FileProgress], None]] = None) -> None:
+        self.files = [FileProgress(name) for name in names]
+        self.on_progress = on_progress
+        self._future = Future()
+        self._lock = threading.Lock()
+
+    def update(self, index: int, **changes) -> None: # called by the ingestion workers
+        with self._lock:
+            progress = self.files[index]
+
+            for field, value in changes.items():
+                setattr(progress, field, value)
+
+            if changes.get("status") in ("completed", "skipped", "failed"):
+                progress.finished = time.monotonic()
+
+            snapshot = replace(progress)
+
+        if self.on_progress is not None:
+            self.on_progress(snapshot)
+
+    def finish(self, file_ids: list[str], error: Optional[BaseException] = None) -> None:
+        if error is not None:
+            self._future.set_exception(error)
+        else:
+            self._future.set_result(file_ids)
+
+    def progress(self) -> list[FileProgress]: # copies, safe to read from any thread
+        with self._lock:
+            return [replace(progress) for progress in self.files]
+
+    def counts(self) -> dict[str, int]: # status: files
+        counts = dict.fromkeys(STATUSES, 0)
+
+        for progress in self.progress():
+            counts[progress.status] += 1
+
+        return counts
+
+    @property
+    def done(self) -> bool:
+        return self._future.done()
+
+    def result(self, timeout: Optional[float] = None) -> list[str]:
+        return self._future.result(timeout)
+
+    def add_done_callback(self, fn: Callable[[Future], None]) -> None:
+        self._future.add_done_callback(fn)
+
+    def __await__(self) -> Generator[None, None, list[str]]:
+        return asyncio.wrap_future(self._future).__await__()
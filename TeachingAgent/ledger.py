@@ -0,0 +1,231 @@
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from pathlib import Path
+from typing import Callable, Iterable, Optional, TYPE_CHECKING
+import os
+import random
+import socket
+import sqlite3
+import json
+import threading
+import time
+from .utils import cfg, _parent
+from .scheduler import Priority, scheduler
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+KINDS = ("assistant", "helper", "thread", "vector_store", "file")
+
+def _deleter(client: OpenAI, kind: str) -> Callable[[str], object]:
+    return {
+        "assistant": client.beta.assistants.delete,
+        "helper": client.beta.assistants.delete,
+        "thread": client.beta.threads.delete,
+        "vector_store": client.beta.vector_stores.delete,
+        "file": client.files.delete,
+    }[kind]
+
+def _alive(pid: int) -> bool: # never os.kill on Windows, where it terminates the process
+    if os.name == "nt":
+        import ctypes
+
+        handle = ctypes.windll.kernel32.OpenProcess(0x1000, False, pid) # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+
+        code = ctypes.c_ulong()
+        ctypes.windll.kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+        ctypes.windll.kernel32.CloseHandle(handle)
+        return code.value == 259 # STILL_ACTIVE
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError: # exists, owned by someone else
+        return True
+
+    return True
+
+class ResourceLedger:
+    """
+    Local record of every OpenAI object this package creates - agent assistants, threads and vector stores by owning
+    session, uploaded files and helper assistants as shared (owner None) - so cleanup only ever touches our own resources.
+    A session is an orphan once its process has died or it has been idle for stale_hours (see orphans() and sweep()),
+    except that a session with a snapshot (see TeachingAgent.snapshot) outlives its process until it goes stale, so a
+    restarted process can resume it.
+    """
+
+    def __init__(self, path: Optional[str | Path] = None) -> None:
+        self.path = path # None for the [cache] file_index database, resolved on first use
+        self._lock = threading.Lock()
+        self._ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        with self._lock:
+            if self.path is None:
+                self.path = _parent / cfg.get("cache", {}).get("file_index", "cache.sqlite3")
+
+            db = sqlite3.connect(str(self.path), timeout=30)
+
+            if not self._ready:
+                with db:
+                    db.execute("CREATE TABLE IF NOT EXISTS resources (id TEXT PRIMARY KEY, kind TEXT NOT NULL, owner TEXT, created REAL)")
+                    db.execute("CREATE INDEX IF NOT EXISTS resources_by_owner ON resources (owner)")
+                    db.execute("CREATE TABLE IF NOT EXISTS sessions (owner TEXT PRIMARY KEY, host TEXT, pid INTEGER, started REAL, last_seen REAL)")
+                    db.execute("CREATE TABLE IF NOT EXISTS snapshots (owner TEXT PRIMARY KEY, state TEXT NOT NULL, saved REAL)")
+
+                self._ready = True
+
+        return db
+
+    def open_session(self, owner: str) -> None:
+        now = time.time()
+
+        with closing(self._connect()) as db, db:
+            db.execute("INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?, ?)", (owner, socket.gethostname(), os.getpid(), now, now))
+
+    def touch(self, owner: str) -> None: # activity keeps a session from going stale
+        with closing(self._connect()) as db, db:
+            db.execute("UPDATE sessions SET last_seen = ? WHERE owner = ?", (time.time(), owner))
+
+    def close_session(self, owner: str) -> None:
+        with closing(self._connect()) as db, db:
+            db.execute("DELETE FROM sessions WHERE owner = ?", (owner, ))
+            db.execute("DELETE FROM snapshots WHERE owner = ?", (owner, ))
+
+    def save_snapshot(self, owner: str, state: dict) -> None: # JSON serialisable, replaces the session's last snapshot
+        now = time.time()
+
+        with closing(self._connect()) as db, db:
+            db.execute("INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?)", (owner, json.dumps(state), now))
+            db.execute("UPDATE sessions SET last_seen = ? WHERE owner = ?", (now, owner))
+
+    def load_snapshot(self, owner: str) -> Optional[dict]:
+        with closing(self._connect()) as db:
+            row = db.execute("SELECT state FROM snapshots WHERE owner = ?", (owner, )).fetchone()
+
+        return None if row is None else json.loads(row[0])
+
+    def drop_snapshot(self, owner: str) -> None:
+        with closing(self._connect()) as db, db:
+            db.execute("DELETE FROM snapshots WHERE owner = ?", (owner, ))
+
+    def record(self, kind: str, *ids: str, owner: Optional[str] = None) -> None:
+        now = time.time()
+
+        with closing(self._connect()) as db, db:
+            db.executemany("INSERT OR REPLACE INTO resources VALUES (?, ?, ?, ?)", [(id, kind, owner, now) for id in ids])
+
+            if owner is not None:
+                db.execute("UPDATE sessions SET last_seen = ? WHERE owner = ?", (now, owner))
+
+    def adopt(self, ids: Iterable[str], owner: str) -> None: # e.g. a warm pool bundle handed to an agent
+        with closing(self._connect()) as db, db:
+            db.executemany("UPDATE resources SET owner = ? WHERE id = ?", [(owner, id) for id in ids])
+
+    def forget(self, *ids: str) -> None:
+        with closing(self._connect()) as db, db:
+            db.executemany("DELETE FROM resources WHERE id = ?", [(id, ) for id in ids])
+
+    def owned(self, owner: Optional[str] = None, kinds: Optional[Iterable[str]] = None) -> list[tuple[str, str]]: # (kind, id), every owner if None
+        kinds = tuple(kinds or KINDS)
+        query = f"SELECT kind, id FROM resources WHERE kind IN ({', '.join('?' * len(kinds))})"
+
+        with closing(self._connect()) as db:
+            if owner is None:
+                return db.execute(query, kinds).fetchall()
+
+            return db.execute(query + " AND owner = ?", kinds + (owner, )).fetchall()
+
+    def live(self, owner: str, within: Optional[float] = None) -> bool: # in use by another running process, so not safe to resume
+        within = cfg.get("snapshot", {}).get("live_minutes", 10) * 60 if within is None else within
+
+        with closing(self._connect()) as db:
+            row = db.execute("SELECT host, pid, last_seen FROM sessions WHERE owner = ?", (owner, )).fetchone()
+
+        if row is None or time.time() - row[2] > within: # unknown, or idle long enough to count as abandoned
+            return False
+
+        host, pid, _ = row
+        return host != socket.gethostname() or (pid != os.getpid() and _alive(pid)) # this process's own agents are tracked in memory
+
+    def orphans(self, stale_hours: Optional[float] = None) -> list[str]: # sessions whose process is gone (unless resumable), or idle too long
+        stale_hours = cfg.get("ledger", {}).get("stale_hours", 24) if stale_hours is None else stale_hours
+        host, cutoff = socket.gethostname(), time.time() - stale_hours * 60 * 60
+
+        with closing(self._connect()) as db:
+            sessions = db.execute("SELECT owner, host, pid, last_seen, owner IN (SELECT owner FROM snapshots) FROM sessions").fetchall()
+            unknown = db.execute("SELECT DISTINCT owner FROM resources WHERE owner IS NOT NULL AND owner NOT IN (SELECT owner FROM sessions)").fetchall()
+
+        return [owner for owner, h, pid, last_seen, resumable in sessions if last_seen < cutoff or (h == host and not resumable and not _alive(pid))] + [owner for owner, in unknown]
+
+ledger = ResourceLedger()
+
+def delete_resources(
+        client: OpenAI,
+        resources: Iterable[tuple[str, str]],
+        workers: Optional[int] = None,
+        retries: Optional[int] = None,
+        priority: Priority = Priority.OVERVIEW,
+    ) -> dict[str, list[str]]:
+    """
+    Delete (kind, id) pairs over up to `workers` threads ([ledger] delete_workers), retrying other transient errors
+    `retries` times with jittered backoff (rate limits are already retried by the scheduler). Objects that no longer
+    exist count as deleted. Deleted objects are dropped from the ledger.
+
+    Returns {"deleted": [id, ...], "failed": [id, ...]}.
+    """
+
+    resources = list(dict.fromkeys(resources)) # de-duplicated, in order
+    ledger_cfg = cfg.get("ledger", {})
+    workers = max(1, min(workers or ledger_cfg.get("delete_workers", 8), len(resources) or 1))
+    retries = ledger_cfg.get("delete_retries", 3) if retries is None else retries
+
+    def delete(resource: tuple[str, str]) -> bool:
+        kind, id = resource
+
+        for attempt in range(retries + 1):
+            try:
+                scheduler.call(priority, _deleter(client, kind), id)
+                return True
+            except Exception as e:
+                if getattr(e, "status_code", None) == 404: # already gone
+                    return True
+
+                if attempt < retries:
+                    time.sleep(random.uniform(0, min(10, 0.5 * 2 ** attempt)))
+
+        return False
+
+    if workers == 1:
+        results = list(map(delete, resources))
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="Cleanup") as executor:
+            results = list(executor.map(delete, resources))
+
+    deleted = [id for (_, id), ok in zip(resources, results) if ok]
+    ledger.forget(*deleted)
+
+    return {"deleted": deleted, "failed": [id for (_, id), ok in zip(resources, results) if not ok]}
+
+def sweep(client: OpenAI, stale_hours: Optional[float] = None) -> dict[str, list[str]]:
+    """
+    Crash recovery: delete everything owned by orphaned sessions (see ResourceLedger.orphans). Shared files and helper
+    assistants are left alone, helpers expire through HelperRegistry.gc instead.
+    """
+
+    result = {"deleted": [], "failed": []}
+
+    for owner in ledger.orphans(stale_hours):
+        swept = delete_resources(client, ledger.owned(owner))
+
+        for outcome, ids in swept.items():
+            result[outcome] += ids
+
+        if not swept["failed"]:
+            ledger.close_session(owner)
+
+    return result
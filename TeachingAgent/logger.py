@@ -1,36 +1,77 @@
 import logging
 import os
 import sys
-import io
+import atexit
+import queue
+import threading
+from typing import Optional
+from .utils import cfg, _parent
 
-try:
-    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
-    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8")
-except:
-    pass
+for stream in (sys.stdout, sys.stderr): # utf-8 in place: wrapping the buffers anew would close them once the old streams are collected
+    try:
+        stream.reconfigure(encoding="utf-8")
+    except:
+        pass
+
+_LEVELS = {"debug": logging.DEBUG, "info": logging.INFO, "warning": logging.WARNING, "error": logging.ERROR, "critical": logging.CRITICAL}
 
 class Logger:
-    def __init__(self, file: str, verbose: bool = True, threshold: str = "debug") -> None:
-        self.logger = logging.getLogger("BaseLogger")
-        self.logger.setLevel(logging.DEBUG)
-        self.logger.handlers = []
-        
-        if not os.path.exists(file):
-            open(file, "w+").close()
-            
-        file_handler = logging.FileHandler(file, encoding="utf-8")
-        file_handler.setFormatter(
-            logging.Formatter("[%(levelname)s] (%(asctime)s): %(message)s")
-        )
-        self.logger.addHandler(file_handler)
-        
-        if verbose: # outputs to stdout, threshold determines lowest level that is output
-            sout_handler = logging.StreamHandler()
-            sout_handler.setLevel(getattr(logging, threshold.upper(), logging.DEBUG))
+    """
+    Session-tagged logger. log() only enqueues the record; one background listener per log file formats, writes and
+    rotates for every agent in the process.
+    """
+
+    _shared = {} # file: logging.Logger feeding that file's listener
+    _lock = threading.Lock()
+
+    def __init__(self, file: Optional[str] = None, verbose: bool = True, threshold: str = "debug", session: Optional[str] = None) -> None:
+        file = _parent / cfg.get("logging", {}).get("file", "sessions.log") if file is None else file # relative to the repo
+        self.session = session or os.urandom(4).hex()
+        self.verbose = verbose
+        self.threshold = _LEVELS.get(threshold.lower(), logging.DEBUG)
+        self.logger = Logger._get_shared(str(file))
+
+    @classmethod
+    def _get_shared(cls, file: str) -> logging.Logger:
+        with cls._lock:
+            if file in cls._shared:
+                return cls._shared[file]
+
+            from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler # on the first Logger, not at import
+
+            if not os.path.exists(file):
+                open(file, "w+").close()
+
+            rotation = cfg.get("logging", {})
+
+            if rotation.get("when"): # time based, e.g. "midnight"
+                file_handler = TimedRotatingFileHandler(file, when=rotation["when"], backupCount=rotation.get("backups", 5), encoding="utf-8", errors="replace")
+            else:
+                file_handler = RotatingFileHandler(file, maxBytes=int(rotation.get("max_mb", 10) * 2 ** 20), backupCount=rotation.get("backups", 5), encoding="utf-8", errors="replace")
+
+            file_handler.setFormatter(
+                logging.Formatter("[%(levelname)s] (%(asctime)s) [%(session)s]: %(message)s")
+            )
+
+            sout_handler = logging.StreamHandler() # outputs to stdout for verbose loggers, threshold determines lowest level that is output
+            sout_handler.addFilter(lambda record: getattr(record, "console", False))
             sout_handler.setFormatter(
                 logging.Formatter("[%(levelname)s]: %(message)s")
             )
-            self.logger.addHandler(sout_handler)
-        
+
+            records = queue.SimpleQueue()
+            listener = QueueListener(records, file_handler, sout_handler)
+            listener.start()
+            atexit.register(listener.stop) # flush what's queued on exit
+
+            logger = logging.getLogger(f"BaseLogger[{file}]")
+            logger.setLevel(logging.DEBUG)
+            logger.propagate = False
+            logger.handlers = [QueueHandler(records)]
+
+            cls._shared[file] = logger
+            return logger
+
     def log(self, message: str, level: str = "INFO") -> None:
-        getattr(self.logger, level.lower(), self.logger.info)(message.encode("utf-8", errors="replace").decode("utf-8")) # overwrites root logger
\ No newline at end of file
+        levelno = _LEVELS.get(level.lower(), logging.INFO)
+        self.logger.log(levelno, message, extra={"session": self.session, "console": self.verbose and levelno >= self.threshold})
@@ -0,0 +1,172 @@
+from collections import defaultdict, deque
+from dataclasses import dataclass, asdict, field
+from pathlib import Path
+from typing import Callable, Optional, TYPE_CHECKING
+import json
+import threading
+import time
+from .utils import cfg, _parent
+from .scheduler import scheduler
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+STAGES = ("chat", "chat_summary", "chat_prewarm", "topics", "revision", "faq_generate", "evaluate", "select")
+
+@dataclass
+class RunRecord: # one run through TeachingAgent._handle_run_step / _stream_run_step
+    stage: str
+    assistant: str
+    status: str
+    model: Optional[str] = None # the stage's route, else the assistant's
+    queue_seconds: float = 0.0 # waiting for a run engine worker
+    server_queue_seconds: float = 0.0 # run reported "queued" by the API
+    run_seconds: float = 0.0
+    fetch_seconds: float = 0.0 # messages.list after completion
+    first_token_seconds: Optional[float] = None # streamed runs only
+    polls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    timestamp: float = field(default_factory=time.time)
+
+    @property
+    def cost(self) -> float: # USD from the [pricing] "<model>" = [input, output] USD per million tokens, 0 if unpriced
+        prices = cfg.get("pricing", {}).get(self.model or "", (0.0, 0.0))
+        return (self.prompt_tokens * prices[0] + self.completion_tokens * prices[1]) / 1_000_000
+
+class RunMetrics:
+    """
+    Process-wide run metrics: kept in memory (records(), summary()), appended as JSON lines and rendered in the Prometheus
+    text format (prometheus(), or serve() for a /metrics endpoint).
+    """
+
+    def __init__(self, jsonl: Optional[str | Path] = None, max_records: int = 10_000) -> None:
+        self.jsonl = jsonl # None to disable, "config" for [metrics] jsonl (resolved on first record)
+        self._records = deque(maxlen=max_records)
+        self._lock = threading.Lock()
+        self._counts = defaultdict(int) # (stage, assistant, model, status): runs
+        self._sums = defaultdict(float) # (stage, model, metric): total
+        self._collectors = [] # more Prometheus text for /metrics, see register()
+        self._server = None
+
+    def register(self, collector: Callable[[], str]) -> None: # e.g. a cache's prometheus(), so this module needn't import it
+        with self._lock:
+            self._collectors.append(collector)
+
+    def record(self, record: RunRecord) -> None:
+        line = json.dumps(asdict(record) | {"cost_usd": record.cost})
+
+        with self._lock:
+            self._records.append(record)
+            self._counts[(record.stage, record.assistant, record.model, record.status)] += 1
+
+            for metric in ("queue_seconds", "server_queue_seconds", "run_seconds", "fetch_seconds", "polls", "prompt_tokens", "completion_tokens"):
+                self._sums[(record.stage, record.model, metric)] += getattr(record, metric)
+
+            self._sums[(record.stage, record.model, "cost_usd")] += record.cost
+
+            if self.jsonl == "config":
+                self.jsonl = _parent / cfg["metrics"]["jsonl"] if cfg.get("metrics", {}).get("jsonl") else None
+                
+            if self.jsonl is not None:
+                with open(self.jsonl, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+
+    def records(self, stage: Optional[str] = None) -> list[RunRecord]:
+        with self._lock:
+            return [r for r in self._records if stage is None or r.stage == stage]
+
+    def summary(self, by_route: bool = False, since: Optional[float] = None) -> dict[str, dict[str, float]]:
+        """
+        stage: {runs, mean/p95 run_seconds, mean queue/fetch seconds, tokens, cost_usd}, or with by_route "stage/model" to
+        compare the latency and cost of routing a stage to different models. since: only runs recorded after this time.
+        """
+
+        groups = defaultdict(list)
+        summary = {}
+
+        for r in self.records():
+            if since is not None and r.timestamp < since:
+                continue
+
+            groups[f"{r.stage}/{r.model}" if by_route else r.stage].append(r)
+
+        for name, records in sorted(groups.items()):
+            durations = sorted(r.run_seconds for r in records)
+
+            summary[name] = {
+                "runs": len(records),
+                "failed": sum(r.status != "completed" for r in records),
+                "mean_run_seconds": sum(durations) / len(durations),
+                "p95_run_seconds": durations[min(len(durations) - 1, int(len(durations) * 0.95))],
+                "mean_queue_seconds": sum(r.queue_seconds + r.server_queue_seconds for r in records) / len(records),
+                "mean_fetch_seconds": sum(r.fetch_seconds for r in records) / len(records),
+                "prompt_tokens": sum(r.prompt_tokens for r in records),
+                "completion_tokens": sum(r.completion_tokens for r in records),
+                "cost_usd": round(sum(r.cost for r in records), 6),
+            }
+
+        return summary
+
+    def prometheus(self) -> str:
+        lines = [
+            "# HELP teachingagent_runs_total Runs by pipeline stage, assistant, model and final status.",
+            "# TYPE teachingagent_runs_total counter",
+        ]
+
+        with self._lock:
+            counts = dict(self._counts)
+            sums = dict(self._sums)
+
+        for (stage, assistant, model, status), n in sorted(counts.items(), key=repr):
+            lines.append(f'teachingagent_runs_total{{stage="{stage}",assistant="{assistant}",model="{model or ""}",status="{status}"}} {n}')
+
+        for metric, kind, help in (
+            ("queue_seconds", "counter", "Seconds runs waited for a run engine worker."),
+            ("server_queue_seconds", "counter", "Seconds runs spent queued server-side."),
+            ("run_seconds", "counter", "Seconds from run creation to a terminal status."),
+            ("fetch_seconds", "counter", "Seconds spent fetching the reply message."),
+            ("polls", "counter", "Run status polls."),
+            ("prompt_tokens", "counter", "Prompt tokens reported by run.usage."),
+            ("completion_tokens", "counter", "Completion tokens reported by run.usage."),
+            ("cost_usd", "counter", "Estimated USD spent, from run.usage and [pricing]."),
+        ):
+            name = f"teachingagent_run_{metric}_total"
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+
+            for (stage, model, m), total in sorted(sums.items(), key=repr):
+                if m == metric:
+                    lines.append(f'{name}{{stage="{stage}",model="{model or ""}"}} {total:g}')
+
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int = 9464, host: str = "127.0.0.1") -> "ThreadingHTTPServer": # Prometheus scrape endpoint at /metrics
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        
+        if self._server is not None:
+            return self._server
+
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+
+                body = "".join([metrics.prometheus(), scheduler.prometheus(), *(collector() for collector in list(metrics._collectors))]).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args) -> None: # keep scrapes out of stderr
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="RunMetrics", daemon=True).start()
+
+        return self._server
+
+metrics = RunMetrics(jsonl="config")
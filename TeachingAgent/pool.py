@@ -0,0 +1,118 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Optional, TYPE_CHECKING
+import os
+import queue
+import threading
+from .utils import AssistantConfig, cfg
+from .scheduler import Priority, scheduler
+from .ledger import delete_resources, ledger
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+CHUNKING_STRATEGY = {
+    "type": "static",
+    "static": {
+        "max_chunk_size_tokens": 2048,
+        "chunk_overlap_tokens": 512,
+    }
+}
+
+@dataclass
+class Bundle: # everything TeachingAgent.__init__ and session_streamlit would otherwise create on the spot
+    assistant: object
+    vector_store: object
+    thread: object
+    st_thread: Optional[object] = None
+
+def provision(client: OpenAI, config: AssistantConfig, prompt: str, st_thread: bool = False, priority: Priority = Priority.INTERACTIVE, owner: Optional[str] = None) -> Bundle: # owner: ledger session
+    thread = scheduler.call(priority, client.beta.threads.create)
+    ledger.record("thread", thread.id, owner=owner)
+    vector_store = scheduler.call(
+        priority,
+        client.beta.vector_stores.create,
+        chunking_strategy=CHUNKING_STRATEGY,
+        name="textbook",
+    )
+    ledger.record("vector_store", vector_store.id, owner=owner)
+    assistant = scheduler.call( # initialise assistant
+        priority,
+        client.beta.assistants.create,
+        name="Teaching Assistant",
+        instructions=prompt,
+        tools=config.tools,
+        model=config.model,
+        temperature=config.temperature, # runs inherit these unless their stage is routed, see utils.route
+        top_p=config.top_p,
+        tool_resources={
+            "file_search": {
+                "vector_store_ids": [vector_store.id]
+            }
+        }
+    )
+    ledger.record("assistant", assistant.id, owner=owner)
+    bundle = Bundle(assistant, vector_store, thread)
+
+    if st_thread:
+        bundle.st_thread = scheduler.call(priority, client.beta.threads.create)
+        ledger.record("thread", bundle.st_thread.id, owner=owner)
+
+    return bundle
+
+class ResourcePool:
+    """
+    Keeps `size` ready-made assistant/vector store/thread bundles warm, refilled by a background thread.
+    Pass to TeachingAgent(pool=...) - bundles are only handed to agents with the same config and prompt.
+    """
+
+    def __init__(self, client: OpenAI, size: int = 2, config: Optional[AssistantConfig] = None, prompt: Optional[str] = None) -> None:
+        self.client = client
+        self.size = size
+        self.config = config or AssistantConfig()
+        self.prompt = prompt or self.config.prompt
+        self.owner = f"pool-{os.urandom(4).hex()}" # ledger session for bundles nobody has picked up yet
+        ledger.open_session(self.owner)
+
+        self._ready = queue.Queue()
+        self._wake = threading.Event()
+        self._closed = False
+        self._worker = threading.Thread(target=self._refill, name="ResourcePool", daemon=True)
+        self._worker.start()
+
+    def acquire(self, config: AssistantConfig, prompt: str) -> Optional[Bundle]: # never blocks, None if empty or incompatible
+        if self._closed or config != self.config or prompt != self.prompt:
+            return None
+
+        try:
+            return self._ready.get_nowait()
+        except queue.Empty:
+            return None
+        finally:
+            self._wake.set() # top back up
+
+    def _refill(self) -> None:
+        failures = 0
+        heartbeat = cfg.get("ledger", {}).get("stale_hours", 24) * 60 * 60 / 4 # a full pool sits idle, touch its session well before it looks stale
+
+        while not self._closed:
+            while not self._closed and self._ready.qsize() < self.size:
+                try:
+                    self._ready.put(provision(self.client, self.config, self.prompt, st_thread=True, priority=Priority.OVERVIEW, owner=self.owner)) # background, never ahead of a live agent
+                    failures = 0
+                except Exception:
+                    failures += 1
+                    self._wake.wait(min(2 ** failures, 60)) # back off, e.g. while rate limited
+                    self._wake.clear()
+
+            ledger.touch(self.owner)
+            self._wake.wait(heartbeat)
+            self._wake.clear()
+
+    def close(self) -> None: # delete bundles nobody picked up
+        self._closed = True
+        self._wake.set()
+        self._worker.join()
+
+        if not delete_resources(self.client, ledger.owned(self.owner))["failed"]: # otherwise left for sweep()
+            ledger.close_session(self.owner)
@@ -0,0 +1,190 @@
+from __future__ import annotations
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import IO, Optional
+import hashlib
+import math
+import re
+from .utils import cfg
+
+_HEADING = re.compile(r"^(?:(?:chapter|section|part|unit)\s+\d+\b.{0,60}|\d+(?:\.\d+)*\.?\s+[A-Z][^.]{2,60})$", re.IGNORECASE)
+_PAGE_REF = r"\d+(?:\s*[-–]\s*\d+)?"
+_INDEX_LINE = re.compile(rf"[A-Za-z][^=]*?(?:(?:\s*\.){{3,}}\s*|\s*…+\s*|,\s*){_PAGE_REF}(?:\s*,\s*{_PAGE_REF})*$") # "convex region, 56, 61-63" or "Sets ........ 57"
+_EDGE_NUMBER = re.compile(r"^(\d+)\D|\D(\d+)$")
+
+def _tokens(text: str) -> int: # rough, the same 4 characters per token the scheduler estimates with
+    return len(text) // 4
+
+def estimate_chunks(tokens: int, chunking: dict) -> int: # vector store chunks for a static chunking strategy
+    size, overlap = chunking["static"]["max_chunk_size_tokens"], chunking["static"]["chunk_overlap_tokens"]
+    return 0 if tokens <= 0 else 1 + max(0, math.ceil((tokens - size) / (size - overlap)))
+
+def extract_pages(f: IO[bytes]) -> Optional[list[str]]:
+    """
+    Text of every page, or None if pypdf isn't installed or the file can't be parsed (the PDF is then uploaded as-is).
+    """
+
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        return None
+
+    f.seek(0)
+
+    try:
+        return [page.extract_text() or "" for page in PdfReader(f).pages]
+    except Exception:
+        return None
+    finally:
+        f.seek(0)
+
+@dataclass
+class PreparedFile:
+    name: str # of the text upload, e.g. "notes.txt" for "notes.pdf"
+    data: bytes
+    chunking: dict # per-file chunking strategy for vector_stores.files.create
+    pages: int = 0
+    dropped_pages: int = 0 # covers, blank/scanned pages, indexes and contents
+    duplicate_pages: int = 0 # already uploaded, from this file or an earlier one
+    boilerplate_lines: int = 0 # running headers, footers and page numbers, not counting blank lines
+    original_bytes: int = 0 # of the PDF
+    extracted_bytes: int = 0 # of its text, before anything is removed
+    dropped: dict[int, str] = field(default_factory=dict) # page number (from 1): "short", "index" or "duplicate"
+    chunks_before: int = 0 # estimated, the raw text under the vector store's default chunking
+    chunks_after: int = 0
+    page_hashes: list[str] = field(default_factory=list) # of the pages kept
+
+    def report(self) -> dict[str, int | str | dict]:
+        return {
+            "name": self.name,
+            "pages": self.pages,
+            "dropped_pages": self.dropped_pages,
+            "duplicate_pages": self.duplicate_pages,
+            "boilerplate_lines": self.boilerplate_lines,
+            "original_bytes": self.original_bytes,
+            "extracted_bytes": self.extracted_bytes,
+            "text_bytes": len(self.data),
+            "bytes_saved": self.extracted_bytes - len(self.data), # text against text, the PDF's own size says little
+            "dropped": self.dropped,
+            "chunks_before": self.chunks_before,
+            "chunks_after": self.chunks_after,
+            "chunks_saved": self.chunks_before - self.chunks_after,
+            "chunking": self.chunking["static"],
+        }
+
+def _page_key(text: str) -> str: # whitespace and case insensitive, so re-exported copies of a page still match
+    return hashlib.sha256(" ".join(text.lower().split()).encode("utf-8")).hexdigest()
+
+def _boilerplate(pages: list[list[str]], edge_lines: int, ratio: float) -> set[tuple[int, int]]:
+    """
+    (page, line) positions of running headers and footers: lines near the top or bottom of a page that repeat on at
+    least `ratio` of the pages once numbers are ignored, or that carry the page number.
+    """
+
+    edges = [[(i, j) for j in {*range(min(edge_lines, len(lines))), *range(max(0, len(lines) - edge_lines), len(lines))}] for i, lines in enumerate(pages)]
+    key = lambda line: " ".join(re.sub(r"\d+", " ", line).split()).lower()
+    repeats = Counter(k for page in edges for k in {key(pages[i][j]) for i, j in page})
+    threshold = max(2, ratio * len(pages))
+    offsets = Counter() # printed page number - page index, constant for real page numbers
+
+    for page in edges:
+        for i, j in page:
+            if len(pages[i][j]) <= 80 and (m := _EDGE_NUMBER.search(pages[i][j].strip())):
+                offsets[int(m.group(1) or m.group(2)) - i] += 1
+
+    offset = offsets.most_common(1)[0][0] if offsets and offsets.most_common(1)[0][1] >= threshold else None
+    found = set()
+
+    for page in edges:
+        for i, j in page:
+            line = pages[i][j].strip()
+            m = _EDGE_NUMBER.search(line) if len(line) <= 80 else None
+
+            if not line or (key(line) and repeats[key(line)] >= threshold) or line.isdigit() or (m and int(m.group(1) or m.group(2)) - i == offset):
+                found.add((i, j))
+
+    return found
+
+def _is_index(lines: list[str], page: int, pages: int, edge: float = 0.1) -> bool:
+    """
+    Back-of-book index or table of contents: in the first or last `edge` of the document (at least 3 pages), and mostly
+    lines ending in dot leaders or comma-separated page numbers. Pages of worked maths end in numbers too, so neither
+    bare trailing numbers nor lines with an "=" count.
+    """
+
+    edge_pages = max(3, math.ceil(edge * pages))
+
+    if edge_pages <= page < pages - edge_pages:
+        return False
+
+    lines = [line.strip() for line in lines if line.strip()]
+    return len(lines) >= 10 and sum("=" not in line and bool(_INDEX_LINE.search(line)) for line in lines) / len(lines) >= 0.6
+
+def choose_chunking(text: str) -> dict:
+    """
+    Chunk size from the document's structure: room for a whole section (text between headings) per chunk, within
+    800-2048 tokens and never more than the document itself. Long documents get larger chunks so file_search has fewer
+    to rank. Clean text needs less overlap than raw PDFs, so it is an eighth of the chunk.
+    """
+
+    tokens = _tokens(text)
+    sections = max(1, sum(bool(_HEADING.match(line.strip())) for line in text.splitlines()))
+    size = min(2048, max(800, math.ceil(1.25 * tokens / sections / 100) * 100))
+
+    if tokens > 100_000:
+        size = max(size, 1600)
+
+    size = max(100, min(size, round(tokens / 100 + 1) * 100)) # small documents fit in one chunk
+
+    return {"type": "static", "static": {"max_chunk_size_tokens": size, "chunk_overlap_tokens": size // 8}}
+
+def prepare_pdf(name: str, f: IO[bytes], size: int, seen_pages: set[str], default_chunking: dict, pages: Optional[list[str]] = None) -> Optional[PreparedFile]:
+    """
+    Compact text for a PDF: boilerplate lines, near-empty pages (covers, scans, figures), indexes/contents pages and
+    pages already in `seen_pages` (page hashes of earlier uploads, updated in place) are removed. Returns None when the
+    PDF should be uploaded as-is - pypdf missing, or too little extractable text (e.g. a scan, which needs the API's OCR).
+    Pass `pages` if the text was already extracted.
+    """
+
+    preprocess_cfg = cfg.get("preprocess", {})
+
+    if pages is None and (pages := extract_pages(f)) is None:
+        return None
+
+    raw = "\n".join(pages)
+
+    if _tokens(raw) < preprocess_cfg.get("min_tokens", 200):
+        return None
+
+    lines = [page.splitlines() for page in pages]
+    boilerplate = _boilerplate(lines, preprocess_cfg.get("edge_lines", 3), preprocess_cfg.get("boilerplate_ratio", 0.5))
+    prepared = PreparedFile(name=name.rsplit(".", 1)[0] + ".txt", data=b"", chunking=default_chunking, pages=len(pages), original_bytes=size, extracted_bytes=len(raw.encode("utf-8")))
+    kept = []
+
+    for i, page in enumerate(lines):
+        body = [line for j, line in enumerate(page) if (i, j) not in boilerplate]
+        prepared.boilerplate_lines += sum(bool(line.strip()) for j, line in enumerate(page) if (i, j) in boilerplate)
+        text = "\n".join(body).strip()
+        reason = "short" if len(text) < preprocess_cfg.get("min_page_chars", 200) else "index" if _is_index(body, i, len(pages), preprocess_cfg.get("index_edge", 0.1)) else None
+
+        if reason is not None:
+            prepared.dropped_pages += 1
+            prepared.dropped[i + 1] = reason
+            continue
+
+        if (key := _page_key(text)) in seen_pages:
+            prepared.duplicate_pages += 1
+            prepared.dropped[i + 1] = "duplicate"
+            continue
+
+        seen_pages.add(key)
+        prepared.page_hashes.append(key)
+        kept.append(text)
+
+    text = "\n\n".join(kept)
+    prepared.data = text.encode("utf-8")
+    prepared.chunking = choose_chunking(text) if text else default_chunking
+    prepared.chunks_before = estimate_chunks(_tokens(raw), default_chunking)
+    prepared.chunks_after = estimate_chunks(_tokens(text), prepared.chunking)
+
+    return prepared
@@ -0,0 +1,154 @@
+from __future__ import annotations
+from concurrent.futures import Future
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, TYPE_CHECKING
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from .utils import cfg, _parent
+from .scheduler import Priority, scheduler
+from .ledger import ledger
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+@dataclass(frozen=True)
+class HelperAssistant: # enough of an Assistant for _handle_run_step, without a retrieve round trip
+    id: str
+    name: str
+    model: str
+
+class HelperRegistry:
+    """
+    Helper assistants (e.g. "FAQ Generator") shared across overviews, sessions and processes, keyed by a hash of their
+    instructions, model and tools. They carry no tool_resources: the vector store is attached to the run's thread instead.
+    Helpers unused for `ttl` seconds ([helpers] ttl_hours) are deleted by gc().
+
+    Use the process-wide `helpers`: one set of verified helpers and of lookups in flight, so concurrent agents never each
+    create the same helper. The lock only guards that bookkeeping, never a network call.
+    """
+
+    def __init__(self, path: Optional[str | Path] = None, ttl: Optional[float] = None) -> None:
+        self.path = path # None for the [cache] file_index database, resolved on first use
+        self._ttl = ttl
+        self._lock = threading.RLock()
+        self._ready = False
+        self._verified = {} # key: HelperAssistant confirmed to exist remotely by this process
+        self._pending = {} # key: Future of the lookup/create another thread is running for it
+
+    @property
+    def ttl(self) -> float:
+        return cfg.get("helpers", {}).get("ttl_hours", 24) * 60 * 60 if self._ttl is None else self._ttl
+
+    def _connect(self) -> sqlite3.Connection:
+        with self._lock:
+            if self.path is None:
+                self.path = _parent / cfg.get("cache", {}).get("file_index", "cache.sqlite3")
+
+            db = sqlite3.connect(str(self.path), timeout=30)
+
+            if not self._ready:
+                with db:
+                    db.execute("CREATE TABLE IF NOT EXISTS helpers (key TEXT PRIMARY KEY, assistant_id TEXT NOT NULL, name TEXT, model TEXT, last_used REAL)")
+
+                self._ready = True
+
+        return db
+
+    @staticmethod
+    def key(instructions: str, model: str, tools: list[dict[str, str]]) -> str:
+        return hashlib.sha256(json.dumps([instructions, model, tools], sort_keys=True).encode("utf-8")).hexdigest()
+
+    def get(self, client: OpenAI, name: str, instructions: str, model: str, tools: list[dict[str, str]]) -> HelperAssistant:
+        key = HelperRegistry.key(instructions, model, tools)
+
+        with self._lock:
+            helper = self._verified.get(key)
+            pending = None if helper is not None else self._pending.get(key)
+            first = helper is None and pending is None
+
+            if first:
+                pending = self._pending[key] = Future()
+
+        if first: # one lookup/create per key, even with concurrent overviews
+            try:
+                helper = self._lookup(client, key) or self._create(client, name, instructions, model, tools)
+
+                with self._lock:
+                    self._verified[key] = helper
+
+                pending.set_result(helper)
+            except BaseException as e: # the threads waiting on it fail too, the next get() tries again
+                pending.set_exception(e)
+                raise
+            finally:
+                with self._lock:
+                    del self._pending[key]
+
+        elif helper is None:
+            helper = pending.result() # being looked up or created by another thread
+
+        with closing(self._connect()) as db, db:
+            db.execute("INSERT OR REPLACE INTO helpers VALUES (?, ?, ?, ?, ?)", (key, helper.id, name, model, time.time()))
+
+        return helper
+
+    @staticmethod
+    def _create(client: OpenAI, name: str, instructions: str, model: str, tools: list[dict[str, str]]) -> HelperAssistant:
+        assistant = scheduler.call(Priority.OVERVIEW, client.beta.assistants.create, name=name, instructions=instructions, tools=tools, model=model)
+        ledger.record("helper", assistant.id) # shared, not owned by any session
+
+        return HelperAssistant(assistant.id, name, model)
+
+    def evict(self, helper: HelperAssistant) -> None: # deleted remotely, e.g. by another process's gc(), the next get() recreates it
+        with self._lock:
+            for key, verified in list(self._verified.items()):
+                if verified.id == helper.id:
+                    del self._verified[key]
+
+            ledger.forget(helper.id)
+
+            with closing(self._connect()) as db, db:
+                db.execute("DELETE FROM helpers WHERE assistant_id = ?", (helper.id, ))
+
+    def _lookup(self, client: OpenAI, key: str) -> Optional[HelperAssistant]: # persisted by an earlier process, checked once
+        with closing(self._connect()) as db:
+            row = db.execute("SELECT assistant_id, name, model FROM helpers WHERE key = ?", (key, )).fetchone()
+
+        if row is None:
+            return None
+
+        try:
+            scheduler.call(Priority.OVERVIEW, client.beta.assistants.retrieve, row[0])
+        except Exception: # deleted remotely
+            return None
+
+        return HelperAssistant(*row)
+
+    def gc(self, client: OpenAI, ttl: Optional[float] = None) -> int: # delete helpers unused for ttl seconds, returns how many
+        cutoff = time.time() - (self.ttl if ttl is None else ttl)
+
+        with closing(self._connect()) as db:
+            expired = db.execute("SELECT key, assistant_id FROM helpers WHERE last_used < ?", (cutoff, )).fetchall()
+
+        for key, assistant_id in expired:
+            with self._lock: # no new get() hands it out
+                self._verified.pop(key, None)
+
+            try:
+                scheduler.call(Priority.OVERVIEW, client.beta.assistants.delete, assistant_id)
+            except Exception: # already gone
+                pass
+
+            ledger.forget(assistant_id)
+
+            with closing(self._connect()) as db, db:
+                db.execute("DELETE FROM helpers WHERE key = ?", (key, ))
+
+        return len(expired)
+
+helpers = HelperRegistry()
@@ -0,0 +1,205 @@
+from collections import defaultdict, deque
+from enum import IntEnum
+from typing import Callable, Optional, TypeVar
+import heapq
+import itertools
+import random
+import threading
+import time
+from .utils import cfg
+
+T = TypeVar("T")
+
+class Priority(IntEnum): # lower goes first
+    INTERACTIVE = 0 # chat turns a student is waiting on
+    INGESTION = 1 # uploads and vector store indexing
+    OVERVIEW = 2 # background prep_overview fan-out, warm pool refills
+
+STAGE_PRIORITY = {"chat": Priority.INTERACTIVE, "chat_summary": Priority.INTERACTIVE} # run stages, anything else is OVERVIEW
+
+def is_rate_limited(e: Exception) -> bool: # openai.RateLimitError and anything else reporting HTTP 429
+    return getattr(e, "status_code", None) == 429 or type(e).__name__ == "RateLimitError"
+
+class Scheduler:
+    """
+    Process-wide admission control for OpenAI calls: token buckets for requests and tokens per minute, strict priority
+    between waiting callers (see Priority) and jittered exponential backoff on rate limit errors, during which every
+    caller is held back.
+
+    rpm/tpm/retries of None are read from the [scheduler] config on first use, 0 disables that bucket.
+    """
+
+    def __init__(self, rpm: Optional[int] = None, tpm: Optional[int] = None, retries: Optional[int] = None, backoff: float = 1.0, max_backoff: float = 60.0) -> None:
+        self.rpm = rpm
+        self.tpm = tpm
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self._cond = threading.Condition()
+        self._waiting = [] # heap of (priority, seq) still to be admitted
+        self._seq = itertools.count()
+        self._requests = self._tokens = None # bucket levels, filled on first use
+        self._refilled = time.monotonic()
+        self._paused_until = 0.0 # set by a rate limit error
+
+        self._depth = defaultdict(int) # priority: callers waiting
+        self._waits = defaultdict(lambda: deque(maxlen=1000)) # priority: recent admission waits in seconds
+        self._counts = defaultdict(int) # (priority, "calls" | "retries" | "rate_limited" | "failed"): n
+
+    def _configure(self) -> None:
+        scheduler_cfg = cfg.get("scheduler", {})
+        self.rpm = scheduler_cfg.get("rpm", 500) if self.rpm is None else self.rpm
+        self.tpm = scheduler_cfg.get("tpm", 200_000) if self.tpm is None else self.tpm
+        self.retries = scheduler_cfg.get("retries", 6) if self.retries is None else self.retries
+        self._requests, self._tokens = float(self.rpm), float(self.tpm)
+
+    def _refill(self, now: float) -> None:
+        elapsed, self._refilled = now - self._refilled, now
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+    def _delay(self, now: float, tokens: int) -> float: # seconds until a call costing `tokens` fits in both buckets, 0 if it does now
+        delay = self._paused_until - now
+
+        if self.rpm and self._requests < 1:
+            delay = max(delay, (1 - self._requests) * 60 / self.rpm)
+
+        if self.tpm and self._tokens < min(tokens, self.tpm): # a call larger than the whole bucket only waits for a full one
+            delay = max(delay, (min(tokens, self.tpm) - self._tokens) * 60 / self.tpm)
+
+        return max(delay, 0.0)
+
+    def acquire(self, priority: Priority, tokens: int = 0) -> float: # blocks until admitted, returns the seconds waited
+        started = time.monotonic()
+        entry = (priority, next(self._seq))
+
+        with self._cond:
+            if self._requests is None:
+                self._configure()
+
+            heapq.heappush(self._waiting, entry)
+            self._depth[priority] += 1
+
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+
+                    if self._waiting[0] != entry: # someone more urgent (or earlier) goes first
+                        self._cond.wait()
+                        continue
+
+                    delay = self._delay(now, tokens)
+
+                    if delay <= 0:
+                        heapq.heappop(self._waiting)
+                        self._requests -= 1 if self.rpm else 0
+                        self._tokens -= tokens if self.tpm else 0
+                        break
+
+                    self._cond.wait(delay) # also woken by a more urgent arrival
+            finally:
+                if entry in self._waiting: # interrupted while waiting
+                    self._waiting.remove(entry)
+                    heapq.heapify(self._waiting)
+
+                self._depth[priority] -= 1
+                self._cond.notify_all()
+
+            waited = time.monotonic() - started
+            self._waits[priority].append(waited)
+            self._counts[(priority, "calls")] += 1
+
+        return waited
+
+    def settle(self, tokens: int) -> None: # charge (or refund, if negative) the difference between estimated and actual usage
+        with self._cond:
+            if self.tpm and self._tokens is not None:
+                self._tokens = min(self.tpm, self._tokens - tokens)
+
+    def call(self, priority: Priority, fn: Callable[..., T], /, *args, tokens: int = 0, **kwargs) -> T:
+        """
+        fn(*args, **kwargs) once admitted at `priority`, charging `tokens` (an estimate) against the tokens per minute
+        bucket. Rate limit errors are retried up to `retries` times with full-jitter backoff (or the server's retry-after),
+        re-queueing at the same priority each time.
+        """
+
+        attempt = 0
+
+        while True:
+            self.acquire(priority, tokens)
+
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if not is_rate_limited(e) or attempt >= self.retries:
+                    with self._cond:
+                        self._counts[(priority, "failed")] += 1
+
+                    raise
+
+                delay = self._retry_after(e)
+
+                if delay is None:
+                    delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+                with self._cond: # hold everyone back, not just this caller
+                    self._counts[(priority, "rate_limited")] += 1
+                    self._counts[(priority, "retries")] += 1
+                    self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                    self._cond.notify_all()
+
+                attempt += 1
+
+    @staticmethod
+    def _retry_after(e: Exception) -> Optional[float]:
+        try:
+            return float(e.response.headers["retry-after"])
+        except Exception:
+            return None
+
+    def stats(self) -> dict[str, dict[str, float | int]]: # priority: {queued, calls, mean/p95/max wait, retries, rate_limited, failed}
+        stats = {}
+
+        with self._cond:
+            for priority in Priority:
+                waits = sorted(self._waits[priority])
+
+                stats[priority.name.lower()] = {
+                    "queued": self._depth[priority],
+                    "calls": self._counts[(priority, "calls")],
+                    "mean_wait_seconds": sum(waits) / len(waits) if waits else 0.0,
+                    "p95_wait_seconds": waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else 0.0,
+                    "max_wait_seconds": waits[-1] if waits else 0.0,
+                    "retries": self._counts[(priority, "retries")],
+                    "rate_limited": self._counts[(priority, "rate_limited")],
+                    "failed": self._counts[(priority, "failed")],
+                }
+
+        return stats
+
+    def prometheus(self) -> str:
+        stats = self.stats()
+        lines = []
+
+        for metric, kind, help in (
+            ("queued", "gauge", "Calls waiting for admission."),
+            ("calls", "counter", "Calls admitted."),
+            ("mean_wait_seconds", "gauge", "Mean admission wait over recent calls."),
+            ("p95_wait_seconds", "gauge", "95th percentile admission wait over recent calls."),
+            ("retries", "counter", "Calls retried after a rate limit error."),
+            ("failed", "counter", "Calls that raised after admission, including rate limits past the retry budget."),
+        ):
+            name = f"teachingagent_scheduler_{metric}" + ("_total" if kind == "counter" else "")
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+            lines += [f'{name}{{priority="{priority}"}} {s[metric]:g}' for priority, s in stats.items()]
+
+        return "\n".join(lines) + "\n"
+
+    def reset_stats(self) -> None:
+        with self._cond:
+            self._waits.clear()
+            self._counts.clear()
+
+scheduler = Scheduler()
@@ -0,0 +1,54 @@
+import json
+
+def revision_schema(topics: dict[str, list[str]]) -> dict: # response_format for a multi-topic revision sheet run
+    strict = all(topics.values()) # strict mode needs every property listed up front
+
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "revision_sheet",
+            "strict": strict,
+            "schema": {
+                "type": "object",
+                "properties": {
+                    topic: {
+                        "type": "object",
+                        "properties": {subtopic: {"type": "string"} for subtopic in subtopics},
+                        "required": list(subtopics),
+                        "additionalProperties": False if subtopics else {"type": "string"},
+                    }
+                    for topic, subtopics in topics.items()
+                },
+                "required": list(topics),
+                "additionalProperties": False,
+            },
+        },
+    }
+
+def validate_revision(reply: str, topics: dict[str, list[str]]) -> dict[str, dict[str, str]]:
+    """
+    Topics from a multi-topic reply that match revision_schema, i.e. {subtopic: content} strings covering every requested
+    subtopic. Anything missing or malformed is left out for the caller to retry.
+    """
+
+    try:
+        data = json.loads(reply)
+    except ValueError:
+        return {}
+
+    if not isinstance(data, dict):
+        return {}
+
+    valid = {}
+
+    for topic, subtopics in topics.items():
+        content = data.get(topic)
+
+        if (
+            isinstance(content, dict) and content and
+            all(isinstance(k, str) and isinstance(v, str) and v.strip() for k, v in content.items()) and
+            all(subtopic in content for subtopic in subtopics)
+        ):
+            valid[topic] = content
+
+    return valid
@@ -1,27 +1,172 @@
-from openai import OpenAI
+from __future__ import annotations
+from collections.abc import MutableMapping
 from dataclasses import dataclass, field
-import tomllib
 from pathlib import Path
+from typing import Optional, Iterator, TYPE_CHECKING
+import os
+import re
+import threading
+import time
+
+if TYPE_CHECKING: # the openai sdk is slow to import and only needed for annotations here
+    from openai import OpenAI
 
 _parent = Path(__file__).resolve().parent.parent
 
-with (_parent / "config.toml").open("rb+") as f:
-    cfg = tomllib.load(f)
-    default_model = cfg["openai"]["model"]
+class _Config(MutableMapping):
+    """
+    config.toml, parsed on first access rather than at import time.
+    """
+    
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._data = None
+        self._lock = threading.Lock()
+        
+    @property
+    def data(self) -> dict:
+        if self._data is None:
+            with self._lock:
+                if self._data is None:
+                    import tomllib # only once config is first needed
+                    
+                    with self.path.open("rb") as f:
+                        self._data = tomllib.load(f)
+                        
+        return self._data
+    
+    def __getitem__(self, key: str) -> object:
+        return self.data[key]
+    
+    def __setitem__(self, key: str, value: object) -> None:
+        self.data[key] = value
+        
+    def __delitem__(self, key: str) -> None:
+        del self.data[key]
+        
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.data)
+    
+    def __len__(self) -> int:
+        return len(self.data)
+
+cfg = _Config(_parent / "config.toml")
 
-    with (_parent / cfg["prompts"]["main"]).open("r") as g:
-        default_prompt = g.read()
+def __getattr__(name: str) -> str: # default_model/default_prompt resolve lazily too
+    if name == "default_model":
+        return cfg["openai"]["model"]
+    
+    if name == "default_prompt":
+        return prompts["main"].text
+    
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+class Prompt:
+    """
+    A prompt precompiled into literal parts and [PLACEHOLDER]s, rendered in one pass with named parameters 
+    (e.g. [NUM_OF_QUESTIONS] -> render(num_of_questions=5)). Substituted values are never re-scanned.
+    """
+    
+    _placeholder = re.compile(r"\[([A-Z][A-Z0-9_]*)\]")
+    
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self._parts = Prompt._placeholder.split(text) # literal, name, literal, name, ..., literal
+        self.params = set(p.lower() for p in self._parts[1::2])
+        
+    def render(self, **params: object) -> str:
+        if not self.params:
+            return self.text
+        
+        missing = self.params - params.keys()
+        assert not missing, f"Missing prompt parameters: {', '.join(sorted(missing))}."
+        
+        return "".join(part if i % 2 == 0 else str(params[part.lower()]) for i, part in enumerate(self._parts))
+    
+    def __str__(self) -> str:
+        return self.text
+    
+class PromptRegistry:
+    """
+    Loads each prompt file once and precompiles it, re-reading a file only when its mtime changes (checked at most every 
+    reload_interval seconds). define() builds named templates on top of a file prompt, recompiled when the file reloads.
+    """
+    
+    def __init__(self, paths: Optional[dict[str, str]] = None, root: Path = _parent, reload_interval: float = 1.0) -> None:
+        self._paths = paths # defaults to cfg["prompts"], looked up on first use
+        self.root = root
+        self.reload_interval = reload_interval
+        self._loaded = {} # name: (mtime, Prompt)
+        self._checked = {} # name: time of last mtime check
+        self._derived = {} # name: (base prompt name or None, suffix template, Prompt or None)
+        self._lock = threading.Lock()
+        
+    def define(self, name: str, base: Optional[str], template: str) -> None: # template appended to prompt file `base` (or standalone)
+        with self._lock:
+            self._derived[name] = (base, template, None if base is not None else Prompt(template))
+        
+    def __getitem__(self, name: str) -> Prompt:
+        if name in self._derived:
+            base, template, compiled = self._derived[name]
+            
+            if base is None:
+                return compiled
+            
+            text = self[base].text + template
+            
+            if compiled is None or compiled.text != text: # base file changed
+                compiled = Prompt(text)
+                self._derived[name] = (base, template, compiled)
+                
+            return compiled
+        
+        now = time.monotonic()
+        
+        with self._lock:
+            if name in self._loaded and now - self._checked[name] < self.reload_interval:
+                return self._loaded[name][1]
+            
+            self._checked[name] = now
+            path = self.root / (self._paths if self._paths is not None else cfg["prompts"])[name]
+            mtime = os.stat(path).st_mtime_ns
+            
+            if name not in self._loaded or self._loaded[name][0] != mtime:
+                with open(path, "r") as f:
+                    self._loaded[name] = (mtime, Prompt(f.read()))
+                    
+            return self._loaded[name][1]
+        
+    def render(self, name: str, **params: object) -> str:
+        return self[name].render(**params)
 
 @dataclass(kw_only=True)
 class AssistantConfig: 
-    prompt: str = default_prompt
+    prompt: str = field(default_factory=lambda: prompts["main"].text)
     temperature: float = 1.0
     top_p: float = 0.05
-    model: str = default_model
+    model: str = field(default_factory=lambda: cfg["openai"]["model"])
     tools: list[dict[str, str]] = field(
         default_factory=lambda: [{"type": "file_search"}]
     )
     
+prompts = PromptRegistry()
+
+ROUTES = ("topics", "revision", "faq_generate", "evaluate", "select", "chat") # stages with a [routes.<stage>] table
+_ROUTE_PARENT = {"chat_prewarm": "chat", "chat_summary": "chat"} # answers the chat route would give, unless routed themselves
+
+def route(stage: str) -> dict[str, str | float]:
+    """
+    Run overrides for a pipeline stage from its [routes.<stage>] table - any of model, temperature and top_p, sent with
+    runs.create/stream in place of the assistant's own. Empty if the stage isn't routed.
+    """
+    
+    routes = cfg.get("routes", {})
+    table = routes.get(stage, routes.get(_ROUTE_PARENT.get(stage), {}))
+    overrides = {key: table[key] for key in ("model", "temperature", "top_p") if key in table}
+    
+    assert _validate(AssistantConfig(prompt="-", **overrides)), f"Invalid [routes.{stage}] config."
+    return overrides
+    
 def _validate(config: AssistantConfig | None) -> bool:
     return config is None or ( # thank you chat gpt
         isinstance(config.prompt, str) and config.prompt.strip() and
@@ -34,7 +179,7 @@ def _validate(config: AssistantConfig | None) -> bool:
         )
     )
     
-def quick_delete( # danger! deletes everything in storage
+def quick_delete( # deletes everything this package created (see ledger.py), or with everything=True, everything in the account - danger!
         client: OpenAI, 
         files: bool = True,
         vector_stores: bool = True,
@@ -42,69 +187,44 @@ def quick_delete( # danger! deletes everything in storage
         blacklist_file_ids: list[str] = [], 
         blacklist_vector_store_ids: list[str] = [],
         blacklist_assistant_ids: list[str] = [],
+        threads: bool = True,
+        everything: bool = False,
+        workers: Optional[int] = None,
     ) -> None: 
     
-    if files:
-        files = client.files.list()
-        file_count = 0
-        file_ids = []
-        
-        for file in files: # some weird stuff going on if deleting when iterating
-            if not file.id in blacklist_file_ids:
-                file_ids.append(file.id)
-                
-        for f in file_ids:
-            try:
-                client.files.delete(f)
-                print(f"Deleted file with ID: {f}")
-                file_count += 1
-            except Exception as e:
-                print(f"Failed to delete file [{f}]. Error: {e}.")
-            
-        print(f"Deleted {file_count} file{'s' if not file_count == 1 else ''}.\n")
-        
-    if vector_stores:
-        stores = client.beta.vector_stores.list()
-        store_count = 0
-        store_ids = []
-        
-        for store in stores:
-            if not store.id in blacklist_vector_store_ids:
-                store_ids.append(store.id)
-                
-        for s in store_ids:
-            try:    
-                client.beta.vector_stores.delete(s)
-                print(f"Deleted vector store with ID: {s}")
-                store_count += 1
-            except Exception as e:
-                print(f"Failed to delete vector store [{s}]. Error: {e}.")
-
-        print(f"Deleted {store_count} vector store{'s' if not store_count == 1 else ''}.\n")
+    from .ledger import delete_resources, ledger
+    
+    kinds = {"file": files, "vector_store": vector_stores, "assistant": assistants, "helper": assistants, "thread": threads}
+    blacklist = set(blacklist_file_ids) | set(blacklist_vector_store_ids) | set(blacklist_assistant_ids)
+    resources = ledger.owned(kinds=[kind for kind, wanted in kinds.items() if wanted])
+    
+    if everything: # threads can't be listed, so only the ledger knows about those
+        listed = {"file": client.files.list, "vector_store": client.beta.vector_stores.list, "assistant": client.beta.assistants.list}
         
-    if assistants:
-        assistants = client.beta.assistants.list()
-        assistant_count = 0
-        assistant_ids = []
+        for kind, list_fn in listed.items():
+            if kinds[kind]:
+                resources += [(kind, obj.id) for obj in list_fn()] # some weird stuff going on if deleting when iterating
+    
+    resources = [(kind, id) for kind, id in dict.fromkeys(resources) if id not in blacklist]
+    result = delete_resources(client, resources, workers=workers)
+    deleted = set(result["deleted"])
+    
+    for id in result["failed"]:
+        print(f"Failed to delete [{id}].")
+    
+    for kind, label in (("file", "file"), ("vector_store", "vector store"), ("assistant", "assistant"), ("helper", "helper assistant"), ("thread", "thread")):
+        count = sum(id in deleted for k, id in resources if k == kind)
         
-        for assistant in assistants:
-            if not assistant.id in blacklist_assistant_ids:
-                assistant_ids.append(assistant.id)
-                
-        for a in assistant_ids:
-            try:    
-                client.beta.assistants.delete(a)
-                print(f"Deleted assistant with ID: {a}")
-                assistant_count += 1
-            except Exception as e:
-                print(f"Failed to delete assistant [{a}]. Error: {e}.")
-
-        print(f"Deleted {assistant_count} assistant{'s' if not assistant_count == 1 else ''}.\n")
+        if kinds[kind]:
+            print(f"Deleted {count} {label}{'s' if not count == 1 else ''}.")
     
 if __name__ == "__main__":
+    import openai # not the annotation-only OpenAI above
+    import tomllib
+    
     with open("config.toml", "rb+") as f:
         config = tomllib.load(f)
         
-    client = OpenAI(api_key=config["openai"]["secret"])
+    client = openai.OpenAI(api_key=config["openai"]["secret"])
     quick_delete(client)
     
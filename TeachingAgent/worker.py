@@ -0,0 +1,207 @@
+from __future__ import annotations
+from concurrent.futures import Future, wait
+from typing import Callable, Optional, TYPE_CHECKING
+import asyncio
+import os
+import threading
+import time
+from .utils import cfg
+
+if TYPE_CHECKING:
+    from .assistants import TeachingAgent
+
+JOB_STATUSES = ("queued", "running", "prewarming", "done", "failed", "cancelled") # prewarming: results final, FAQ answers being cached
+
+class OverviewJob:
+    """
+    One overview built by an OverviewWorker. Partial results fill in as the pipelines progress - `topics` once the topic
+    list exists, `revision` topic by topic, `questions` as soon as the FAQs are ready - and every attribute is safe to
+    read from another thread, so a page can poll summary() on each rerun without blocking. Updates start from the
+    agent's previous overview, so the page never goes blank while new files are folded in.
+    """
+
+    def __init__(self, agent: TeachingAgent, file_ids: Optional[list[str]] = None) -> None:
+        self.id = os.urandom(4).hex()
+        self.agent = agent
+        self.file_ids = file_ids # None for a full prep_overview, else the files update_overview folds in
+        self.status = "queued" # see JOB_STATUSES
+        self.topics = dict()
+        self.revision = dict()
+        self.questions = list()
+        self.error = None
+        self.faqs_ready = False
+        self.submitted, self.started, self.finished = time.monotonic(), None, None
+        self._future = Future()
+        self._task = None # set on the worker's loop
+
+    @classmethod
+    def completed(cls, agent: TeachingAgent) -> OverviewJob: # a finished job for the overview a resumed agent already has
+        job = cls(agent)
+        job.topics, revision, questions = agent.ra.overview
+        job.revision, job.questions = dict(revision or {}), list(questions or [])
+        job.faqs_ready, job.status = True, "done"
+        job.started = job.finished = job.submitted
+        job._future.set_result(agent.ra.overview)
+
+        return job
+
+    def _stage(self, name: str, result: object) -> None:
+        if name == "topics":
+            self.topics = result
+        elif name == "questions":
+            self.questions, self.faqs_ready = result or list(), True
+
+    def _topic(self, topic: str, content: dict[str, str]) -> None:
+        self.revision = self.revision | {topic: content} # swapped, never mutated, so readers see a consistent dict
+
+    @property
+    def done(self) -> bool:
+        return self._future.done()
+
+    def summary(self) -> dict[str, object]: # cheap snapshot for a progress widget
+        end = self.finished or time.monotonic()
+
+        return {
+            "status": self.status,
+            "topics": len(self.topics),
+            "topics_done": len(self.revision),
+            "faqs_ready": self.faqs_ready,
+            "seconds": round(end - (self.started or end), 1),
+            "error": None if self.error is None else str(self.error),
+        }
+
+    def result(self, timeout: Optional[float] = None) -> list[dict[str, list[str]], str, list[str]]:
+        return self._future.result(timeout)
+
+    def wait(self, timeout: Optional[float] = None) -> bool: # True once finished, whatever the outcome
+        return not wait([self._future], timeout).not_done
+
+    def add_done_callback(self, fn: Callable[[Future], None]) -> None:
+        self._future.add_done_callback(fn)
+
+    def cancel(self) -> None: # in-flight runs are cancelled server-side, see RevisionTool.prep_overview
+        if self._task is not None:
+            self._task.get_loop().call_soon_threadsafe(self._task.cancel)
+        else:
+            self._cancelled()
+
+    def _cancelled(self) -> None:
+        if self._future.cancel():
+            self.status = "cancelled"
+            self._future.set_running_or_notify_cancel() # wakes wait()
+
+class OverviewWorker:
+    """
+    Builds overviews on a long-lived event loop in a daemon thread, so they outlive the script run (or asyncio.run) that
+    asked for them - create one per server process, e.g. through st.cache_resource, and share it between sessions.
+    submit() returns an OverviewJob straight away. At most [worker] max_jobs overviews run at once, and jobs for the
+    same agent run one after another in submission order.
+    """
+
+    def __init__(self, max_jobs: Optional[int] = None) -> None:
+        self.max_jobs = max_jobs or cfg.get("worker", {}).get("max_jobs", 4)
+        self.jobs = dict() # id: OverviewJob, unfinished jobs only
+        self._loop = asyncio.new_event_loop()
+        self._slots = None # created on the loop
+        self._last = dict() # session id: that agent's latest job, which the next one waits for
+        self._thread = threading.Thread(target=self._loop.run_forever, name="OverviewWorker", daemon=True)
+        self._thread.start()
+
+    def submit(
+            self,
+            agent: TeachingAgent,
+            file_ids: Optional[list[str]] = None,
+            num_faq_questions: Optional[int] = 5,
+            timeout: Optional[float] = None,
+            on_topic: Optional[Callable[[str, dict[str, str]], None]] = None,
+        ) -> OverviewJob:
+        """
+        Queue an overview of the agent's files, or with file_ids (from add_files/ingest) an update folding just those
+        files into the agent's last overview. on_topic is called from the worker thread as each topic finishes.
+        """
+
+        job = OverviewJob(agent, file_ids)
+        self.jobs[job.id] = job
+        job.add_done_callback(lambda _: self.jobs.pop(job.id, None))
+        self._loop.call_soon_threadsafe(self._start, job, num_faq_questions, timeout, on_topic)
+
+        return job
+
+    def _start(self, job: OverviewJob, num_faq_questions: Optional[int], timeout: Optional[float], on_topic: Optional[Callable]) -> None:
+        if job.done: # cancelled while queued
+            return
+
+        job._task = self._loop.create_task(self._run(job, num_faq_questions, timeout, on_topic))
+        job._task.add_done_callback(lambda task: task.cancelled() and job._cancelled()) # cancelled before it started
+
+    async def _run(self, job: OverviewJob, num_faq_questions: Optional[int], timeout: Optional[float], on_topic: Optional[Callable]) -> None:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_jobs)
+
+        previous, self._last[job.agent.session_id] = self._last.get(job.agent.session_id), job
+
+        def topic(name: str, content: dict[str, str]) -> None:
+            job._topic(name, content)
+
+            if on_topic is not None:
+                on_topic(name, content)
+
+        try:
+            if previous is not None and not previous.done: # an update needs the overview before it
+                await asyncio.wait([asyncio.wrap_future(previous._future)])
+
+            async with self._slots:
+                job.status, job.started = "running", time.monotonic()
+
+                if job.file_ids is not None and job.agent.ra.overview is not None:
+                    job.topics, job.revision, job.questions = job.agent.ra.overview[0], dict(job.agent.ra.overview[1]), list(job.agent.ra.overview[2])
+
+                if job.file_ids is None:
+                    result = await job.agent.ra.prep_overview(num_faq_questions, on_topic=topic, timeout=timeout, on_stage=job._stage)
+                else:
+                    result = await job.agent.ra.update_overview(job.file_ids, num_faq_questions, on_topic=topic, timeout=timeout, on_stage=job._stage)
+
+                job.agent._autosave()
+
+                if cfg.get("answers", {}).get("prewarm", True):
+                    job.topics, job.revision, job.questions = result[0], dict(result[1] or {}), list(result[2] or [])
+                    job.faqs_ready, job.status = True, "prewarming"
+                    await job.agent.prewarm_answers(job.questions)
+
+        except asyncio.CancelledError:
+            job._cancelled()
+
+        except Exception as e:
+            job.status, job.error = "failed", e
+            job.agent.logger.log(f"Overview job {job.id} failed: {e!r}", "error")
+            job._future.set_exception(e)
+
+        else:
+            job.topics, job.revision, job.questions = result[0], dict(result[1] or {}), list(result[2] or [])
+            job.faqs_ready, job.status = True, "done"
+            job._future.set_result(result)
+
+        finally:
+            job.finished = time.monotonic()
+
+            if self._last.get(job.agent.session_id) is job:
+                del self._last[job.agent.session_id]
+
+    def cancel(self, agent: TeachingAgent, timeout: Optional[float] = None) -> None: # e.g. before agent.close(), so cleanup doesn't race the job
+        jobs = [job for job in list(self.jobs.values()) if job.agent is agent]
+
+        for job in jobs:
+            job.cancel()
+
+        for job in jobs:
+            job.wait(timeout)
+
+    def close(self, timeout: Optional[float] = 30) -> None:
+        for job in list(self.jobs.values()):
+            job.cancel()
+
+        for job in list(self.jobs.values()):
+            job.wait(timeout)
+
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
@@ -1,4 +1,7 @@
-from TeachingAgent import TeachingAgent, quick_delete
+from TeachingAgent import TeachingAgent, ResourcePool, OverviewWorker, quick_delete
+from TeachingAgent.metrics import metrics
+from TeachingAgent.ledger import sweep
+from TeachingAgent.worker import OverviewJob
 import streamlit as st
 from openai import OpenAI
 import tomllib
@@ -8,7 +11,33 @@ with open("config.toml", "rb+") as f:
     config = tomllib.load(f)
 
 secret = config["openai"]["secret"]
-client = OpenAI(api_key=secret)
+
+@st.cache_resource
+def get_client() -> OpenAI: # one client (and connection pool) per server process, not one per rerun
+    return OpenAI(api_key=secret)
+
+client = get_client()
+
+@st.cache_resource
+def serve_metrics() -> None: # Prometheus text endpoint for run metrics, once per server process
+    if port := config.get("metrics", {}).get("port"):
+        metrics.serve(port)
+
+serve_metrics()
+
+@st.cache_resource
+def sweep_orphans() -> None: # delete what sessions of crashed or abandoned servers left behind, once per server process
+    sweep(client)
+
+sweep_orphans()
+
+@st.cache_resource
+def get_pool() -> ResourcePool: # one warm pool per server process, shared by every browser session
+    return ResourcePool(client, size=config.get("pool", {}).get("size", 2))
+
+@st.cache_resource
+def get_worker() -> OverviewWorker: # builds every session's overview off the script thread, outliving reruns
+    return OverviewWorker()
 
 # Initialize state for the session
 if "session" not in st.session_state:
@@ -17,23 +46,79 @@ if "session" not in st.session_state:
 # Main app for managing the session
 st.title("RAG Teaching Assistant")
 
-def callback(future: tuple) -> None:
-    _, revision, questions = future.result()
-    st.session_state["session"]["callback_result"] = revision
+@st.fragment(run_every=2)
+def ingestion_progress() -> None: # reruns on its own, chat works meanwhile and files are searchable as they index
+    if (ingestion := st.session_state["session"].get("ingestion")) is None:
+        return
+    
+    progress = ingestion.progress()
+    finished = sum(p.status in ("completed", "skipped", "failed") for p in progress)
+    st.progress(finished / max(len(progress), 1), text=f"Indexed {finished}/{len(progress)} files")
+    
+    for p in progress:
+        st.caption(f"{p.name}: {p.status}" + (f" ({p.error})" if p.error else ""))
     
-    # add questions to main page
+    if ingestion.done:
+        del st.session_state["session"]["ingestion"]
+        job = st.session_state["session"]["agent"].session_streamlit(new_files=ingestion.result(), worker=get_worker()) # mid-session uploads only update the overview
+        
+        if job is not None: # None if nothing new was attached
+            st.session_state["session"]["overview"] = job
+        
+        st.success("Files uploaded and processed successfully.")
+
+@st.fragment(run_every=2)
+def overview_progress() -> None: # polls the worker's job, partial results show up as they are ready
+    if (job := st.session_state["session"].get("overview")) is None:
+        return
+    
+    summary = job.summary()
+    
+    if summary["status"] in ("queued", "running"):
+        st.progress(summary["topics_done"] / max(summary["topics"], 1), text=f"Overview {summary['status']}: {summary['topics_done']}/{summary['topics']} topics done, FAQs {'ready' if summary['faqs_ready'] else 'pending'}")
+    elif summary["status"] == "failed":
+        st.warning(f"Overview failed: {summary['error']}")
+    
+    if job.faqs_ready and job.questions:
+        with st.expander("Frequently Asked Questions", expanded=False):
+            for question in job.questions:
+                st.markdown(f"- {question}")
+    
+    if job.revision:
+        with st.expander("Revision Notes", expanded=False):
+            st.write(job.revision)
+
+# Resume the session in the URL after a server restart or reload, from its snapshot rather than from scratch
+if st.session_state["session"]["agent"] is None and (resume := st.query_params.get("session")):
+    agent = TeachingAgent(client, pool=get_pool(), resume=resume)
+    st.session_state["session"]["agent"] = agent
+    
+    if agent.resumed:
+        st.session_state["session"]["history"] = [{"role": "user" if m["role"] == "user" else "AI", "content": m["content"]} for m in agent.transcript]
+        
+        if agent.ra.overview is not None:
+            st.session_state["session"]["overview"] = OverviewJob.completed(agent)
+        
+        st.success("Session resumed!")
+    
+    elif agent.session_id != resume: # still open in another tab or server, this tab gets its own session
+        st.query_params["session"] = agent.session_id
+        st.warning("That session is open elsewhere, started a new one.")
 
 # Start a session
 if st.session_state["session"]["agent"] is None:
     if st.button("Start Session"):
-        st.session_state["session"]["agent"] = TeachingAgent(client)
+        st.session_state["session"]["agent"] = TeachingAgent(client, pool=get_pool())
+        st.query_params["session"] = st.session_state["session"]["agent"].session_id
         st.success("Session started!")
 
 if st.session_state["session"]["agent"]:
     # End session
     if st.button("End Session"):
+        get_worker().cancel(st.session_state["session"]["agent"], timeout=30) # stop its overview before deleting what it runs on
         st.session_state["session"]["agent"].close()
         st.session_state["session"] = {"uploaded_files": {}, "files": [], "file_names": [], "history": [], "agent": None}
+        st.query_params.pop("session", None)
         st.success("Session ended.")
 
     # File upload for the session in collapsible sidebar
@@ -61,10 +146,10 @@ if st.session_state["session"]["agent"]:
                 new_files = list(st.session_state["session"]["uploaded_files"].values())
                 st.session_state["session"]["files"].extend(new_files)
                 st.session_state["session"]["file_names"].extend(file_names)
-                st.session_state["session"]["agent"].add_files(new_files, binaries=True)
+                st.session_state["session"]["ingestion"] = st.session_state["session"]["agent"].ingest(new_files, binaries=True) # returns straight away
                 st.session_state["session"]["uploaded_files"] = {}
-                st.session_state["session"]["agent"].session_streamlit(callback)
-                st.success("Files uploaded and processed successfully.")
+                
+        ingestion_progress()
                 
         st.subheader("Uploaded Files")
         for i in st.session_state["session"]["file_names"]:
@@ -85,13 +170,10 @@ if st.session_state["session"]["agent"]:
         with st.chat_message("user"):
             st.markdown(prompt)
             
-        resp = st.session_state["session"]["agent"].converse_streamlit(prompt)
+        with st.chat_message("AI"): # render tokens as they arrive
+            resp = st.write_stream(st.session_state["session"]["agent"].converse_streamlit_stream(prompt))
+            
         st.session_state["session"]["history"].append({"role": "AI", "content": resp})
-        
-        with st.chat_message("AI"):
-            st.markdown(resp)
             
-     # Add a separate tab for callback result
-    if "callback_result" in st.session_state["session"] and st.session_state["session"]["callback_result"] is not None:
-        with st.expander("Callback Result", expanded=False):
-            st.write(st.session_state["session"]["callback_result"])
+    # Revision overview, built in the background
+    overview_progress()
@@ -0,0 +1,351 @@
+"""
+Offline benchmarks for the session hot paths, run against TeachingAgent.fake.FakeOpenAI.
+
+    python benchmark.py [--latency 0.05] [--run-latency 0.5] [--failure-rate 0] [--turns 20] [--rate-limit 20] [--route-model gpt-4.1-nano] [--json out.json]
+    python benchmark.py --import-budget-ms [100]   # fail if importing the package takes longer than asyncio alone plus this (python -X importtime)
+"""
+
+from TeachingAgent import TeachingAgent, OverviewWorker
+from TeachingAgent.fake import FakeOpenAI
+from TeachingAgent.metrics import metrics
+from TeachingAgent.scheduler import scheduler
+from TeachingAgent.answers import answers
+from TeachingAgent.utils import cfg
+from pathlib import Path
+from typing import Optional
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+IMPORT_BUDGET_MS = 100 # TeachingAgent.assistants on top of asyncio, about 50ms on a quiet laptop
+
+def measure(client: FakeOpenAI, fn) -> dict[str, float | int]:
+    client.reset_stats()
+    start = time.perf_counter()
+    result = fn()
+
+    return {
+        "seconds": round(time.perf_counter() - start, 3),
+        "round_trips": client.round_trips,
+        "peak_concurrency": client.peak_concurrency,
+        "peak_runs": client.peak_runs,
+        "calls": dict(client.calls),
+    } | (result or {})
+
+def import_time_ms(module: str = "TeachingAgent.assistants", baseline: str = "asyncio") -> float:
+    """
+    Cumulative -X importtime of everything `import module` pulls in, on top of `import baseline`: asyncio (and the ssl,
+    socket and concurrent.futures it brings) is most of the total, and every session runs on it anyway.
+    """
+
+    def top_level(code: str) -> dict[str, int]:
+        stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, check=True).stderr
+        imports = {}
+
+        for line in stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+
+            _, cumulative, name = line.split("|")
+
+            if not name[1:].startswith(" "): # nested imports are already counted in their parent's cumulative time
+                imports[name.strip()] = int(cumulative)
+
+        return imports
+
+    startup = top_level(f"import {baseline}")
+    return sum(us for name, us in top_level(f"import {baseline}; import {module}").items() if name not in startup) / 1000
+
+def bench_startup(client: FakeOpenAI) -> dict:
+    def startup():
+        TeachingAgent(client, verbosity={"verbose": False})
+
+    return measure(client, startup)
+
+def bench_ingestion(client: FakeOpenAI, files: list[str]) -> dict:
+    first, second = (TeachingAgent(client, verbosity={"verbose": False}) for _ in range(2))
+    cold = measure(client, lambda: {"attached": len(first.add_files(files))})
+    warm = measure(client, lambda: {"attached": len(second.add_files(files))}) # same bytes, served by the content-addressed index
+
+    cfg.setdefault("cache", {})["file_index"] = str(Path(tempfile.mkdtemp()) / "bench.sqlite3") # cold again
+    third = TeachingAgent(client, verbosity={"verbose": False})
+
+    def background(): # files are searchable one by one, long before the whole batch has indexed
+        start, first = time.perf_counter(), []
+        ingestion = third.ingest(*files, on_progress=lambda p: p.status == "completed" and not first and first.append(time.perf_counter() - start))
+        returned = time.perf_counter() - start
+
+        return {"attached": len(ingestion.result()), "returned_seconds": round(returned, 3), "first_indexed_seconds": round(first[0], 3) if first else None}
+
+    return {"cold": cold, "warm": warm, "background": measure(client, background)}
+
+def bench_preprocess(client: FakeOpenAI, files: list[str]) -> dict: # bytes and chunks saved by uploading compact text (needs pypdf)
+    ingestion = TeachingAgent(client, verbosity={"verbose": False}).ingest(*files, *files[:1]) # the repeat is de-duplicated by content
+    ingestion.result()
+    reports = [p.preprocessed or {"name": p.name, "uploaded": "as-is", "status": p.status} for p in ingestion.progress()]
+    prepared = [report for report in reports if "bytes_saved" in report]
+
+    return {
+        "files": reports,
+        "bytes_saved": sum(report["bytes_saved"] for report in prepared),
+        "chunks_saved": sum(report["chunks_saved"] for report in prepared),
+    }
+
+def bench_chat(client: FakeOpenAI, turns: int, context: Optional[dict] = None) -> dict:
+    agent = TeachingAgent(client, verbosity={"verbose": False}, context=context)
+    agent.in_session = True
+
+    def polled():
+        latencies = []
+
+        for i in range(turns):
+            start = time.perf_counter()
+            agent.converse_streamlit(f"Question {i}")
+            latencies.append(time.perf_counter() - start)
+
+        window = max(1, min(5, turns // 4)) # per-turn latency should stay flat as the thread grows
+        return {
+            "first_turns_mean_seconds": round(sum(latencies[:window]) / window, 3),
+            "last_turns_mean_seconds": round(sum(latencies[-window:]) / window, 3),
+        }
+
+    def streamed():
+        first_token = []
+
+        for i in range(turns):
+            start = time.perf_counter()
+            deltas = agent.converse_streamlit_stream(f"Question {i}")
+            next(deltas)
+            first_token.append(time.perf_counter() - start)
+
+            for _ in deltas:
+                pass
+
+        return {"mean_time_to_first_token": round(sum(first_token) / len(first_token), 3)}
+
+    if agent.st_thread is None:
+        agent.st_thread = client.beta.threads.create()
+
+    return {"polled": measure(client, polled), "streamed": measure(client, streamed)}
+
+def bench_answers(client: FakeOpenAI, files: list[str], questions: int) -> dict: # a second class asking the first one's questions, reworded
+    asked = [f"What are the main stages of process number {i} in the course?" for i in range(questions)]
+    reworded = [f"what are the main stages of process number {i} within the course" for i in range(questions)]
+    first, second = (TeachingAgent(client, verbosity={"verbose": False}) for _ in range(2))
+    first.add_files(files)
+    second.add_files(files)
+
+    def ask(agent: TeachingAgent, prompts: list[str]):
+        answers.reset_stats()
+        latencies = []
+
+        for prompt in prompts:
+            start = time.perf_counter()
+            agent.converse_streamlit(prompt)
+            latencies.append(time.perf_counter() - start)
+
+        return {"mean_seconds": round(sum(latencies) / len(latencies), 4), "cache": answers.stats()}
+
+    return {"cold": measure(client, lambda: ask(first, asked)), "repeated": measure(client, lambda: ask(second, reworded))}
+
+def bench_overview(client: FakeOpenAI, files: list[str], batch_tokens: int = 0) -> dict:
+    agent = TeachingAgent(client, verbosity={"verbose": False})
+    agent.add_files(files)
+
+    def overview():
+        topics, revision, questions = asyncio.run(agent.ra.prep_overview(5, use_cache=False, batch_tokens=batch_tokens))
+        return {"topics": len(topics), "revision_topics": len(revision), "questions": len(questions)}
+
+    return measure(client, overview)
+
+def bench_incremental(client: FakeOpenAI, files: list[str]) -> dict: # one more file mid-session: update_overview vs a full prep_overview
+    agent = TeachingAgent(client, verbosity={"verbose": False})
+    agent.add_files(files[:-1])
+    asyncio.run(agent.ra.prep_overview(5, use_cache=False))
+    added = agent.add_files(files[-1:]) # uploading it is the same either way
+
+    def update():
+        topics, revision, questions = asyncio.run(agent.ra.update_overview(added, 5))
+        return {"topics": len(topics), "revision_topics": len(revision), "questions": len(questions)}
+
+    def full():
+        topics, revision, questions = asyncio.run(agent.ra.prep_overview(5, use_cache=False))
+        return {"topics": len(topics), "revision_topics": len(revision), "questions": len(questions)}
+
+    return {"update": measure(client, update), "full": measure(client, full)}
+
+def bench_worker(client: FakeOpenAI, files: list[str]) -> dict: # how soon a polling page has something to show
+    agent = TeachingAgent(client, verbosity={"verbose": False})
+    agent.add_files(files)
+    agent.ra.invalidate_overview()
+    worker = OverviewWorker()
+
+    def background():
+        start, seen = time.perf_counter(), {}
+        job = agent.session_streamlit(worker=worker)
+        returned = time.perf_counter() - start
+
+        while not job.done:
+            summary = job.summary()
+
+            for stage, ready in (("topics", summary["topics"]), ("first_topic", summary["topics_done"]), ("faqs", summary["faqs_ready"])):
+                if ready and stage not in seen:
+                    seen[stage] = round(time.perf_counter() - start, 3)
+
+            time.sleep(0.01)
+
+        seen.setdefault("faqs", round(time.perf_counter() - start, 3)) # ready in the same instant the job finished
+        return {"returned_seconds": round(returned, 3)} | {f"{stage}_seconds": seconds for stage, seconds in seen.items()}
+
+    result = measure(client, background)
+    worker.close()
+
+    return result
+
+def bench_resume(client: FakeOpenAI, files: list[str]) -> dict: # restart costs: rebuild everything vs reattach to a snapshot
+    agents = []
+
+    def cold():
+        agents.append(TeachingAgent(client, verbosity={"verbose": False}))
+        agents[0].ra.invalidate_overview()
+        agents[0].add_files(files)
+        asyncio.run(agents[0].ra.prep_overview(5))
+        agents[0].snapshot()
+        TeachingAgent._live.pop(agents[0].session_id) # as if its process had exited
+
+    def resume():
+        agents.append(TeachingAgent(client, verbosity={"verbose": False}, resume=agents[0].session_id))
+        return {"resumed": agents[1].resumed, "files": len(agents[1].file_hashes), "overview": agents[1].ra.overview is not None}
+
+    results = {"cold": measure(client, cold), "resume": measure(client, resume)}
+    agents[1].close()
+
+    return results
+
+def bench_routes(files: list[str], turns: int, latency: float, run_latency: float, route_model: str) -> dict: # FAQ evaluate/select on a smaller, faster model
+    routes, results = cfg.get("routes"), {}
+    small = {"model": route_model, "temperature": 0.2}
+    prices = cfg.setdefault("pricing", {}) # list prices per million input/output tokens, unless [pricing] has its own
+
+    for model, price in ((cfg["openai"]["model"], [0.15, 0.60]), (route_model, [0.10, 0.40])):
+        prices.setdefault(model, price)
+
+    for name, routed in (("unrouted", {}), ("routed", {"evaluate": small, "select": small})):
+        cfg["routes"] = routed
+        client = FakeOpenAI(latency={"runs": 3 * run_latency, "default": latency}, seed=0, model_latency={route_model: run_latency}) # longer than a poll interval, so the difference shows
+        agent = TeachingAgent(client, verbosity={"verbose": False})
+        agent.add_files(files)
+        agent.in_session = True
+        agent.st_thread = client.beta.threads.create()
+
+        def overview_and_chat():
+            since = time.time()
+            start = time.perf_counter()
+            asyncio.run(agent.ra.prep_overview(5, use_cache=False))
+            overview = time.perf_counter() - start
+
+            for i in range(turns):
+                agent.converse_streamlit(f"Question {i}")
+
+            return {"overview_seconds": round(overview, 3), "runs_by_route": metrics.summary(by_route=True, since=since)}
+
+        results[name] = measure(client, overview_and_chat)
+        agent.close()
+
+    if routes is None:
+        cfg.pop("routes")
+    else:
+        cfg["routes"] = routes
+
+    return results
+
+def bench_contention(client: FakeOpenAI, files: list[str], turns: int) -> dict: # chat turns while an overview runs against a rate limited API
+    background = TeachingAgent(client, verbosity={"verbose": False})
+    background.add_files(files)
+    agent = TeachingAgent(client, verbosity={"verbose": False})
+    agent.in_session = True
+    agent.st_thread = client.beta.threads.create()
+
+    def contended():
+        scheduler.reset_stats()
+        overview = threading.Thread(target=lambda: asyncio.run(background.ra.prep_overview(5, use_cache=False)))
+        overview.start()
+        latencies = []
+
+        for i in range(turns):
+            start = time.perf_counter()
+            agent.converse_streamlit(f"Question {i}")
+            latencies.append(time.perf_counter() - start)
+
+        overview.join()
+
+        return {
+            "chat_mean_seconds": round(sum(latencies) / len(latencies), 3),
+            "chat_max_seconds": round(max(latencies), 3),
+            "rate_limited": client.rate_limited,
+            "scheduler": scheduler.stats(),
+        }
+
+    return measure(client, contended)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark TeachingAgent session pipelines offline.")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per control-plane call")
+    parser.add_argument("--run-latency", type=float, default=0.5, help="seconds per run")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--context-latency", type=float, default=0.01, help="extra seconds per thread message a run replays")
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--batch-tokens", type=int, default=12000, help="revision sheet batch budget for overview_batched")
+    parser.add_argument("--rate-limit", type=int, default=20, help="requests per second the API allows in the contention benchmark")
+    parser.add_argument("--route-model", default="gpt-4.1-nano", help="model the routes benchmark sends FAQ evaluation and selection to, with runs a third as long")
+    parser.add_argument("--json", help="also write results to this file")
+    parser.add_argument("--import-budget-ms", type=float, nargs="?", const=IMPORT_BUDGET_MS, help=f"only check the package import time, on top of asyncio, against this budget (default {IMPORT_BUDGET_MS}ms)")
+    args = parser.parse_args()
+
+    if args.import_budget_ms is not None:
+        ms = min(import_time_ms() for _ in range(3)) # best of 3, the first run also pays for .pyc compilation
+        print(f"Import time: {ms:.1f}ms (budget {args.import_budget_ms:g}ms)")
+        sys.exit(0 if ms <= args.import_budget_ms else 1)
+
+    scratch = Path(tempfile.mkdtemp()) # never touch the real caches or logs
+    cfg.setdefault("cache", {})["file_index"] = str(scratch / "bench.sqlite3")
+    cfg.setdefault("logging", {})["file"] = str(scratch / "sessions.log")
+    metrics.jsonl = None
+    client = FakeOpenAI(latency={"runs": args.run_latency, "default": args.latency}, failure_rate=args.failure_rate, seed=0, context_latency=args.context_latency)
+    files = sorted(str(p) for p in Path("files").glob("*.pdf"))
+
+    results = {
+        "startup": bench_startup(client),
+        "ingestion": bench_ingestion(client, files),
+        "preprocess": bench_preprocess(client, files),
+        f"chat_{args.turns}_turns": bench_chat(client, args.turns),
+        f"chat_{args.turns}_turns_unbounded": bench_chat(client, args.turns, context={"mode": None}),
+        "answers": bench_answers(client, files, max(1, args.turns // 2)),
+        "overview": bench_overview(client, files),
+        "overview_batched": bench_overview(client, files, args.batch_tokens),
+        "overview_incremental": bench_incremental(client, files),
+        "overview_worker": bench_worker(client, files),
+        "resume": bench_resume(client, files),
+        "routes": bench_routes(files, max(1, args.turns // 4), args.latency, args.run_latency, args.route_model),
+        "contention": bench_contention(
+            FakeOpenAI(latency={"runs": args.run_latency, "default": args.latency}, seed=0, rate_limit=(args.rate_limit, 1.0)),
+            files,
+            max(1, args.turns // 4),
+        ),
+    }
+    results["runs_by_stage"] = metrics.summary() # everything above, from the per-run metrics
+    results["runs_by_route"] = metrics.summary(by_route=True)
+
+    print(json.dumps(results, indent=4))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=4)
+
+if __name__ == "__main__":
+    main()
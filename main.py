@@ -1,23 +1,199 @@
-from TeachingAgent import TeachingAgent, quick_delete
-from openai import OpenAI
+from TeachingAgent import TeachingAgent
+from TeachingAgent.ledger import sweep
+from TeachingAgent.utils import cfg
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Optional
+import argparse
+import asyncio
+import json
+import math
+import os
+import shutil
+import tempfile
+import time
 import tomllib
 
-def main(client, config) -> None:
-    ta = TeachingAgent(client)
-    
-    ta.add_files(config["local"]["pdf1"])
-    ta.add_files(config["local"]["pdf2"])
-    
-    ta.session()
+SUPPORTED = (".pdf", ".txt", ".md", ".docx", ".pptx", ".html") # course material file_search can index
+
+def main(client, config, resume: Optional[str] = None) -> None:
+    ta = TeachingAgent(client, resume=resume) # files already in a resumed session's vector store are skipped, as is its overview
+    print(f"Session {ta.session_id}" + (" resumed" if ta.resumed else "") + f", if interrupted continue it with --resume {ta.session_id}")
+
+    ingestion = ta.ingest(config["local"]["pdf1"], config["local"]["pdf2"]) # chat while these index, the overview waits for them
+
+    ta.session(ingestion=ingestion)
     ta.close()
 
+def load_courses(source: str) -> dict[str, list[str]]:
+    """
+    Courses to precompute: a directory with one sub-directory of material per course (or the material itself, for a
+    single course), or a manifest - .json {course: [path, ...]} or .jsonl lines of {"course": ..., "files": [...]},
+    with paths relative to the manifest.
+    """
+
+    path = Path(source)
+    material = lambda folder: sorted(str(p) for p in folder.rglob("*") if p.is_file() and p.suffix.lower() in SUPPORTED)
+
+    if path.is_dir():
+        courses = {folder.name: material(folder) for folder in sorted(path.iterdir()) if folder.is_dir()}
+        return {course: files for course, files in courses.items() if files} or {path.name: material(path)}
+
+    with path.open(encoding="utf-8") as f:
+        if path.suffix == ".jsonl":
+            entries = {entry["course"]: entry["files"] for entry in map(json.loads, filter(str.strip, f))}
+        else:
+            entries = json.load(f)
+
+    return {str(course): [str(path.parent / fp) for fp in files] for course, files in entries.items()}
+
+def completed_courses(out: Path) -> set[str]: # resume: courses already written as done (a torn last line is ignored)
+    done = set()
+
+    if not out.exists():
+        return done
+
+    with out.open(encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+            if record.get("status") == "done":
+                done.add(record["course"])
+
+    return done
+
+_client = None # per worker process
+
+def _init_worker(fake: bool, engine_workers: int, rate_share: float, scratch: Optional[str] = None) -> None:
+    global _client
+
+    if scratch is not None: # dry run: canned overviews, answers and fake ids never reach the real cache, ledger or metrics
+        cfg.setdefault("cache", {})["file_index"] = str(Path(scratch) / "cache.sqlite3")
+        cfg.setdefault("metrics", {})["jsonl"] = str(Path(scratch) / "metrics.jsonl")
+
+    cfg.setdefault("engine", {})["max_workers"] = engine_workers # this process's share of the global cap on in-flight calls
+    ingestion_cfg, ledger_cfg, logging_cfg = (cfg.setdefault(section, {}) for section in ("ingestion", "ledger", "logging"))
+    ingestion_cfg["max_open_files"] = min(ingestion_cfg.get("max_open_files", 8), engine_workers) # uploads and deletions bypass the engine, so cap them too
+    ledger_cfg["delete_workers"] = min(ledger_cfg.get("delete_workers", 8), engine_workers)
+    logging_cfg["file"] = f"{Path(logging_cfg.get('file', 'sessions.log')).with_suffix('')}.{os.getpid()}.log" # one file per process, rotation isn't safe across processes
+    scheduler_cfg = cfg.setdefault("scheduler", {})
+
+    for limit, default in (("rpm", 500), ("tpm", 200000)): # the account's rate limits, split between processes
+        if scheduler_cfg.get(limit, default):
+            scheduler_cfg[limit] = max(1, int(scheduler_cfg.get(limit, default) * rate_share))
+
+    if fake:
+        from TeachingAgent.fake import FakeOpenAI
+        _client = FakeOpenAI(latency={"runs": 0.5, "default": 0.05})
+    else:
+        from openai import OpenAI
+        _client = OpenAI(api_key=cfg["openai"]["secret"])
+
+def precompute(course: str, files: list[str], num_faq_questions: int, timeout: Optional[float]) -> dict:
+    """
+    Ingest one course's files and build its overview (memoised in the overview cache, so a later session over the same
+    files starts with it). Runs in a worker process, returns the JSON Lines record.
+    """
+
+    started = time.perf_counter()
+    record = {"course": course, "files": len(files)}
+    agent = None
+
+    try:
+        agent = TeachingAgent(_client, verbosity={"verbose": False})
+        ingestion = agent.ingest(files)
+        record["attached"] = len(ingestion.result())
+        record["failed_files"] = [p.name for p in ingestion.progress() if p.status == "failed"]
+
+        topics, revision, questions = asyncio.run(agent.ra.prep_overview(num_faq_questions, timeout=timeout))
+        complete = bool(topics) and len(revision) == len(topics) and bool(questions)
+        record |= {"status": "done" if complete else "partial", "topics": topics, "revision": revision, "questions": questions}
+
+        if agent.ra.abandoned:
+            record["abandoned"] = agent.ra.abandoned
+
+        if complete and cfg.get("answers", {}).get("prewarm", True):
+            record["prewarmed"] = asyncio.run(agent.prewarm_answers(questions))
+
+    except Exception as e:
+        record |= {"status": "failed", "error": repr(e)}
+
+    finally:
+        if agent is not None:
+            agent.close()
+
+    return record | {"seconds": round(time.perf_counter() - started, 1), "finished": time.time()}
+
+def batch(args: argparse.Namespace) -> None:
+    courses = load_courses(args.batch)
+    out = Path(args.out)
+    done = completed_courses(out)
+    todo = {course: files for course, files in courses.items() if course not in done}
+    processes = max(1, min(args.processes, len(todo) or 1, args.max_calls)) # at least one call in flight per process, so --max-calls is never exceeded
+    print(f"{len(courses)} courses, {len(done)} already done, {len(todo)} to go on {processes} process{'es' if processes != 1 else ''}.")
+
+    if not todo:
+        return
+
+    scratch = tempfile.mkdtemp(prefix="teachingagent-fake-") if args.fake else None
+    init = (args.fake, max(1, math.ceil(args.max_calls / processes)), 1 / processes, scratch)
+
+    try:
+        _run_batch(todo, out, processes, init, args)
+    finally:
+        if scratch is not None:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+def _run_batch(todo: dict[str, list[str]], out: Path, processes: int, init: tuple, args: argparse.Namespace) -> None:
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=init) as executor, out.open("a+", encoding="utf-8") as f:
+        if f.tell() and (f.seek(f.tell() - 1), f.read(1))[1] != "\n": # start past a line torn by a crash
+            f.write("\n")
+
+        jobs = {executor.submit(precompute, course, files, args.faq, args.timeout): course for course, files in todo.items()}
+
+        try:
+            for n, job in enumerate(as_completed(jobs), 1):
+                try:
+                    record = job.result()
+                except Exception as e: # the worker process died
+                    record = {"course": jobs[job], "status": "failed", "error": repr(e), "finished": time.time()}
+
+                f.write(json.dumps(record) + "\n") # as each course finishes, so a crash loses at most the courses in flight
+                f.flush()
+                os.fsync(f.fileno())
+                print(f"[{n}/{len(todo)}] {record['course']}: {record['status']}" + (f" ({record['error']})" if "error" in record else f" in {record['seconds']}s"))
+
+        except KeyboardInterrupt:
+            executor.shutdown(wait=False, cancel_futures=True)
+            print("Interrupted, run again to resume.")
+            raise
+
 if __name__ == "__main__":
-    with open("config.toml", "rb+") as f:
-        config = tomllib.load(f)
-        
-    secret = config["openai"]["secret"]
-    client = OpenAI(api_key=secret)
-    
-    main(client, config)
-
-    quick_delete(client)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Interactive session over [local] pdf1/pdf2, or precompute overviews for many courses with --batch.")
+    parser.add_argument("--batch", metavar="COURSES", help="directory of course folders, or a .json/.jsonl manifest")
+    parser.add_argument("--out", default="overviews.jsonl", help="JSON Lines results, appended to and used to resume")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 4, help="courses precomputed at once, one worker process each")
+    parser.add_argument("--max-calls", type=int, default=32, help="API calls in flight across every process, split evenly between them (each process's engine, upload and cleanup pools are capped at its share)")
+    parser.add_argument("--faq", type=int, default=5, help="FAQ questions per course")
+    parser.add_argument("--timeout", type=float, help="seconds per course overview, partial results are written after it")
+    parser.add_argument("--fake", action="store_true", help="run against TeachingAgent.fake.FakeOpenAI, a dry run with no API key")
+    parser.add_argument("--resume", metavar="SESSION", help="interactive session id to continue after a crash or interrupt")
+    args = parser.parse_args()
+
+    if args.batch:
+        batch(args)
+    else:
+        with open("config.toml", "rb+") as f:
+            config = tomllib.load(f)
+
+        secret = config["openai"]["secret"]
+
+        from openai import OpenAI
+        client = OpenAI(api_key=secret)
+
+        main(client, config, args.resume)
+
+        sweep(client) # only crashed or stale sessions, never other live ones, shared files or helpers
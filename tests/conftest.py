@@ -0,0 +1,39 @@
+from collections import defaultdict
+from TeachingAgent.answers import answers
+from TeachingAgent.ledger import ledger
+from TeachingAgent.registry import helpers
+from TeachingAgent.utils import cfg
+import pytest
+
+PROMPTS = { # as in "[SAMPLE] config.toml", with portable paths
+    "main": "prompts/main.txt",
+    "topics": "prompts/topics.txt",
+    "gen_questions": "prompts/questions_pipeline/topic_questions.txt",
+    "eval_questions": "prompts/questions_pipeline/eval_questions.txt",
+    "pick_questions": "prompts/questions_pipeline/select_questions.txt",
+    "summary_gen": "prompts/revision_sheet_pipeline/summary.txt",
+}
+
+@pytest.fixture(autouse=True)
+def default_config(monkeypatch: pytest.MonkeyPatch) -> None: # every setting at its default, whatever the local config.toml says (or if there is none)
+    monkeypatch.setattr(cfg, "_data", {})
+
+@pytest.fixture
+def sandbox(tmp_path, monkeypatch: pytest.MonkeyPatch) -> dict: # settings for sessions against FakeOpenAI, every database and log under tmp_path
+    monkeypatch.setattr(cfg, "_data", {
+        "openai": {"model": "gpt-4o-mini"},
+        "cache": {"file_index": str(tmp_path / "cache.sqlite3")},
+        "logging": {"file": str(tmp_path / "sessions.log")},
+        "engine": {"poll_interval": 0.01},
+        "prompts": PROMPTS,
+    })
+
+    for shared in (ledger, helpers, answers): # process-wide, resolved against the sandbox on first use
+        monkeypatch.setattr(shared, "path", None)
+        monkeypatch.setattr(shared, "_ready", False)
+
+    monkeypatch.setattr(helpers, "_verified", {})
+    monkeypatch.setattr(answers, "_loaded", set())
+    monkeypatch.setattr(answers, "_index", defaultdict(dict))
+    monkeypatch.setattr(answers, "_buckets", defaultdict(set))
+    return cfg._data
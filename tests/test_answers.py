@@ -0,0 +1,59 @@
+from TeachingAgent.answers import AnswerCache, content_words, normalise, self_contained, signature, similarity
+import pytest
+
+CORPUS = "corpus"
+
+@pytest.fixture
+def cache(tmp_path) -> AnswerCache:
+    return AnswerCache(tmp_path / "answers.sqlite3", threshold=0.7, ttl_hours=24, max_entries=100)
+
+def test_normalise() -> None:
+    assert normalise("What's an enzyme??") == normalise("what is enzymes") == "what enzyme"
+
+def test_follow_ups_are_not_self_contained() -> None:
+    assert not self_contained("what about it?")
+    assert not self_contained("explain that again")
+    assert self_contained("What is an enzyme?")
+
+def test_exact_and_reworded_hits(cache: AnswerCache) -> None:
+    assert cache.put(CORPUS, "What are the main stages of process number 3 in the course?", "answer")
+    assert cache.get(CORPUS, "what are the main stages of process number 3 in the course") == "answer"
+    assert cache.get(CORPUS, "What are the key stages of process number 3 within the course?") == "answer"
+    assert cache.stats()["near_hits"] == 1
+
+@pytest.mark.parametrize("cached, asked", [
+    ("What are the advantages of gene therapy?", "What are the disadvantages of gene therapy?"),
+    ("Why does the rate of reaction increase with temperature?", "Why does the rate of reaction decrease with temperature?"),
+    ("What are the main stages of process number 3 in the course?", "What are the main stages of process number 4 in the course?"),
+    ("How does osmosis work in plant cells?", "Why does osmosis work in plant cells?"),
+])
+def test_opposite_questions_never_share_answers(cache: AnswerCache, cached: str, asked: str) -> None:
+    cache.put(CORPUS, cached, "cached answer")
+    assert cache.get(CORPUS, asked) is None
+
+def test_content_words() -> None:
+    assert content_words(normalise("What are the main stages of mitosis?")) == content_words(normalise("Describe the key stages of mitosis"))
+    assert content_words(normalise("advantages of gene therapy")) != content_words(normalise("disadvantages of gene therapy"))
+
+def test_rewording_keeps_a_high_similarity() -> None:
+    a, b = normalise("What are the main stages of mitosis?"), normalise("Which are the key stages in mitosis?")
+    assert similarity(signature(a), signature(b)) == 1.0
+
+def test_corpora_are_separate(cache: AnswerCache) -> None:
+    cache.put(CORPUS, "What is an enzyme?", "answer")
+    assert cache.get("other corpus", "What is an enzyme?") is None
+
+def test_lru_eviction(tmp_path) -> None:
+    cache = AnswerCache(tmp_path / "answers.sqlite3", threshold=0.7, ttl_hours=24, max_entries=2)
+
+    for i in range(3):
+        cache.put(CORPUS, f"What happens in stage {i} of mitosis?", f"answer {i}")
+
+    assert cache.get(CORPUS, "What happens in stage 0 of mitosis?") is None
+    assert cache.get(CORPUS, "What happens in stage 2 of mitosis?") == "answer 2"
+    assert cache.stats()["evictions"] == 1
+
+def test_invalidate(cache: AnswerCache) -> None:
+    cache.put(CORPUS, "What is an enzyme?", "answer")
+    cache.invalidate(CORPUS)
+    assert cache.get(CORPUS, "What is an enzyme?") is None
@@ -0,0 +1,53 @@
+from TeachingAgent.cache import OverviewCache
+import time
+import pytest
+
+ENTRY = ["x" * 90] # 94 bytes as JSON
+
+@pytest.fixture
+def cache(tmp_path) -> OverviewCache:
+    return OverviewCache(tmp_path / "cache.sqlite3", max_bytes=200) # room for two entries
+
+def test_keys_ignore_file_order_but_not_prompts_or_params() -> None:
+    key = OverviewCache.key(["b", "a"], ["topics"], "gpt-4o", 5)
+
+    assert key == OverviewCache.key(["a", "b"], ["topics"], "gpt-4o", 5)
+    assert key != OverviewCache.key(["a", "b"], ["topics v2"], "gpt-4o", 5)
+    assert key != OverviewCache.key(["a", "b"], ["topics"], "gpt-4o", 6)
+
+def test_least_recently_used_entries_are_evicted_first(cache: OverviewCache) -> None:
+    cache.put("a", ENTRY)
+    time.sleep(0.01)
+    cache.put("b", ENTRY)
+    time.sleep(0.01)
+    assert cache.get("a") == ENTRY # now more recent than b
+    time.sleep(0.01)
+    cache.put("c", ENTRY)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == ENTRY and cache.get("c") == ENTRY
+
+def test_an_entry_over_the_budget_is_still_kept(cache: OverviewCache) -> None:
+    cache.put("a", ENTRY)
+    time.sleep(0.01)
+    cache.put("big", ["x" * 500])
+
+    assert cache.get("a") is None
+    assert cache.get("big") == ["x" * 500]
+
+def test_invalidate_one_entry_or_all(cache: OverviewCache) -> None:
+    cache.put("a", ENTRY)
+    cache.put("b", ENTRY)
+    cache.invalidate("a")
+
+    assert cache.get("a") is None and cache.get("b") == ENTRY
+
+    cache.invalidate()
+    assert cache.get("b") is None
+
+def test_tables_share_a_database_but_not_entries(tmp_path) -> None:
+    overviews = OverviewCache(tmp_path / "cache.sqlite3")
+    texts = OverviewCache(tmp_path / "cache.sqlite3", table="texts")
+    overviews.put("a", ENTRY)
+
+    assert texts.get("a") is None
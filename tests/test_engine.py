@@ -0,0 +1,87 @@
+from TeachingAgent.assistants import TeachingAgent
+from TeachingAgent.engine import CancelScope
+from TeachingAgent.fake import FakeBadRequestError, FakeOpenAI
+from TeachingAgent.logger import Logger
+from TeachingAgent.metrics import metrics
+import threading
+import time
+import pytest
+
+@pytest.fixture
+def client(sandbox: dict) -> FakeOpenAI:
+    return FakeOpenAI(latency={"runs": 0.3, "default": 0.01}, cancel_latency=0.1)
+
+def run(client: FakeOpenAI, thread: object, **kwargs) -> tuple[bool, str]:
+    assistant = client.beta.assistants.create(name="Teaching Assistant", instructions="-", model="gpt-4o-mini")
+    return TeachingAgent._handle_run_step(client=client, thread=thread, assistant=assistant, prompt="Explain enzymes.", logger=Logger(verbose=False), **kwargs)
+
+def test_cancel_wakes_waiting_polls_straight_away() -> None:
+    scope = CancelScope()
+    threading.Timer(0.05, scope.cancel).start()
+    started = time.monotonic()
+
+    assert scope.wait(5)
+    assert time.monotonic() - started < 0.5
+
+def test_idle_waits_for_runs_in_the_scope() -> None:
+    scope = CancelScope()
+
+    def work() -> None:
+        with scope.running():
+            time.sleep(0.2)
+
+    worker = threading.Thread(target=work)
+    worker.start()
+    time.sleep(0.05)
+
+    assert not scope.idle(0.01)
+    assert scope.idle(1)
+    worker.join()
+
+def test_cancelled_scopes_start_no_runs(client: FakeOpenAI) -> None:
+    scope = CancelScope()
+    scope.cancel()
+
+    assert run(client, client.beta.threads.create(), cancel=scope) == (False, "")
+    assert client.calls["runs.create"] == 0
+    assert scope.abandoned["runs_skipped"] == 1
+
+def test_cancelled_runs_stop_server_side_before_returning(client: FakeOpenAI) -> None:
+    scope, thread = CancelScope(), client.beta.threads.create()
+    threading.Timer(0.1, scope.cancel).start()
+
+    assert run(client, thread, cancel=scope) == (False, "")
+    assert client.calls["runs.cancel"] == 1
+    assert scope.abandoned["runs_cancelled"] == 1
+    assert TeachingAgent._settled(thread)
+    assert run(client, thread)[0] # the thread takes a new run straight away
+
+def test_runs_past_their_timeout_expire(client: FakeOpenAI) -> None:
+    thread = client.beta.threads.create()
+    started = time.monotonic()
+
+    assert run(client, thread, stage="evaluate", timeout=0.1) == (False, "")
+    assert time.monotonic() - started < 0.3 # well before the run would have finished
+    assert metrics.records("evaluate")[-1].status == "expired"
+    assert run(client, thread)[0]
+
+def test_streams_past_their_timeout_raise(client: FakeOpenAI) -> None:
+    assistant = client.beta.assistants.create(name="Teaching Assistant", instructions="-", model="gpt-4o-mini")
+    thread = client.beta.threads.create()
+
+    with pytest.raises(TimeoutError):
+        list(TeachingAgent._stream_run_step(client=client, thread=thread, assistant=assistant, prompt="Explain enzymes.", logger=Logger(verbose=False), timeout=0.1))
+
+    assert client.calls["runs.cancel"] == 1
+    assert "".join(TeachingAgent._stream_run_step(client=client, thread=thread, assistant=assistant, prompt="Explain enzymes.", logger=Logger(verbose=False)))
+
+def test_threads_with_runs_still_cancelling_are_not_reused(sandbox: dict) -> None:
+    sandbox["timeouts"] = {"cancel": 0.05}
+    client = FakeOpenAI(latency={"runs": 0.3, "default": 0.01}, cancel_latency=1.0)
+    thread = client.beta.threads.create()
+
+    assert run(client, thread, timeout=0.1) == (False, "")
+    assert not TeachingAgent._settled(thread) # replaced by its owner, see _usable and _iter_revision_guide
+
+    with pytest.raises(FakeBadRequestError):
+        run(client, thread)
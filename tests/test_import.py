@@ -0,0 +1,21 @@
+from benchmark import IMPORT_BUDGET_MS, import_time_ms
+import subprocess
+import sys
+
+def fresh(code: str) -> str: # stdout of `code` in a new interpreter, with nothing imported yet
+    return subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout.strip()
+
+def loaded_after(statement: str, modules: tuple[str, ...]) -> list[str]:
+    return list(filter(None, fresh(f"import sys; {statement}; print(','.join(m for m in {modules!r} if m in sys.modules))").split(",")))
+
+def test_importing_the_package_loads_no_submodules() -> None:
+    assert loaded_after("import TeachingAgent", ("TeachingAgent.assistants", "asyncio", "sqlite3")) == []
+
+def test_heavy_and_optional_modules_wait_for_first_use() -> None:
+    assert loaded_after("import TeachingAgent.assistants", ("openai", "pypdf", "tomllib", "logging.handlers", "http.server")) == []
+
+def test_config_is_not_read_at_import() -> None:
+    assert fresh("import TeachingAgent.assistants; from TeachingAgent.utils import cfg; print(cfg._data is None)") == "True"
+
+def test_import_time_stays_within_budget() -> None:
+    assert min(import_time_ms() for _ in range(3)) <= IMPORT_BUDGET_MS # best of 3, the first run also pays for .pyc compilation
@@ -0,0 +1,99 @@
+from contextlib import closing
+from TeachingAgent.fake import FakeOpenAI
+from TeachingAgent.ledger import ResourceLedger
+from TeachingAgent.pool import ResourcePool
+from TeachingAgent.utils import AssistantConfig, cfg
+import os
+import subprocess
+import sys
+import time
+import pytest
+
+@pytest.fixture
+def ledger(tmp_path) -> ResourceLedger:
+    return ResourceLedger(tmp_path / "ledger.sqlite3")
+
+@pytest.fixture
+def dead_pid() -> int:
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+def set_session(ledger: ResourceLedger, owner: str, **values: object) -> None:
+    with closing(ledger._connect()) as db, db:
+        for column, value in values.items():
+            db.execute(f"UPDATE sessions SET {column} = ? WHERE owner = ?", (value, owner))
+
+def test_sessions_of_live_processes_are_not_orphans(ledger: ResourceLedger) -> None:
+    ledger.open_session("live")
+    ledger.record("thread", "thread_1", owner="live")
+
+    assert ledger.orphans() == []
+
+def test_sessions_of_dead_processes_are_orphans(ledger: ResourceLedger, dead_pid: int) -> None:
+    ledger.open_session("crashed")
+    ledger.record("thread", "thread_1", owner="crashed")
+    set_session(ledger, "crashed", pid=dead_pid)
+
+    assert ledger.orphans() == ["crashed"]
+
+def test_idle_sessions_go_stale(ledger: ResourceLedger) -> None:
+    ledger.open_session("idle")
+    set_session(ledger, "idle", last_seen=time.time() - 2 * 60 * 60)
+
+    assert ledger.orphans(stale_hours=1) == ["idle"]
+    assert ledger.orphans(stale_hours=3) == []
+
+def test_snapshotted_sessions_outlive_their_process_until_stale(ledger: ResourceLedger, dead_pid: int) -> None:
+    ledger.open_session("resumable")
+    ledger.save_snapshot("resumable", {"assistant": "asst_1"})
+    set_session(ledger, "resumable", pid=dead_pid)
+
+    assert ledger.orphans() == []
+
+    set_session(ledger, "resumable", last_seen=time.time() - 2 * 60 * 60)
+    assert ledger.orphans(stale_hours=1) == ["resumable"]
+
+def test_resources_without_a_session_are_orphans(ledger: ResourceLedger) -> None:
+    ledger.record("thread", "thread_1", owner="unknown")
+    ledger.record("file", "file_1") # shared, never an orphan
+
+    assert ledger.orphans() == ["unknown"]
+
+def test_closed_sessions_drop_their_snapshot(ledger: ResourceLedger) -> None:
+    ledger.open_session("done")
+    ledger.save_snapshot("done", {"assistant": "asst_1"})
+    ledger.close_session("done")
+
+    assert ledger.load_snapshot("done") is None
+    assert ledger.orphans() == []
+
+def test_sessions_recently_used_by_other_live_processes_are_live(ledger: ResourceLedger, dead_pid: int) -> None:
+    ledger.open_session("session")
+    assert not ledger.live("session") # this process's own sessions are tracked by TeachingAgent
+
+    set_session(ledger, "session", pid=os.getppid())
+    assert ledger.live("session")
+
+    set_session(ledger, "session", last_seen=time.time() - 60 * 60)
+    assert not ledger.live("session", within=30 * 60) # idle long enough to resume
+    set_session(ledger, "session", last_seen=time.time())
+
+    set_session(ledger, "session", pid=dead_pid)
+    assert not ledger.live("session")
+
+    set_session(ledger, "session", host="elsewhere")
+    assert ledger.live("session") # can't check another host's processes
+
+def test_an_idle_full_pool_keeps_its_session_fresh(tmp_path, monkeypatch: pytest.MonkeyPatch) -> None:
+    ledger = ResourceLedger(tmp_path / "ledger.sqlite3")
+    monkeypatch.setattr("TeachingAgent.ledger.ledger", ledger) # also what delete_resources drops from
+    monkeypatch.setattr("TeachingAgent.pool.ledger", ledger)
+    monkeypatch.setattr(cfg, "_data", {"ledger": {"stale_hours": 1 / 3600}}) # stale after a second, touched every 0.25s
+    pool = ResourcePool(FakeOpenAI(latency=0.0), size=1, config=AssistantConfig(prompt="-", model="gpt-4o-mini"))
+
+    try:
+        time.sleep(1.5) # long full, and idle
+        assert pool.owner not in ledger.orphans()
+    finally:
+        pool.close()
@@ -0,0 +1,52 @@
+from TeachingAgent.preprocess import _boilerplate, _is_index, prepare_pdf
+import io
+
+CHUNKING = {"type": "static", "static": {"max_chunk_size_tokens": 800, "chunk_overlap_tokens": 400}}
+
+def prose(topic: str) -> str: # a page of text whose lines don't repeat on other pages
+    return "\n".join(f"{topic} {fact}: enzymes are biological catalysts that lower the activation energy of {topic}." for fact in ("definition", "example", "mechanism"))
+
+def worked_maths() -> list[str]:
+    return [f"Step {n}: substitute into the quadratic formula, giving x = {n}, {n + 1}" for n in range(6)] + [
+        "Solve 2x + 3 = 11",
+        "Subtract 3 from both sides to get 2x = 8",
+        "Divide both sides by 2, so x = 4",
+        "Check: 2(4) + 3 = 11",
+        "The answer is page 4",
+        "Total marks 12",
+    ]
+
+def index_page() -> list[str]:
+    return [f"term {n}, {n + 10}, {n + 20}-{n + 22}" for n in range(12)]
+
+def contents_page() -> list[str]:
+    return [f"{n} Chapter title {'.' * 12} {n * 10}" for n in range(1, 13)]
+
+def test_index_and_contents_pages_at_the_edges_are_detected() -> None:
+    assert _is_index(index_page(), page=19, pages=20)
+    assert _is_index(contents_page(), page=0, pages=20)
+
+def test_index_like_pages_mid_document_are_kept() -> None:
+    assert not _is_index(index_page(), page=10, pages=20)
+
+def test_worked_maths_is_never_an_index() -> None:
+    assert not _is_index(worked_maths(), page=19, pages=20)
+
+def test_bare_trailing_numbers_are_not_page_references() -> None:
+    assert not _is_index([f"Question {n} carries 5 marks in total 10" for n in range(12)], page=19, pages=20)
+
+def test_blank_lines_are_not_counted_as_boilerplate() -> None:
+    pages = [["Course notes", "", *prose(topic).splitlines(), "", str(n + 1)] for n, topic in enumerate(("digestion", "respiration", "photosynthesis", "fermentation"))]
+    prepared = prepare_pdf("notes.pdf", io.BytesIO(), 1000, set(), CHUNKING, pages=["\n".join(page) for page in pages])
+
+    assert (0, 1) in _boilerplate(pages, 3, 0.5) # still removed
+    assert prepared.boilerplate_lines == 8 # a header and a page number per page
+
+def test_report_lists_dropped_pages_and_compares_text_bytes() -> None:
+    pages = ["Cover", prose("digestion"), "\n".join(worked_maths()) + "\n" + prose("respiration"), prose("digestion"), "\n".join(index_page())]
+    prepared = prepare_pdf("notes.pdf", io.BytesIO(), 10 ** 6, set(), CHUNKING, pages=pages)
+    report = prepared.report()
+
+    assert report["dropped"] == {1: "short", 4: "duplicate", 5: "index"}
+    assert report["pages"] - len(report["dropped"]) == 2 # the worked maths page survives
+    assert report["bytes_saved"] == report["extracted_bytes"] - report["text_bytes"] < 10 ** 6
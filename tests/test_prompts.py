@@ -0,0 +1,52 @@
+from TeachingAgent.utils import Prompt, PromptRegistry
+import os
+import pytest
+
+@pytest.fixture
+def registry(tmp_path) -> PromptRegistry:
+    (tmp_path / "faq.txt").write_text("Write [N] questions on [TOPIC].")
+    return PromptRegistry({"faq": "faq.txt"}, root=tmp_path, reload_interval=0.0)
+
+def bump(path, text: str) -> None: # rewrite with a later mtime, even on filesystems with coarse timestamps
+    stat = path.stat()
+    path.write_text(text)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+def test_placeholders_are_rendered_in_one_pass() -> None:
+    prompt = Prompt("Topics: [TOPICS]. Answer in [FORMAT].")
+
+    assert prompt.params == {"topics", "format"}
+    assert prompt.render(topics="[FORMAT]", format="JSON") == "Topics: [FORMAT]. Answer in JSON." # values aren't re-scanned
+
+def test_missing_parameters_are_an_error() -> None:
+    with pytest.raises(AssertionError, match="topics"):
+        Prompt("Topics: [TOPICS]").render()
+
+def test_text_without_placeholders_is_returned_as_is() -> None:
+    assert Prompt("Summarise [the] notes.").render(unused=1) == "Summarise [the] notes."
+
+def test_files_are_read_once_until_they_change(registry: PromptRegistry, tmp_path) -> None:
+    prompt = registry["faq"]
+
+    assert registry["faq"] is prompt # same mtime, not re-read
+
+    bump(tmp_path / "faq.txt", "Write [N] hard questions on [TOPIC].")
+    assert registry.render("faq", n=3, topic="enzymes") == "Write 3 hard questions on enzymes."
+
+def test_changes_wait_for_the_reload_interval(tmp_path) -> None:
+    (tmp_path / "main.txt").write_text("v1")
+    registry = PromptRegistry({"main": "main.txt"}, root=tmp_path, reload_interval=60.0)
+    assert registry["main"].text == "v1"
+
+    bump(tmp_path / "main.txt", "v2")
+    assert registry["main"].text == "v1"
+
+def test_derived_prompts_follow_their_base_file(registry: PromptRegistry, tmp_path) -> None:
+    registry.define("faq_batch", "faq", " Topics: [TOPICS]")
+    registry.define("standalone", None, "Summarise [TOPIC].")
+
+    assert registry.render("faq_batch", n=2, topic="x", topics="a, b") == "Write 2 questions on x. Topics: a, b"
+    assert registry.render("standalone", topic="enzymes") == "Summarise enzymes."
+
+    bump(tmp_path / "faq.txt", "Ask [N] things about [TOPIC].")
+    assert registry.render("faq_batch", n=2, topic="x", topics="a") == "Ask 2 things about x. Topics: a"
@@ -0,0 +1,57 @@
+from concurrent.futures import ThreadPoolExecutor
+from TeachingAgent.fake import FakeOpenAI
+from TeachingAgent.ledger import ledger
+from TeachingAgent.registry import HelperRegistry
+import time
+import pytest
+
+HELPER = {"name": "FAQ Generator", "instructions": "Generate questions.", "model": "gpt-4o-mini", "tools": [{"type": "file_search"}]}
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch: pytest.MonkeyPatch) -> HelperRegistry:
+    monkeypatch.setattr(ledger, "path", tmp_path / "ledger.sqlite3")
+    monkeypatch.setattr(ledger, "_ready", False)
+    return HelperRegistry(tmp_path / "helpers.sqlite3")
+
+def test_concurrent_gets_create_one_helper(registry: HelperRegistry) -> None:
+    client = FakeOpenAI()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        helpers = list(executor.map(lambda _: registry.get(client, **HELPER), range(8)))
+
+    assert client.calls["assistants.create"] == 1
+    assert len({helper.id for helper in helpers}) == 1
+
+def test_different_helpers_are_created_concurrently(registry: HelperRegistry) -> None:
+    client = FakeOpenAI(latency=0.3)
+    started = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        list(executor.map(lambda model: registry.get(client, **{**HELPER, "model": model}), ("gpt-4o-mini", "gpt-4.1-nano")))
+
+    assert client.calls["assistants.create"] == 2
+    assert time.monotonic() - started < 0.5 # not one after the other
+
+def test_other_processes_reuse_persisted_helpers(registry: HelperRegistry) -> None:
+    client = FakeOpenAI()
+    helper = registry.get(client, **HELPER)
+
+    assert HelperRegistry(registry.path).get(client, **HELPER) == helper
+    assert client.calls["assistants.create"] == 1
+
+def test_evicted_helpers_are_recreated(registry: HelperRegistry) -> None:
+    client = FakeOpenAI()
+    helper = registry.get(client, **HELPER)
+    client.beta.assistants.delete(helper.id) # e.g. another process's gc()
+    registry.evict(helper)
+
+    assert registry.get(client, **HELPER).id != helper.id
+    assert client.calls["assistants.create"] == 2
+
+def test_gc_deletes_expired_helpers(registry: HelperRegistry) -> None:
+    client = FakeOpenAI()
+    registry.get(client, **HELPER)
+
+    assert registry.gc(client, ttl=60) == 0
+    assert registry.gc(client, ttl=-1) == 1
+    assert client.calls["assistants.delete"] == 1
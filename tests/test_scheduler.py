@@ -0,0 +1,107 @@
+from TeachingAgent.fake import FakeRateLimitError
+from TeachingAgent.scheduler import Priority, Scheduler
+import threading
+import time
+import pytest
+
+def test_requests_bucket_admits_a_burst_then_paces() -> None:
+    scheduler = Scheduler(rpm=600, tpm=0, retries=0) # a bucket of 600, refilled at 10 a second
+    scheduler._configure()
+    scheduler._requests = 3.0
+
+    started = time.monotonic()
+    waits = [scheduler.acquire(Priority.OVERVIEW) for _ in range(5)]
+
+    assert max(waits[:3]) < 0.05 # the burst fits the bucket
+    assert time.monotonic() - started == pytest.approx(0.2, abs=0.08) # then one every 0.1s
+
+def test_tokens_bucket_holds_back_large_calls_and_settle_refunds() -> None:
+    scheduler = Scheduler(rpm=0, tpm=6000, retries=0) # 100 tokens a second
+    scheduler.acquire(Priority.OVERVIEW, tokens=6000)
+
+    assert scheduler.acquire(Priority.OVERVIEW, tokens=20) == pytest.approx(0.2, abs=0.08)
+
+    scheduler.settle(-6000) # the first call used far less than estimated
+    assert scheduler.acquire(Priority.OVERVIEW, tokens=3000) < 0.05
+
+def test_more_urgent_callers_go_first() -> None:
+    scheduler = Scheduler(rpm=600, tpm=0, retries=0)
+    scheduler._configure()
+    scheduler._requests = 0.0
+    order = []
+
+    def call(priority: Priority) -> None:
+        scheduler.acquire(priority)
+        order.append(priority)
+
+    threads = [threading.Thread(target=call, args=(Priority.OVERVIEW, ))]
+    threads[0].start()
+    time.sleep(0.02) # queued first
+    threads.append(threading.Thread(target=call, args=(Priority.INTERACTIVE, )))
+    threads[1].start()
+
+    for thread in threads:
+        thread.join()
+
+    assert order == [Priority.INTERACTIVE, Priority.OVERVIEW]
+
+def test_rate_limits_are_retried_after_the_servers_retry_after() -> None:
+    scheduler = Scheduler(rpm=0, tpm=0, retries=3)
+    failures = [FakeRateLimitError(retry_after=0.1), FakeRateLimitError(retry_after=0.1)]
+
+    def flaky() -> str:
+        if failures:
+            raise failures.pop()
+
+        return "ok"
+
+    started = time.monotonic()
+    assert scheduler.call(Priority.INTERACTIVE, flaky) == "ok"
+    assert time.monotonic() - started == pytest.approx(0.2, abs=0.08)
+
+    stats = scheduler.stats()["interactive"]
+    assert (stats["calls"], stats["retries"], stats["failed"]) == (3, 2, 0)
+
+def test_rate_limits_back_off_until_the_retry_budget_runs_out() -> None:
+    scheduler = Scheduler(rpm=0, tpm=0, retries=2, backoff=0.01)
+    calls = []
+
+    def limited() -> None:
+        calls.append(time.monotonic())
+        raise FakeRateLimitError()
+
+    with pytest.raises(FakeRateLimitError):
+        scheduler.call(Priority.OVERVIEW, limited)
+
+    assert len(calls) == 3
+    assert all(later - earlier < 0.1 for earlier, later in zip(calls, calls[1:])) # full jitter below backoff * 2 ** attempt
+    assert scheduler.stats()["overview"]["failed"] == 1
+
+def test_a_rate_limit_holds_back_every_caller() -> None:
+    scheduler = Scheduler(rpm=0, tpm=0, retries=1)
+    failures = [FakeRateLimitError(retry_after=0.2)]
+
+    def limited_once() -> None:
+        if failures:
+            raise failures.pop()
+
+    runner = threading.Thread(target=scheduler.call, args=(Priority.OVERVIEW, limited_once))
+    runner.start()
+    time.sleep(0.05) # the pause has started
+    waited = scheduler.acquire(Priority.INTERACTIVE)
+    runner.join()
+
+    assert waited == pytest.approx(0.15, abs=0.08)
+
+def test_other_errors_are_not_retried() -> None:
+    scheduler = Scheduler(rpm=0, tpm=0, retries=5)
+    calls = []
+
+    def broken() -> None:
+        calls.append(1)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        scheduler.call(Priority.OVERVIEW, broken)
+
+    assert len(calls) == 1
@@ -0,0 +1,88 @@
+from pathlib import Path
+from TeachingAgent import TeachingAgent
+from TeachingAgent.assistants import SNAPSHOT_VERSION
+from TeachingAgent.fake import FakeOpenAI
+from TeachingAgent.ledger import ledger
+from typing import Callable, Iterator
+import pytest
+
+FILES = sorted(str(p) for p in (Path(__file__).resolve().parent.parent / "files").glob("*.pdf"))
+OVERVIEW = [["Enzymes"], {"Enzymes": "Biological catalysts."}, {"Enzymes": ["What do enzymes do?"]}]
+
+@pytest.fixture
+def client(sandbox: dict) -> FakeOpenAI:
+    sandbox |= {"answers": {"prewarm": False}, "preprocess": {"enabled": False}}
+    return FakeOpenAI(latency={"default": 0.0}, seed=0)
+
+@pytest.fixture
+def new_agent(client: FakeOpenAI) -> Iterator[Callable[..., TeachingAgent]]:
+    agents = []
+
+    def new(resume: str | None = None) -> TeachingAgent:
+        agents.append(agent := TeachingAgent(client, verbosity={"verbose": False}, resume=resume))
+        return agent
+
+    yield new
+
+    for agent in reversed(agents): # resumed agents first, they share resources with the ones they resumed
+        agent.close()
+
+def restarted(agent: TeachingAgent) -> str: # as if agent's process had exited after its last snapshot
+    agent.snapshot()
+    agent._stop_autosave()
+    TeachingAgent._live.pop(agent.session_id)
+    return agent.session_id
+
+def test_a_resumed_session_reattaches_without_creating_anything(client: FakeOpenAI, new_agent: Callable) -> None:
+    agent = new_agent()
+    agent.add_files(FILES[:1])
+    agent.ra.overview = OVERVIEW
+    agent.converse_streamlit("What is a derivative?")
+    session = restarted(agent)
+    client.reset_stats()
+
+    resumed = new_agent(session)
+
+    assert resumed.resumed and resumed.session_id == session
+    assert (resumed.assistant.id, resumed.vector_store.id, resumed.thread.id, resumed.st_thread.id) == (agent.assistant.id, agent.vector_store.id, agent.thread.id, agent.st_thread.id)
+    assert resumed.file_hashes == agent.file_hashes and resumed.ra.overview == OVERVIEW
+    assert resumed.transcript == agent.transcript and len(resumed.transcript) == 2
+    assert not [endpoint for endpoint in client.calls if endpoint.endswith("create")]
+
+def test_closing_a_session_leaves_nothing_to_resume(new_agent: Callable) -> None:
+    agent = new_agent()
+    agent.snapshot()
+    agent.close()
+
+    assert ledger.load_snapshot(agent.session_id) is None
+    assert not new_agent(agent.session_id).resumed
+
+def test_a_session_open_in_this_process_is_not_shared(new_agent: Callable) -> None:
+    agent = new_agent()
+    agent.snapshot()
+
+    other = new_agent(agent.session_id)
+
+    assert not other.resumed and other.session_id != agent.session_id
+    assert other.assistant.id != agent.assistant.id
+
+def test_an_older_snapshot_starts_fresh_and_deletes_what_it_left(client: FakeOpenAI, new_agent: Callable) -> None:
+    agent = new_agent()
+    session = restarted(agent)
+    ledger.save_snapshot(session, ledger.load_snapshot(session) | {"version": SNAPSHOT_VERSION - 1})
+
+    fresh = new_agent(session)
+
+    assert not fresh.resumed and fresh.session_id == session
+    assert fresh.assistant.id != agent.assistant.id
+    assert {agent.assistant.id, agent.vector_store.id, agent.thread.id} <= client._deleted
+
+def test_a_snapshot_whose_resources_were_deleted_starts_fresh(client: FakeOpenAI, new_agent: Callable) -> None:
+    agent = new_agent()
+    session = restarted(agent)
+    client.beta.threads.delete(agent.thread.id)
+
+    fresh = new_agent(session)
+
+    assert not fresh.resumed and fresh.thread.id != agent.thread.id
+    assert agent.assistant.id in client._deleted
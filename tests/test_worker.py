@@ -0,0 +1,60 @@
+from pathlib import Path
+from TeachingAgent import OverviewWorker, TeachingAgent
+from TeachingAgent.fake import FakeOpenAI
+from typing import Callable, Iterator
+import pytest
+
+FILES = sorted(str(p) for p in (Path(__file__).resolve().parent.parent / "files").glob("*.pdf"))
+
+@pytest.fixture
+def client(sandbox: dict) -> FakeOpenAI:
+    sandbox |= {"answers": {"prewarm": False}, "preprocess": {"enabled": False}} # overviews only, uploaded as-is
+    return FakeOpenAI(latency={"runs": 0.05, "default": 0.0}, seed=0)
+
+@pytest.fixture
+def new_agent(client: FakeOpenAI) -> Iterator[Callable[[list[str]], TeachingAgent]]:
+    agents = []
+
+    def new(files: list[str]) -> TeachingAgent:
+        agents.append(agent := TeachingAgent(client, verbosity={"verbose": False}))
+        agent.add_files(files)
+        return agent
+
+    yield new
+
+    for agent in agents:
+        agent.close()
+
+@pytest.fixture
+def worker() -> Iterator[OverviewWorker]:
+    worker = OverviewWorker(max_jobs=1)
+    yield worker
+    worker.close()
+
+def test_an_agents_jobs_run_in_submission_order(new_agent: Callable, worker: OverviewWorker) -> None:
+    agent = new_agent(FILES[:-1])
+    full = worker.submit(agent)
+    update = worker.submit(agent, agent.add_files(FILES[-1:])) # needs the full overview to fold the file into
+
+    topics, revision, questions = update.result(30)
+
+    assert update.started >= full.finished
+    assert len(topics) > len(full.result()[0]) and len(revision) == len(topics) and questions
+    assert update.summary()["status"] == "done"
+
+def test_progress_fills_in_topic_by_topic(new_agent: Callable, worker: OverviewWorker) -> None:
+    finished = []
+    job = worker.submit(new_agent(FILES), on_topic=lambda topic, _: finished.append(topic))
+    job.wait(30)
+
+    assert finished and set(finished) == set(job.revision)
+    assert job.summary() | {"seconds": 0} == {"status": "done", "topics": len(job.topics), "topics_done": len(job.topics), "faqs_ready": True, "seconds": 0, "error": None}
+
+def test_jobs_queue_for_a_slot_and_can_be_cancelled_meanwhile(new_agent: Callable, worker: OverviewWorker) -> None:
+    first, second, third = (worker.submit(new_agent([path])) for path in FILES[:3]) # different files, no cached overviews
+    third.cancel()
+    first.wait(30)
+    second.wait(30)
+
+    assert second.started >= first.finished # max_jobs=1
+    assert third.summary()["status"] == "cancelled" and third.started is None